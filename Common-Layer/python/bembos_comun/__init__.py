@@ -0,0 +1 @@
+"""Utilitarios compartidos por los microservicios de Bembos (se despliega como Lambda Layer)."""
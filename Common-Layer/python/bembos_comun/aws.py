@@ -0,0 +1,82 @@
+"""
+Clientes y tablas de AWS memoizados por contenedor.
+
+Cada Lambda obtiene sus clientes desde aquí en vez de crear boto3.client/resource
+por invocación, así las invocaciones calientes reutilizan la sesión, el pool de
+conexiones HTTP y las conexiones TLS ya abiertas.
+
+boto3 se importa en el primer uso: los handlers que no llaman a AWS no pagan su
+importación (~150 ms) en el arranque en frío.
+"""
+import os
+import threading
+
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '32'))
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '2'))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '5'))
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '4'))
+
+_lock = threading.Lock()
+_sesion = None
+_clientes = {}
+_recursos = {}
+_tablas = {}
+
+def configuracion_botocore(servicio=None):
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        tcp_keepalive=True,
+        retries={'mode': 'adaptive', 'max_attempts': AWS_MAX_ATTEMPTS}
+    )
+    if servicio == 's3':
+        # URLs prefirmadas con SigV4 (SigV2 no sirve para buckets nuevos)
+        config = config.merge(Config(signature_version='s3v4'))
+    return config
+
+def obtener_sesion():
+    global _sesion
+    if _sesion is None:
+        import boto3.session
+
+        with _lock:
+            if _sesion is None:
+                _sesion = boto3.session.Session()
+    return _sesion
+
+def obtener_cliente(servicio, endpoint_url=None):
+    """Cliente boto3 memoizado por (servicio, endpoint_url)."""
+    clave = (servicio, endpoint_url)
+    cliente = _clientes.get(clave)
+    if cliente is None:
+        sesion = obtener_sesion()
+        with _lock:
+            cliente = _clientes.get(clave)
+            if cliente is None:
+                cliente = sesion.client(servicio, endpoint_url=endpoint_url, config=configuracion_botocore(servicio))
+                _clientes[clave] = cliente
+    return cliente
+
+def obtener_recurso(servicio='dynamodb', endpoint_url=None):
+    """Resource boto3 memoizado por (servicio, endpoint_url)."""
+    clave = (servicio, endpoint_url)
+    recurso = _recursos.get(clave)
+    if recurso is None:
+        sesion = obtener_sesion()
+        with _lock:
+            recurso = _recursos.get(clave)
+            if recurso is None:
+                recurso = sesion.resource(servicio, endpoint_url=endpoint_url, config=configuracion_botocore(servicio))
+                _recursos[clave] = recurso
+    return recurso
+
+def obtener_tabla(nombre):
+    """Handle de una tabla DynamoDB memoizado por nombre."""
+    tabla = _tablas.get(nombre)
+    if tabla is None:
+        tabla = obtener_recurso('dynamodb').Table(nombre)
+        _tablas[nombre] = tabla
+    return tabla
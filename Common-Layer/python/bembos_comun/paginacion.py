@@ -0,0 +1,137 @@
+"""
+Contrato de paginación común para los endpoints que listan resultados.
+
+Todos reciben `limit` y `next_token` y devuelven `next_token` (o null en la última
+página). El token es opaco para el cliente: envuelve el estado del cursor
+(normalmente el LastEvaluatedKey de DynamoDB) en base64 url-safe firmado con
+HMAC-SHA256 (PAGINACION_SECRETO) para que no se pueda fabricar ni alterar.
+
+Sin secreto los tokens salen sin firma y sólo se aceptan de vuelta con
+PAGINACION_SIN_FIRMA=true (desarrollo local); en cualquier otro caso un token sin
+firmar se rechaza como inválido en vez de usarse como ExclusiveStartKey.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+from decimal import Decimal
+
+PAGINACION_SECRETO = os.environ.get('PAGINACION_SECRETO', '')
+PAGINACION_SIN_FIRMA = os.environ.get('PAGINACION_SIN_FIRMA', 'false').lower() == 'true'
+
+class TokenInvalido(ValueError):
+    pass
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+def _desde_b64(texto):
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+def _firma(payload):
+    digest = hmac.new(PAGINACION_SECRETO.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).digest()
+    return _b64(digest[:16])
+
+def _verificar_firma(payload, firma):
+    if not PAGINACION_SECRETO:
+        if not PAGINACION_SIN_FIRMA:
+            raise TokenInvalido("next_token inválido: paginación sin secreto configurado")
+        return
+    # payload y firma vienen del cliente: lo que no sea ASCII no puede ser un token nuestro
+    try:
+        valida = hmac.compare_digest(firma.encode('ascii'), _firma(payload).encode('ascii'))
+    except UnicodeEncodeError:
+        valida = False
+    if not valida:
+        raise TokenInvalido("next_token inválido: firma incorrecta")
+
+def _decimal_a_json(obj):
+    if isinstance(obj, Decimal):
+        return {'__d': str(obj)}
+    raise TypeError(f"Tipo no serializable en token: {type(obj)}")
+
+def _json_a_decimal(obj):
+    if set(obj) == {'__d'}:
+        return Decimal(obj['__d'])
+    return obj
+
+def codificar_token(estado):
+    """Token opaco para un estado de cursor (dict); None si no hay más páginas."""
+    if not estado:
+        return None
+    crudo = json.dumps(estado, default=_decimal_a_json, separators=(',', ':'), sort_keys=True)
+    payload = _b64(crudo.encode('utf-8'))
+    if PAGINACION_SECRETO:
+        return f"{payload}.{_firma(payload)}"
+    return payload
+
+def decodificar_token(token):
+    if not token:
+        return None
+    if not isinstance(token, str):
+        raise TokenInvalido("next_token inválido")
+
+    payload, _, firma = token.partition('.')
+    _verificar_firma(payload, firma)
+
+    try:
+        valor = json.loads(_desde_b64(payload), object_hook=_json_a_decimal)
+    except (ValueError, TypeError) as e:
+        raise TokenInvalido(f"next_token inválido: {e}")
+    if not isinstance(valor, dict):
+        raise TokenInvalido("next_token inválido")
+    return valor
+
+def leer_limite(params, defecto=50, maximo=100):
+    """Lee `limit` de los query params, acotado a [1, maximo]."""
+    valor = (params or {}).get('limit')
+    if valor in (None, ''):
+        return defecto
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit debe ser un entero: {valor}")
+    return max(1, min(limite, maximo))
+
+def paginar(operacion, kwargs, limite, claves, exclusive_start_key=None):
+    """
+    Ejecuta un Query/Scan hasta juntar `limite` items como máximo.
+
+    Sin FilterExpression se pide exactamente lo que falta (Limit). Con filtro se leen
+    páginas completas y, si sobran items, la página se corta y el cursor se arma con
+    las `claves` (de la tabla y del índice) del último item devuelto, así la siguiente
+    página continúa justo después sin perder ni repetir resultados.
+
+    Devuelve (items, last_evaluated_key | None, items_leidos).
+    """
+    kwargs = dict(kwargs)
+    if exclusive_start_key:
+        kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    items = []
+    items_leidos = 0
+
+    while True:
+        faltan = limite - len(items)
+        if 'FilterExpression' not in kwargs:
+            kwargs['Limit'] = faltan
+
+        response = operacion(**kwargs)
+        pagina = response.get('Items', [])
+        items_leidos += response.get('ScannedCount', len(pagina))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+
+        if len(pagina) > faltan:
+            items.extend(pagina[:faltan])
+            ultimo = items[-1]
+            return items, {clave: ultimo[clave] for clave in claves}, items_leidos
+
+        if len(pagina) == faltan:
+            items.extend(pagina)
+            return items, last_evaluated_key, items_leidos
+
+        items.extend(pagina)
+        if not last_evaluated_key:
+            return items, None, items_leidos
+        kwargs['ExclusiveStartKey'] = last_evaluated_key
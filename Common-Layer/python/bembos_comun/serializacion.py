@@ -0,0 +1,68 @@
+"""
+Serialización JSON de items de DynamoDB en una sola pasada.
+
+dumps/dumps_bytes codifican directamente los Decimal (enteros como int, el resto
+como float) sin reconstruir el árbol de objetos antes de serializar. Si `orjson`
+está instalado se usa como backend; si no, el encoder de la librería estándar.
+
+loads parsea los bodies de las peticiones con los números decimales como Decimal,
+listos para escribirse en DynamoDB.
+"""
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # backend opcional
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        if obj == obj.to_integral_value():
+            return int(obj)
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        # Sets de DynamoDB (SS / NS)
+        return list(obj)
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no serializable a JSON")
+
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+def _dumps_stdlib(obj):
+    return _encoder.encode(obj).encode('utf-8')
+
+def _dumps_orjson(obj):
+    return orjson.dumps(obj, default=_default)
+
+_dumps = _dumps_orjson if orjson is not None else _dumps_stdlib
+
+def dumps_bytes(obj):
+    """JSON en bytes UTF-8 (para S3, SNS, WebSocket...)."""
+    return _dumps(obj)
+
+def dumps(obj):
+    """JSON como str (para el body de las respuestas HTTP)."""
+    return _dumps(obj).decode('utf-8')
+
+def _floats_a_decimal(obj):
+    if isinstance(obj, list):
+        return [_floats_a_decimal(item) for item in obj]
+    if isinstance(obj, dict):
+        return {clave: _floats_a_decimal(valor) for clave, valor in obj.items()}
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    return obj
+
+def loads(body):
+    """
+    Parsea un body JSON (str o bytes) dejando los decimales como Decimal.
+    Si el body ya llega como dict/list (integración lambda de API Gateway),
+    solo convierte sus floats.
+    """
+    if body is None or body == '' or body == b'':
+        return {}
+    if isinstance(body, (dict, list)):
+        return _floats_a_decimal(body)
+    return json.loads(body, parse_float=Decimal)
@@ -0,0 +1,236 @@
+"""
+Almacén de recibos en S3: un objeto por pedido, comprimido, y un archivo por día.
+
+generarRecibo guarda cada recibo en
+    recibos/dia=AAAA-MM-DD/{tenant_id}/{uuid}.txt   (Content-Encoding: gzip)
+con el día local del negocio (America/Lima, el mismo de dia_pedido en
+consultas_pedidos) de la fecha del pedido (fecha_pedido o fecha_creacion, que no
+cambian al pagarse), así una reentrega del mismo pedido cae en la misma clave.
+Antes de subir se comprueba el recibo suelto (HEAD) y, si el día ya pasó, el índice del archivo del
+día: un redrive de la DLQ tras archivar tampoco lo vuelve a subir (el bucket es
+versionado: cada subida repetida sería otra versión). Un pedido sin fecha hace
+fallar el registro en vez de caer en el día en que se reintenta.
+
+archivar_recibos (job diario) empaqueta los recibos sueltos de cada día ya
+asentado (el de hace RECIBOS_ARCHIVO_DIAS_ESPERA días y los anteriores que aún
+tengan sueltos, p. ej. pedidos pagados días después de creados) en dos objetos:
+    recibos-archivo/dia=AAAA-MM-DD/recibos.gz      miembros gzip concatenados
+    recibos-archivo/dia=AAAA-MM-DD/indice.json     clave, tenant, uuid, inicio y longitud
+y borra los sueltos. Cada miembro es un gzip completo: un recibo archivado se lee
+con un GET por rango y se descomprime solo (leer_recibo). Si el día ya tenía
+archivo, los recibos nuevos se agregan al existente.
+"""
+import gzip
+import io
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, unquote
+from bembos_comun.aws import obtener_cliente
+from consultas_pedidos import ZONA_NEGOCIO, dia_negocio
+
+S3_BUCKET = os.environ.get('S3_BUCKET')
+RECIBOS_PREFIJO = os.environ.get('RECIBOS_PREFIJO', 'recibos/')
+RECIBOS_ARCHIVO_PREFIJO = os.environ.get('RECIBOS_ARCHIVO_PREFIJO', 'recibos-archivo/')
+# Días que se espera antes de archivar (cubre reintentos y redrives de la DLQ)
+RECIBOS_ARCHIVO_DIAS_ESPERA = int(os.environ.get('RECIBOS_ARCHIVO_DIAS_ESPERA', '2'))
+# GETs / DELETEs simultáneos al archivar
+RECIBOS_ARCHIVO_WORKERS = int(os.environ.get('RECIBOS_ARCHIVO_WORKERS', '16'))
+
+SUBIDO = 'subido'
+EXISTENTE = 'existente'
+
+_DIA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+_lock = threading.Lock()
+# (bucket, dia) -> claves ya vistas en el índice del día. Una clave archivada no sale
+# del índice, así que un acierto no caduca; un fallo vuelve a leer el índice.
+_archivados = {}
+
+def dia_recibo(pedido):
+    """
+    Día local del negocio de la fecha del pedido. Sin fecha válida lanza ValueError:
+    el día no puede depender de cuándo llega la reentrega.
+    """
+    fecha = pedido.get('fecha_pedido') or pedido.get('fecha_creacion')
+    dia = dia_negocio(str(fecha or ''))
+    if not _DIA.match(dia):
+        raise ValueError(f"Pedido {pedido.get('uuid')} sin fecha_pedido ni fecha_creacion válida: {fecha!r}")
+    return dia
+
+def _hoy():
+    return datetime.now(ZONA_NEGOCIO).strftime('%Y-%m-%d')
+
+def clave_recibo(tenant_id, uuid_pedido, dia):
+    return f"{RECIBOS_PREFIJO}dia={dia}/{quote(tenant_id, safe='')}/{quote(uuid_pedido, safe='')}.txt"
+
+def claves_archivo(dia):
+    prefijo = f"{RECIBOS_ARCHIVO_PREFIJO}dia={dia}/"
+    return prefijo + 'recibos.gz', prefijo + 'indice.json'
+
+def _no_existe(error):
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+def _archivado(s3, bucket, dia, clave):
+    """True si `clave` ya está en el índice del archivo del día."""
+    with _lock:
+        if clave in _archivados.get((bucket, dia), ()):
+            return True
+    indice = _leer_indice(s3, bucket, claves_archivo(dia)[1]) or {}
+    claves = {r['clave'] for r in indice.get('recibos', [])}
+    with _lock:
+        _archivados[(bucket, dia)] = claves
+    return clave in claves
+
+def guardar_recibo(pedido, contenido, payment_id=None, bucket=None):
+    """
+    Sube el recibo comprimido a su clave por pedido salvo que ya exista, suelto (HEAD)
+    o, para días anteriores al actual, en el archivo del día.
+    Devuelve (clave, SUBIDO | EXISTENTE).
+    """
+    s3 = obtener_cliente('s3')
+    bucket = bucket or S3_BUCKET
+    dia = dia_recibo(pedido)
+    clave = clave_recibo(pedido['tenant_id'], pedido['uuid'], dia)
+
+    try:
+        s3.head_object(Bucket=bucket, Key=clave)
+        return clave, EXISTENTE
+    except s3.exceptions.ClientError as e:
+        if not _no_existe(e):
+            raise
+
+    # El día en curso todavía no se archiva: solo los días pasados pagan la lectura del índice
+    if dia < _hoy() and _archivado(s3, bucket, dia, clave):
+        return clave, EXISTENTE
+
+    s3.put_object(
+        Bucket=bucket,
+        Key=clave,
+        # mtime=0: el mismo recibo produce los mismos bytes
+        Body=gzip.compress(contenido.encode('utf-8'), mtime=0),
+        ContentType='text/plain; charset=utf-8',
+        ContentEncoding='gzip',
+        Metadata={'payment-id': str(payment_id or '')}
+    )
+    return clave, SUBIDO
+
+def _leer_indice(s3, bucket, clave_indice):
+    try:
+        return json.loads(s3.get_object(Bucket=bucket, Key=clave_indice)['Body'].read())
+    except s3.exceptions.ClientError as e:
+        if _no_existe(e):
+            return None
+        raise
+
+def leer_recibo(tenant_id, uuid_pedido, dia, bucket=None):
+    """Texto del recibo, suelto o dentro del archivo del día; None si no existe."""
+    s3 = obtener_cliente('s3')
+    bucket = bucket or S3_BUCKET
+    clave = clave_recibo(tenant_id, uuid_pedido, dia)
+    try:
+        return gzip.decompress(s3.get_object(Bucket=bucket, Key=clave)['Body'].read()).decode('utf-8')
+    except s3.exceptions.ClientError as e:
+        if not _no_existe(e):
+            raise
+
+    clave_datos, clave_indice = claves_archivo(dia)
+    indice = _leer_indice(s3, bucket, clave_indice)
+    entrada = next((r for r in (indice or {}).get('recibos', []) if r['clave'] == clave), None)
+    if entrada is None:
+        return None
+    rango = f"bytes={entrada['inicio']}-{entrada['inicio'] + entrada['longitud'] - 1}"
+    miembro = s3.get_object(Bucket=bucket, Key=clave_datos, Range=rango)['Body'].read()
+    return gzip.decompress(miembro).decode('utf-8')
+
+def archivar_dia(dia, bucket=None, max_workers=None):
+    """Empaqueta los recibos sueltos de `dia` en el archivo del día y los borra. Devuelve estadísticas."""
+    inicio_ms = time.perf_counter()
+    s3 = obtener_cliente('s3')
+    bucket = bucket or S3_BUCKET
+    prefijo = f"{RECIBOS_PREFIJO}dia={dia}/"
+
+    sueltos = []
+    for pagina in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefijo):
+        sueltos.extend(objeto['Key'] for objeto in pagina.get('Contents', []))
+    estadisticas = {'dia': dia, 'sueltos': len(sueltos), 'archivados': 0, 'repetidos': 0, 'bytes': 0}
+    if not sueltos:
+        return estadisticas
+
+    clave_datos, clave_indice = claves_archivo(dia)
+    indice = _leer_indice(s3, bucket, clave_indice) or {'dia': dia, 'recibos': []}
+    datos = io.BytesIO()
+    if indice['recibos']:
+        datos.write(s3.get_object(Bucket=bucket, Key=clave_datos)['Body'].read())
+    ya_archivados = {r['clave'] for r in indice['recibos']}
+
+    workers = max(1, min(max_workers or RECIBOS_ARCHIVO_WORKERS, len(sueltos)))
+    nuevos = sorted(clave for clave in sueltos if clave not in ya_archivados)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        contenidos = list(pool.map(lambda clave: s3.get_object(Bucket=bucket, Key=clave)['Body'].read(), nuevos))
+
+    for clave, miembro in zip(nuevos, contenidos):
+        tenant_id, nombre = clave[len(prefijo):].split('/', 1)
+        indice['recibos'].append({
+            'clave': clave,
+            'tenant_id': unquote(tenant_id),
+            'uuid': unquote(nombre[:-len('.txt')]),
+            'inicio': datos.tell(),
+            'longitud': len(miembro)
+        })
+        datos.write(miembro)
+    indice['generado'] = datetime.now(timezone.utc).isoformat()
+    estadisticas.update(archivados=len(nuevos), repetidos=len(sueltos) - len(nuevos), bytes=datos.tell())
+
+    if nuevos:
+        # Primero los datos y después el índice: un índice siempre apunta a datos completos
+        datos.seek(0)
+        s3.upload_fileobj(datos, bucket, clave_datos, ExtraArgs={'ContentType': 'application/gzip'})
+        s3.put_object(Bucket=bucket, Key=clave_indice, ContentType='application/json',
+                      Body=json.dumps(indice, ensure_ascii=False).encode('utf-8'))
+
+    # Los sueltos ya están en el archivo: se borran en lotes de 1000
+    lotes = [sueltos[i:i + 1000] for i in range(0, len(sueltos), 1000)]
+    with ThreadPoolExecutor(max_workers=min(workers, len(lotes))) as pool:
+        list(pool.map(lambda lote: s3.delete_objects(
+            Bucket=bucket, Delete={'Objects': [{'Key': clave} for clave in lote], 'Quiet': True}), lotes))
+
+    estadisticas['duracion_ms'] = round((time.perf_counter() - inicio_ms) * 1000, 2)
+    return estadisticas
+
+def dias_con_sueltos(hasta, bucket=None):
+    """Días hasta `hasta` (inclusive) que tienen recibos sueltos, de más antiguo a más reciente."""
+    s3 = obtener_cliente('s3')
+    bucket = bucket or S3_BUCKET
+    dias = []
+    paginas = s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=f"{RECIBOS_PREFIJO}dia=", Delimiter='/')
+    for pagina in paginas:
+        for prefijo in pagina.get('CommonPrefixes', []):
+            dia = prefijo['Prefix'][len(f"{RECIBOS_PREFIJO}dia="):].rstrip('/')
+            if dia <= hasta:
+                dias.append(dia)
+    return sorted(dias)
+
+def archivar_recibos(event, context):
+    """
+    Job diario (archivarRecibos): archiva el día de hace RECIBOS_ARCHIVO_DIAS_ESPERA días
+    y los anteriores que todavía tengan recibos sueltos.
+    Invocado a mano acepta {"dia": "AAAA-MM-DD"} o {"dias": [...]}.
+    """
+    event = event or {}
+    dias = event.get('dias') or ([event['dia']] if event.get('dia') else None)
+    if not dias:
+        hasta = (datetime.now(ZONA_NEGOCIO) - timedelta(days=RECIBOS_ARCHIVO_DIAS_ESPERA)).strftime('%Y-%m-%d')
+        # El listado por prefijo común devuelve una entrada por día, no por recibo
+        dias = dias_con_sueltos(hasta) or [hasta]
+
+    resultados = []
+    for dia in dias:
+        estadisticas = archivar_dia(dia)
+        print(f"[Archivo Recibos] {estadisticas}")
+        resultados.append(estadisticas)
+    return {'statusCode': 200, 'body': json.dumps(resultados)}
@@ -0,0 +1,238 @@
+"""
+Planificador de consultas para pedidoFiltro.
+
+Elige el índice más selectivo de la tabla Pedidos según los filtros recibidos
+y solo recurre a un Scan cuando ningún índice aplica:
+  - EstadoFechaPedidoIndex: estado_pedido (HASH) + fecha_pedido (RANGE)
+  - DiaPedidoIndex:         dia_pedido (HASH)    + fecha_pedido (RANGE)
+  - DiaEntregaIndex:        dia_entrega (HASH)   + fecha_entrega (RANGE)
+
+Las fechas se guardan en ISO 8601 con zona (normalmente UTC). dia_pedido y
+dia_entrega son el día local del negocio (Lima, UTC-5 sin horario de verano), no
+el día UTC: un pedido de las 21:00 en Lima cae en su día aunque en UTC ya sea el
+siguiente. Los filtros por día usan el mismo día local y las fechas con hora sin
+zona se interpretan como hora local.
+"""
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from functools import reduce
+from boto3.dynamodb.conditions import Key, Attr
+from bembos_comun.paginacion import paginar
+
+INDICE_ESTADO = os.environ.get('PEDIDOS_INDICE_ESTADO', 'EstadoFechaPedidoIndex')
+INDICE_DIA_PEDIDO = os.environ.get('PEDIDOS_INDICE_DIA_PEDIDO', 'DiaPedidoIndex')
+INDICE_DIA_ENTREGA = os.environ.get('PEDIDOS_INDICE_DIA_ENTREGA', 'DiaEntregaIndex')
+# Rangos más largos que esto no se reparten por particiones diarias
+MAX_DIAS_INDICE = int(os.environ.get('PEDIDOS_MAX_DIAS_INDICE', '31'))
+# Tamaño estimado de una partición de estado sin rango de fechas, medido en días de pedidos
+COSTO_PARTICION_ESTADO = float(os.environ.get('PEDIDOS_COSTO_ESTADO', '14'))
+# Desfase fijo de la zona del negocio (America/Lima no tiene horario de verano)
+ZONA_NEGOCIO = timezone(timedelta(hours=float(os.environ.get('PEDIDOS_UTC_OFFSET_HORAS', '-5'))))
+
+CLAVES_TABLA = ('tenant_id', 'uuid')
+
+# '~' ordena después de cualquier sufijo ISO (fracción, "Z", "+00:00"): cierra el rango de un día
+FIN_DE_DIA = '~'
+
+# campo de fecha -> (atributo con el día, índice diario)
+CAMPOS_FECHA = {
+    'fecha_pedido': ('dia_pedido', INDICE_DIA_PEDIDO),
+    'fecha_entrega': ('dia_entrega', INDICE_DIA_ENTREGA)
+}
+
+def dia_negocio(valor):
+    """Día local del negocio (YYYY-MM-DD) de una fecha ISO; sin zona se toma como hora local."""
+    try:
+        momento = datetime.fromisoformat(valor)
+    except ValueError:
+        return valor[:10]
+    if momento.tzinfo is None:
+        return momento.date().isoformat()
+    return momento.astimezone(ZONA_NEGOCIO).date().isoformat()
+
+def agregar_atributos_indice(item):
+    """Completa dia_pedido / dia_entrega (día local, YYYY-MM-DD) a partir de las fechas ISO del pedido."""
+    for campo, (atributo_dia, _) in CAMPOS_FECHA.items():
+        valor = item.get(campo)
+        if isinstance(valor, str) and len(valor) >= 10:
+            item[atributo_dia] = dia_negocio(valor)
+    return item
+
+def _extremo_utc(valor, final):
+    """
+    Extremo de un rango como texto comparable con las fechas guardadas: hora UTC sin
+    sufijo de zona, así "…T20:00:00" queda antes de "…T20:00:00Z" y de "…T20:00:00+00:00".
+    Un día sin hora abarca el día local completo; el extremo final se cierra con FIN_DE_DIA.
+    """
+    try:
+        if len(valor) == 10:
+            momento = datetime.combine(date.fromisoformat(valor), time(), ZONA_NEGOCIO)
+            if final:
+                momento += timedelta(days=1) - timedelta(microseconds=1)
+        else:
+            momento = datetime.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f"fecha inválida: {valor}")
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=ZONA_NEGOCIO)
+    texto = momento.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+    return texto + FIN_DE_DIA if final else texto
+
+def leer_rango(params, campo):
+    """
+    Devuelve (desde, hasta) para un campo de fecha, en UTC, o None si no se filtra por él.
+    Acepta `campo` (igualdad; una fecha sin hora equivale al día local completo y una
+    hora, a ese instante en cualquiera de los formatos ISO guardados)
+    y `campo_desde` / `campo_hasta` (rango, extremos opcionales).
+    """
+    exacto = params.get(campo)
+    if exacto:
+        return (_extremo_utc(exacto, False), _extremo_utc(exacto, True))
+
+    desde = params.get(f'{campo}_desde')
+    hasta = params.get(f'{campo}_hasta')
+    if not desde and not hasta:
+        return None
+    return (desde and _extremo_utc(desde, False), hasta and _extremo_utc(hasta, True))
+
+def condicion_rango(constructor, campo, rango):
+    desde, hasta = rango
+    if desde == hasta:
+        return constructor(campo).eq(desde)
+    if desde and hasta:
+        return constructor(campo).between(desde, hasta)
+    if desde:
+        return constructor(campo).gte(desde)
+    return constructor(campo).lte(hasta)
+
+def dias_del_rango(rango):
+    """Días locales (YYYY-MM-DD) que cubre el rango UTC, o None si no está acotado o es demasiado largo."""
+    desde, hasta = rango
+    if not desde or not hasta:
+        return None
+
+    def dia(extremo):
+        momento = datetime.fromisoformat(extremo.rstrip(FIN_DE_DIA)).replace(tzinfo=timezone.utc)
+        return momento.astimezone(ZONA_NEGOCIO).date()
+
+    inicio = dia(desde)
+    fin = dia(hasta)
+    if fin < inicio:
+        return []
+
+    total = (fin - inicio).days + 1
+    if total > MAX_DIAS_INDICE:
+        return None
+    return [(inicio + timedelta(days=i)).isoformat() for i in range(total)]
+
+def planificar(params):
+    """
+    Devuelve el plan más barato para los filtros:
+      { tipo, indice, particiones: [(atributo, valor)], campo_rango, rango, filtro, costo }
+    """
+    estado = params.get('estado_pedido')
+    rangos = {campo: leer_rango(params, campo) for campo in CAMPOS_FECHA}
+    candidatos = []
+
+    if estado:
+        rango_pedido = rangos['fecha_pedido']
+        candidatos.append({
+            'tipo': 'query',
+            'indice': INDICE_ESTADO,
+            'particiones': [('estado_pedido', estado)],
+            'campo_rango': 'fecha_pedido' if rango_pedido else None,
+            # Estado + rango de fechas acota por ambos lados: siempre es el más selectivo
+            'costo': 0.5 if rango_pedido else COSTO_PARTICION_ESTADO
+        })
+
+    for campo, (atributo_dia, indice) in CAMPOS_FECHA.items():
+        if not rangos[campo]:
+            continue
+        dias = dias_del_rango(rangos[campo])
+        if dias is None:
+            continue
+        candidatos.append({
+            'tipo': 'query',
+            'indice': indice,
+            'particiones': [(atributo_dia, dia) for dia in dias],
+            'campo_rango': campo,
+            'costo': float(len(dias))
+        })
+
+    if candidatos:
+        plan = min(candidatos, key=lambda c: c['costo'])
+    else:
+        plan = {'tipo': 'scan', 'indice': None, 'particiones': [], 'campo_rango': None, 'costo': None}
+
+    # Lo que no resuelve la condición de clave se aplica como FilterExpression
+    condiciones = []
+    if estado and plan['indice'] != INDICE_ESTADO:
+        condiciones.append(Attr('estado_pedido').eq(estado))
+    for campo, rango in rangos.items():
+        if rango and campo != plan['campo_rango']:
+            condiciones.append(condicion_rango(Attr, campo, rango))
+
+    plan['rango'] = rangos[plan['campo_rango']] if plan['campo_rango'] else None
+    plan['filtro'] = reduce(lambda a, b: a & b, condiciones) if condiciones else None
+    return plan
+
+def claves_del_plan(plan):
+    """Atributos que forman el cursor de cada llamada: claves de la tabla + del índice."""
+    claves = list(CLAVES_TABLA)
+    if plan['indice'] == INDICE_ESTADO:
+        claves += ['estado_pedido', 'fecha_pedido']
+    elif plan['indice']:
+        claves += [plan['particiones'][0][0], plan['campo_rango']]
+    return claves
+
+def ejecutar_plan(tabla, plan, limite, cursor=None):
+    """
+    Ejecuta el plan devolviendo como máximo `limite` pedidos.
+    Orden estable: particiones en orden de fecha y, dentro de cada una, por la clave de rango.
+    `cursor` es {'p': índice de la partición, 'k': ExclusiveStartKey} de la página anterior.
+    Devuelve (items, items_leidos, cursor_siguiente | None).
+    """
+    if plan['tipo'] == 'scan':
+        llamadas = [(tabla.scan, {})]
+    else:
+        llamadas = []
+        for atributo, valor in plan['particiones']:
+            condicion = Key(atributo).eq(valor)
+            if plan['rango']:
+                condicion = condicion & condicion_rango(Key, plan['campo_rango'], plan['rango'])
+            llamadas.append((tabla.query, {'IndexName': plan['indice'], 'KeyConditionExpression': condicion}))
+
+    claves = claves_del_plan(plan)
+    inicio = cursor.get('p', 0) if cursor else 0
+    exclusive_start_key = cursor.get('k') if cursor else None
+
+    items = []
+    items_leidos = 0
+
+    for posicion in range(inicio, len(llamadas)):
+        operacion, kwargs = llamadas[posicion]
+        if plan['filtro'] is not None:
+            kwargs['FilterExpression'] = plan['filtro']
+
+        pagina, last_evaluated_key, leidos = paginar(
+            operacion, kwargs, limite - len(items), claves, exclusive_start_key
+        )
+        exclusive_start_key = None
+        items.extend(pagina)
+        items_leidos += leidos
+
+        if last_evaluated_key:
+            return items, items_leidos, {'p': posicion, 'k': last_evaluated_key}
+        if len(items) >= limite:
+            siguiente = {'p': posicion + 1} if posicion + 1 < len(llamadas) else None
+            return items, items_leidos, siguiente
+
+    return items, items_leidos, None
+
+def describir_plan(plan):
+    return {
+        'tipo': plan['tipo'],
+        'indice': plan['indice'],
+        'particiones': len(plan['particiones']),
+        'costo_estimado': plan['costo']
+    }
@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Máximo de post_to_connection simultáneos por difusión
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', '16'))
+
+ENVIADO = 'enviado'
+CAIDO = 'caido'
+FALLIDO = 'fallido'
+
+def difundir(apigateway_client, connection_ids, data, connections_table=None, max_workers=None):
+    """
+    Envía `data` a todas las conexiones en paralelo con un pool acotado de hilos.
+    Las conexiones que responden GoneException se eliminan al final con BatchWriteItem.
+    Devuelve las estadísticas de la difusión:
+      { enviados, caidos, fallidos, duracion_ms, conexiones_caidas }
+    """
+    inicio = time.perf_counter()
+    estadisticas = {
+        'enviados': 0,
+        'caidos': 0,
+        'fallidos': 0,
+        'duracion_ms': 0.0,
+        'conexiones_caidas': []
+    }
+
+    if not connection_ids:
+        return estadisticas
+
+    gone_exception = apigateway_client.exceptions.GoneException
+
+    def enviar(connection_id):
+        try:
+            apigateway_client.post_to_connection(ConnectionId=connection_id, Data=data)
+            return ENVIADO
+        except gone_exception:
+            return CAIDO
+        except Exception as e:
+            print(f"[Error Fanout] No se pudo enviar a {connection_id}: {e}")
+            return FALLIDO
+
+    workers = max(1, min(max_workers or FANOUT_MAX_WORKERS, len(connection_ids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resultados = list(pool.map(enviar, connection_ids))
+
+    for connection_id, resultado in zip(connection_ids, resultados):
+        if resultado == ENVIADO:
+            estadisticas['enviados'] += 1
+        elif resultado == CAIDO:
+            estadisticas['caidos'] += 1
+            estadisticas['conexiones_caidas'].append(connection_id)
+        else:
+            estadisticas['fallidos'] += 1
+
+    if estadisticas['conexiones_caidas'] and connections_table is not None:
+        try:
+            limpiar_conexiones(connections_table, estadisticas['conexiones_caidas'])
+        except Exception as e:
+            print(f"[Error Fanout] No se pudieron limpiar las conexiones caídas: {e}")
+
+    estadisticas['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    return estadisticas
+
+def limpiar_conexiones(connections_table, connection_ids):
+    """Borra las conexiones caídas en lotes de 25 (BatchWriteItem reintenta los no procesados)."""
+    with connections_table.batch_writer(overwrite_by_pkeys=['connectionId']) as batch:
+        for connection_id in connection_ids:
+            batch.delete_item(Key={'connectionId': connection_id})
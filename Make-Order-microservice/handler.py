@@ -1,46 +1,100 @@
+import hashlib
 import json
 import os
 import random
-import boto3
+import time
 from decimal import Decimal
-from datetime import datetime, timezone
-import mercadopago
+from datetime import datetime, timezone, timedelta
 import uuid
+# Este módulo aloja todas las funciones del servicio: boto3, el SDK de Mercado Pago
+# y los módulos auxiliares se importan dentro de la función que los usa, para que
+# un arranque en frío solo pague lo que necesita su entry point
+# (benchmarks/presupuesto_imports.py controla el presupuesto por función).
+from bembos_comun.aws import obtener_cliente, obtener_tabla
+from bembos_comun.serializacion import dumps, dumps_bytes, loads
+from bembos_comun.paginacion import codificar_token, decodificar_token, leer_limite, paginar
 
 PEDIDO_TABLE = os.environ.get('PEDIDO_TABLE')
 CONNECTIONS_TABLE = os.environ.get('CONNECTIONS_TABLE')
-dynamodb = boto3.resource('dynamodb')
-
-def convert_floats_to_decimal(obj):
-    if isinstance(obj, list):
-        return [convert_floats_to_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_floats_to_decimal(value) for key, value in obj.items()}
-    elif isinstance(obj, float):
-        return Decimal(str(obj))
-    else:
-        return obj
-
-def convert_decimal_to_float(obj):
-    if isinstance(obj, list):
-        return [convert_decimal_to_float(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_decimal_to_float(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj 
+CONNECTIONS_ROLE_INDEX = os.environ.get('CONNECTIONS_ROLE_INDEX', 'RoleTenantIndex')
+# Segundos que un contenedor caliente reutiliza la lista de conexiones por rol
+CONNECTIONS_CACHE_TTL = float(os.environ.get('CONNECTIONS_CACHE_TTL', '5'))
+TENANT_GLOBAL = 'GLOBAL'
+PEDIDOS_FILTRO_LIMITE = int(os.environ.get('PEDIDOS_FILTRO_LIMITE', '100'))
+PEDIDOS_FILTRO_LIMITE_MAX = int(os.environ.get('PEDIDOS_FILTRO_LIMITE_MAX', '500'))
+PEDIDOS_EMAIL_INDEX = os.environ.get('PEDIDOS_EMAIL_INDEX', 'ClienteEmailIndex')
+PEDIDOS_EMAIL_LIMITE = int(os.environ.get('PEDIDOS_EMAIL_LIMITE', '50'))
+PEDIDOS_EMAIL_LIMITE_MAX = int(os.environ.get('PEDIDOS_EMAIL_LIMITE_MAX', '100'))
+# fecha_creacion para pedidos antiguos que no tienen ni fecha_creacion ni fecha_pedido
+BACKFILL_FECHA_DEFECTO = '1970-01-01T00:00:00+00:00'
+# Webhook de MP: "cola" responde al instante y procesa en procesar_webhooks; "sincrono" procesa en la petición
+WEBHOOK_MODO = os.environ.get('WEBHOOK_MODO', 'cola')
+WEBHOOKS_QUEUE_URL = os.environ.get('WEBHOOKS_QUEUE_URL')
+
+# clave role_tenant -> (expira_monotonic, [connectionId, ...])
+_cache_conexiones = {}
+
+def clave_rol_tenant(role, tenant_id=None):
+    return f"{role}#{tenant_id or TENANT_GLOBAL}"
+
+def obtener_conexiones_por_rol(connections_table, role, tenant_id=None):
+    """
+    Devuelve los connectionId registrados para un rol usando el índice RoleTenantIndex.
+    Incluye las conexiones globales del rol y, si se indica, las del tenant.
+    El resultado se guarda en memoria durante CONNECTIONS_CACHE_TTL segundos.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    claves = [clave_rol_tenant(role)]
+    if tenant_id and tenant_id != TENANT_GLOBAL:
+        claves.append(clave_rol_tenant(role, tenant_id))
+
+    connection_ids = []
+    ahora = time.monotonic()
+
+    for clave in claves:
+        cacheado = _cache_conexiones.get(clave)
+        if cacheado and cacheado[0] > ahora:
+            connection_ids.extend(cacheado[1])
+            continue
+
+        ids = []
+        query_kwargs = {
+            'IndexName': CONNECTIONS_ROLE_INDEX,
+            'KeyConditionExpression': Key('role_tenant').eq(clave),
+            'ProjectionExpression': 'connectionId'
+        }
+        response = connections_table.query(**query_kwargs)
+        ids.extend(item['connectionId'] for item in response.get('Items', []))
+
+        while 'LastEvaluatedKey' in response:
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            response = connections_table.query(**query_kwargs)
+            ids.extend(item['connectionId'] for item in response.get('Items', []))
+
+        _cache_conexiones[clave] = (ahora + CONNECTIONS_CACHE_TTL, ids)
+        connection_ids.extend(ids)
+
+    return connection_ids
+
+def olvidar_conexion(connection_id):
+    """Quita una conexión de la caché en memoria (desconexión o GoneException)."""
+    for clave, (expira, ids) in list(_cache_conexiones.items()):
+        if connection_id in ids:
+            _cache_conexiones[clave] = (expira, [c for c in ids if c != connection_id])
 
 def transmitir(event, message_payload_dict):
+    from fanout import difundir
+
     try:
-        connections_table = dynamodb.Table(CONNECTIONS_TABLE)
+        connections_table = obtener_tabla(CONNECTIONS_TABLE)
     except Exception as e:
         print(f"[Error Transmitir] No se pudieron cargar las tablas: {e}")
         return
     
     try:
         endpoint_url = f"https://{event['requestContext']['domainName']}/{event['requestContext']['stage']}"
-        apigateway_client = boto3.client('apigatewaymanagementapi', endpoint_url=endpoint_url)
+        apigateway_client = obtener_cliente('apigatewaymanagementapi', endpoint_url=endpoint_url)
     except KeyError:
         print(f"[Error Transmitir] El evento no tiene 'requestContext' para el endpoint_url.")
         return
@@ -52,38 +106,26 @@ def transmitir(event, message_payload_dict):
         return
 
     try:
-        response = connections_table.scan(ProjectionExpression='connectionId, #r',ExpressionAttributeNames={'#r': 'role'})
-        connections = response.get('Items', [])
+        chef_connections = obtener_conexiones_por_rol(connections_table, 'CHEF', pedido_data.get('tenant_id'))
     except Exception as e:
-        print(f"[Error Transmitir] Fallo al escanear la tabla de conexiones: {e}")
+        print(f"[Error Transmitir] Fallo al consultar las conexiones de chefs: {e}")
         return
 
-    print(f"Encontradas {len(connections)} conexiones para evaluar.")
+    print(f"Encontradas {len(chef_connections)} conexiones de chefs.")
     
-    message_payload_str = json.dumps(message_payload_dict)
-    chefs_found = 0
+    message_payload_bytes = dumps_bytes(message_payload_dict)
 
-    for connection in connections:
-        connection_id = connection['connectionId']
-        user_role = connection.get('role', 'CLIENTE')
-        
-        if user_role == 'CHEF':
-            chefs_found += 1
-            try:
-                apigateway_client.post_to_connection(
-                    ConnectionId=connection_id,
-                    Data=message_payload_str.encode('utf-8')
-                )
-                print(f"[Info Transmitir] Pedido enviado a chef: {connection_id}")
-            except apigateway_client.exceptions.GoneException:
-                print(f"[Info Transmitir] Conexión de chef muerta {connection_id}. Limpiando.")
-                connections_table.delete_item(Key={'connectionId': connection_id})
-            except Exception as e:
-                print(f"[Error Transmitir] No se pudo enviar a chef {connection_id}: {e}")
-        else:
-            print(f"[Info Transmitir] Saltando conexión {connection_id} - Rol: {user_role} (no es chef)")
+    estadisticas = difundir(apigateway_client, chef_connections, message_payload_bytes, connections_table)
+
+    for connection_id in estadisticas['conexiones_caidas']:
+        olvidar_conexion(connection_id)
     
-    print(f"[Info Transmitir] Pedido transmitido a {chefs_found} chefs conectados.")
+    print(
+        f"[Info Transmitir] Pedido transmitido a {estadisticas['enviados']} chefs "
+        f"(caídos: {estadisticas['caidos']}, fallidos: {estadisticas['fallidos']}, "
+        f"{estadisticas['duracion_ms']} ms)"
+    )
+    return estadisticas
 
 def connection_manager(event, context):
     connection_id = event['requestContext']['connectionId']
@@ -95,15 +137,23 @@ def connection_manager(event, context):
         print("Error: CONNECTIONS_TABLE no está definida en las variables de entorno.")
         return {'statusCode': 500, 'body': 'Error de configuración del servidor.'}
         
-    table = dynamodb.Table(CONNECTIONS_TABLE)
+    table = obtener_tabla(CONNECTIONS_TABLE)
 
     if route_key == '$connect':
         try:
-            
+            role = query_params.get('role', 'CLIENTE').upper()
+            tenant_id = query_params.get('tenant_id') or TENANT_GLOBAL
+            ahora = datetime.now(timezone.utc)
+
             item = {
                 'connectionId': connection_id,
-                'role': query_params.get('role', 'CLIENTE'),
-                'connectTime': datetime.now(timezone.utc).isoformat()
+                'role': role,
+                'tenant_id': tenant_id,
+                # Clave del índice RoleTenantIndex, p. ej. "CHEF#GLOBAL"
+                'role_tenant': clave_rol_tenant(role, tenant_id),
+                'connectTime': ahora.isoformat(),
+                # Las conexiones WebSocket duran como máximo 2 horas; el TTL limpia las huérfanas
+                'expira_en': int((ahora + timedelta(hours=3)).timestamp())
             }
 
             table.put_item(Item=item)
@@ -119,6 +169,7 @@ def connection_manager(event, context):
             table.delete_item(
                 Key={'connectionId': connection_id}
             )
+            olvidar_conexion(connection_id)
             print(f"Conexión eliminada: {connection_id}")
             
             return {'statusCode': 200, 'body': 'Desconectado.'}
@@ -137,78 +188,57 @@ def default_handler(event, context):
     }
 
 def pedidoFiltro(event, context):
+    from consultas_pedidos import planificar, ejecutar_plan, describir_plan
+
     print(f"pedidoFiltro invocado. Evento: {event}")
     
     try:
         query_params = event.get('queryStringParameters', {}) or {}
         
-        # Parámetros de filtro
-        fecha_pedido = query_params.get('fecha_pedido')
-        estado_pedido = query_params.get('estado_pedido')
-        fecha_entrega = query_params.get('fecha_entrega')
-        
-        # Construir el filtro de DynamoDB
-        filter_expression = None
-        expression_attribute_names = {}
-        expression_attribute_values = {}
-        
-        conditions = []
-        
-        # Filtro por fecha_pedido
-        if fecha_pedido:
-            conditions.append('#fecha_pedido = :fecha_pedido')
-            expression_attribute_names['#fecha_pedido'] = 'fecha_pedido'
-            expression_attribute_values[':fecha_pedido'] = fecha_pedido
-        
-        # Filtro por estado_pedido
-        if estado_pedido:
-            conditions.append('#estado_pedido = :estado_pedido')
-            expression_attribute_names['#estado_pedido'] = 'estado_pedido'
-            expression_attribute_values[':estado_pedido'] = estado_pedido
-        
-        # Filtro por fecha_entrega
-        if fecha_entrega:
-            conditions.append('#fecha_entrega = :fecha_entrega')
-            expression_attribute_names['#fecha_entrega'] = 'fecha_entrega'
-            expression_attribute_values[':fecha_entrega'] = fecha_entrega
-        
-        # Combinar condiciones con AND
-        if conditions:
-            filter_expression = ' AND '.join(conditions)
-        
-        pedidos_table = dynamodb.Table(PEDIDO_TABLE)
-        
-        scan_kwargs = {}
-        if filter_expression:
-            scan_kwargs['FilterExpression'] = filter_expression
-            scan_kwargs['ExpressionAttributeNames'] = expression_attribute_names
-            scan_kwargs['ExpressionAttributeValues'] = expression_attribute_values
-        
-        response = pedidos_table.scan(**scan_kwargs)
-        pedidos_filtrados = response.get('Items', [])
-        
-        while 'LastEvaluatedKey' in response:
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
-            response = pedidos_table.scan(**scan_kwargs)
-            pedidos_filtrados.extend(response.get('Items', []))
-        
-        # Convertir Decimals a floats para respuesta JSON
-        pedidos_for_response = convert_decimal_to_float(pedidos_filtrados)
+        # Parámetros de filtro (las fechas aceptan además _desde / _hasta)
+        filtros_aplicados = {
+            nombre: query_params.get(nombre)
+            for nombre in (
+                'fecha_pedido', 'fecha_pedido_desde', 'fecha_pedido_hasta',
+                'estado_pedido',
+                'fecha_entrega', 'fecha_entrega_desde', 'fecha_entrega_hasta'
+            )
+        }
+
+        # Huella de los filtros: un next_token solo vale para la misma consulta
+        huella_filtros = hashlib.sha256(json.dumps(filtros_aplicados, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+        try:
+            plan = planificar(filtros_aplicados)
+            limite = leer_limite(query_params, defecto=PEDIDOS_FILTRO_LIMITE, maximo=PEDIDOS_FILTRO_LIMITE_MAX)
+            cursor = decodificar_token(query_params.get('next_token'))
+            if cursor and cursor.get('f') != huella_filtros:
+                raise ValueError('next_token no corresponde a estos filtros')
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps(f'Parámetros inválidos en los filtros: {str(e)}')
+            }
+
+        pedidos_table = obtener_tabla(PEDIDO_TABLE)
+        pedidos_filtrados, items_leidos, cursor_siguiente = ejecutar_plan(pedidos_table, plan, limite, cursor)
+        if cursor_siguiente:
+            cursor_siguiente['f'] = huella_filtros
         
-        print(f"Pedidos filtrados encontrados: {len(pedidos_filtrados)}")
+        print(f"Pedidos filtrados encontrados: {len(pedidos_filtrados)} (leídos: {items_leidos}, plan: {describir_plan(plan)})")
         
         # Devolver resultados directamente en la respuesta HTTP (no transmitir por WebSocket)
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': dumps({
                 "message": "Filtro de pedidos aplicado exitosamente",
                 "total_encontrados": len(pedidos_filtrados),
-                "filtros_aplicados": {
-                    "fecha_pedido": fecha_pedido,
-                    "estado_pedido": estado_pedido,
-                    "fecha_entrega": fecha_entrega
-                },
-                "pedidos": pedidos_for_response,
+                "filtros_aplicados": filtros_aplicados,
+                "plan": describir_plan(plan),
+                "items_leidos": items_leidos,
+                "items_devueltos": len(pedidos_filtrados),
+                "pedidos": pedidos_filtrados,
+                "next_token": codificar_token(cursor_siguiente),
                 "timestamp": datetime.now(timezone.utc).isoformat()
             })
         }
@@ -220,8 +250,44 @@ def pedidoFiltro(event, context):
             'body': json.dumps(f'Error interno del servidor procesando el filtro: {str(e)}')
         }
 
+def guardar_pedido_pendiente(table, item_db, preference_id, fecha_creacion):
+    """
+    Crea el pedido en PENDIENTE_PAGO o, si ya existe, solo refresca preference_id y
+    fecha_creacion. Un put condicional resuelve el caso normal (pedido nuevo) en un
+    solo round trip y sin ventana de carrera entre la lectura y la escritura.
+    """
+    item_db = dict(item_db, preference_id=preference_id, fecha_creacion=fecha_creacion)
+    try:
+        table.put_item(
+            Item=item_db,
+            ConditionExpression='attribute_not_exists(#uuid)',
+            ExpressionAttributeNames={'#uuid': 'uuid'}
+        )
+        print(f"Pedido guardado en DynamoDB (PENDIENTE_PAGO): {item_db['uuid']}")
+        return 'creado'
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+    print(f"[Warning] Pedido ya existe: tenant_id={item_db['tenant_id']}, uuid={item_db['uuid']}")
+    table.update_item(
+        Key={
+            'tenant_id': item_db['tenant_id'],
+            'uuid': item_db['uuid']
+        },
+        UpdateExpression="set preference_id = :pref_id, fecha_creacion = :fecha",
+        ExpressionAttributeValues={
+            ':pref_id': preference_id,
+            ':fecha': fecha_creacion
+        }
+    )
+    print(f"Pedido actualizado con nueva preferencia: {preference_id}")
+    return 'actualizado'
+
 def pagarPedido(event, context):
-    
+    from mp_cliente import obtener_sdk
+    from preferencias_cache import huella_pedido, buscar_preferencia, guardar_preferencia
+    from consultas_pedidos import agregar_atributos_indice
+
     ACCESS_TOKEN = os.environ.get("ACCESS_TOKEN")
     
     if not ACCESS_TOKEN:
@@ -230,7 +296,7 @@ def pagarPedido(event, context):
             'body': json.dumps("Error del Servidor: Falta configuración (ACCESS_TOKEN)")
         }
 
-    sdk = mercadopago.SDK(ACCESS_TOKEN)
+    sdk = obtener_sdk(ACCESS_TOKEN)
     
     try:
         rc = event.get('requestContext', {})
@@ -248,9 +314,10 @@ def pagarPedido(event, context):
         print(f"Webhook URL generada: {webhook_url}")
 
         body_str = event.get('body', '{}')
-        body = json.loads(body_str) if isinstance(body_str, str) else body_str
+        # Los precios quedan como Decimal, listos para DynamoDB
+        body = loads(body_str)
 
-        print(f"Payload del Pedido: {json.dumps(body)}")
+        print(f"Payload del Pedido: {dumps(body)}")
 
         # 3. LÓGICA DE CÁLCULO DE PRECIO
         total_a_cobrar = 0.0
@@ -324,6 +391,21 @@ def pagarPedido(event, context):
             "notification_url": webhook_url, 
         }
 
+        # Reintentos / doble clic con el mismo contenido: reutilizar la preferencia vigente
+        huella = huella_pedido(elementos, client_email)
+        preferencia_previa = buscar_preferencia(tenant_id, uuid_val, huella)
+        if preferencia_previa:
+            print(f"Preferencia reutilizada desde la caché: {preferencia_previa['preference_id']}")
+            return {
+                'statusCode': 200,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({
+                    "message": "Link generado",
+                    "sandbox_init_point": preferencia_previa['sandbox_init_point'],
+                    "preference_id": preferencia_previa['preference_id']
+                })
+            }
+
         preference_response = sdk.preference().create(preference_data)
         mp_response = preference_response["response"]
         
@@ -340,48 +422,20 @@ def pagarPedido(event, context):
 
         if PEDIDO_TABLE:
             try:
-                table = dynamodb.Table(PEDIDO_TABLE)
-                
-                # Validar si ya existe el pedido con el mismo tenant_id y uuid
-                try:
-                    existing_item = table.get_item(
-                        Key={
-                            'tenant_id': tenant_id,
-                            'uuid': str(uuid_val)
-                        }
-                    )
-                    
-                    if 'Item' in existing_item:
-                        print(f"[Warning] Pedido ya existe: tenant_id={tenant_id}, uuid={str(uuid_val)}")
-                        # Actualizar solo el preference_id y fecha si ya existe
-                        table.update_item(
-                            Key={
-                                'tenant_id': tenant_id,
-                                'uuid': str(uuid_val)
-                            },
-                            UpdateExpression="set preference_id = :pref_id, fecha_creacion = :fecha",
-                            ExpressionAttributeValues={
-                                ':pref_id': preference_id,
-                                ':fecha': datetime.now(timezone.utc).isoformat()
-                            }
-                        )
-                        print(f"Pedido actualizado con nueva preferencia: {preference_id}")
-                    else:
-                        # No existe, crear nuevo item
-                        item_db = json.loads(json.dumps(body), parse_float=Decimal)
-                        
-                        item_db["estado_pedido"] = "PENDIENTE_PAGO"
-                        item_db["preference_id"] = preference_id
-                        item_db["fecha_creacion"] = datetime.now(timezone.utc).isoformat()
-                        item_db["uuid"] = str(uuid_val)
-                        item_db["precio_total"] = Decimal(str(total_a_cobrar))
-
-                        table.put_item(Item=item_db)
-                        print(f"Pedido guardado en DynamoDB (PENDIENTE_PAGO): {str(uuid_val)}")
-                        
-                except Exception as db_error:
-                    print(f"Error en operación DynamoDB: {str(db_error)}")
-                    
+                table = obtener_tabla(PEDIDO_TABLE)
+
+                item_db = dict(body)
+                item_db["estado_pedido"] = "PENDIENTE_PAGO"
+                item_db["tenant_id"] = tenant_id
+                item_db["uuid"] = str(uuid_val)
+                item_db["precio_total"] = Decimal(str(total_a_cobrar))
+                agregar_atributos_indice(item_db)
+
+                guardar_pedido_pendiente(table, item_db, preference_id, datetime.now(timezone.utc).isoformat())
+
+                # Solo se cachea una preferencia que quedó asociada al pedido
+                guardar_preferencia(tenant_id, uuid_val, huella, preference_id, sandbox_init_point)
+
             except Exception as e:
                 print(f"Error general guardando en DynamoDB: {str(e)}")
 
@@ -403,6 +457,8 @@ def pagarPedido(event, context):
         }
 
 def obtenerPedidosPorEmail(event, context):
+    from boto3.dynamodb.conditions import Key
+
     print(f"obtenerPedidosPorEmail invocado. Evento: {event}")
     
     try:
@@ -418,38 +474,43 @@ def obtenerPedidosPorEmail(event, context):
                 'body': json.dumps({'error': 'cliente_email es requerido en query parameters'})
             }
         
-        # Buscar pedidos por cliente_email
-        pedidos_table = dynamodb.Table(PEDIDO_TABLE)
-        
-        response = pedidos_table.scan(
-            FilterExpression='cliente_email = :email',
-            ExpressionAttributeValues={':email': cliente_email}
-        )
-        
-        pedidos_encontrados = response.get('Items', [])
+        try:
+            limite = leer_limite(query_params, defecto=PEDIDOS_EMAIL_LIMITE, maximo=PEDIDOS_EMAIL_LIMITE_MAX)
+            exclusive_start_key = decodificar_token(query_params.get('next_token'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': str(e)})
+            }
         
-        # Continuar escaneando si hay más elementos
-        while 'LastEvaluatedKey' in response:
-            response = pedidos_table.scan(
-                FilterExpression='cliente_email = :email',
-                ExpressionAttributeValues={':email': cliente_email},
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            pedidos_encontrados.extend(response.get('Items', []))
+        # Buscar pedidos por cliente_email en el índice, del más reciente al más antiguo
+        pedidos_table = obtener_tabla(PEDIDO_TABLE)
         
-        # Convertir Decimals a floats para respuesta JSON
-        pedidos_for_response = convert_decimal_to_float(pedidos_encontrados)
+        pedidos_encontrados, last_evaluated_key, _ = paginar(
+            pedidos_table.query,
+            {
+                'IndexName': PEDIDOS_EMAIL_INDEX,
+                'KeyConditionExpression': Key('cliente_email').eq(cliente_email),
+                'ScanIndexForward': False
+            },
+            limite,
+            ('tenant_id', 'uuid', 'cliente_email', 'fecha_creacion'),
+            exclusive_start_key
+        )
+        next_token = codificar_token(last_evaluated_key)
         
         print(f"Pedidos encontrados para {cliente_email}: {len(pedidos_encontrados)}")
         
         return {
             'statusCode': 200,
             'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'body': dumps({
                 "message": "Pedidos obtenidos exitosamente",
                 "cliente_email": cliente_email,
                 "total_pedidos": len(pedidos_encontrados),
-                "pedidos": pedidos_for_response,
+                "pedidos": pedidos_encontrados,
+                "next_token": next_token,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             })
         }
@@ -462,6 +523,70 @@ def obtenerPedidosPorEmail(event, context):
             'body': json.dumps({'error': f'Error interno del servidor: {str(e)}'})
         }
 
+def backfill_indices_pedidos(event, context):
+    """
+    Migración única: completa en los pedidos existentes los atributos que usan los
+    índices (fecha_creacion, dia_pedido, dia_entrega) y corrige los dia_* calculados
+    con el día UTC en vez del día local del negocio. Se invoca a mano y es reanudable:
+    si se acaba el tiempo devuelve next_token para volver a invocarla con {"next_token": ...}.
+    """
+    from consultas_pedidos import agregar_atributos_indice
+
+    pedidos_table = obtener_tabla(PEDIDO_TABLE)
+    scan_kwargs = {
+        'ProjectionExpression': 'tenant_id, #u, fecha_creacion, fecha_pedido, fecha_entrega, dia_pedido, dia_entrega',
+        'ExpressionAttributeNames': {'#u': 'uuid'}
+    }
+    exclusive_start_key = decodificar_token((event or {}).get('next_token'))
+    if exclusive_start_key:
+        scan_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    revisados = 0
+    actualizados = 0
+
+    while True:
+        response = pedidos_table.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            revisados += 1
+            faltantes = {}
+
+            if not item.get('fecha_creacion'):
+                faltantes['fecha_creacion'] = item.get('fecha_pedido') or BACKFILL_FECHA_DEFECTO
+            for atributo, valor in agregar_atributos_indice(dict(item)).items():
+                if atributo.startswith('dia_') and item.get(atributo) != valor:
+                    faltantes[atributo] = valor
+
+            if not faltantes:
+                continue
+
+            nombres = {f'#a{i}': atributo for i, atributo in enumerate(faltantes)}
+            valores = {f':v{i}': valor for i, valor in enumerate(faltantes.values())}
+            pedidos_table.update_item(
+                Key={'tenant_id': item['tenant_id'], 'uuid': item['uuid']},
+                UpdateExpression='SET ' + ', '.join(f'#a{i} = :v{i}' for i in range(len(faltantes))),
+                ExpressionAttributeNames=nombres,
+                ExpressionAttributeValues=valores
+            )
+            actualizados += 1
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+        scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        # Cortar con margen antes del timeout y devolver el punto de reanudación
+        if context and context.get_remaining_time_in_millis() < 5000:
+            print(f"[Backfill] Tiempo agotado, reanudar con next_token (revisados: {revisados})")
+            return {
+                'revisados': revisados,
+                'actualizados': actualizados,
+                'next_token': codificar_token(last_evaluated_key)
+            }
+
+    print(f"[Backfill] Completado: revisados {revisados}, actualizados {actualizados}")
+    return {'revisados': revisados, 'actualizados': actualizados, 'next_token': None}
+
 def obtenerPedidoPorId(event, context):
     print(f"obtenerPedidoPorId invocado. Evento: {event}")
     
@@ -480,7 +605,7 @@ def obtenerPedidoPorId(event, context):
             }
         
         # Buscar pedido por clave primaria
-        pedidos_table = dynamodb.Table(PEDIDO_TABLE)
+        pedidos_table = obtener_tabla(PEDIDO_TABLE)
         
         response = pedidos_table.get_item(
             Key={
@@ -502,19 +627,16 @@ def obtenerPedidoPorId(event, context):
         
         pedido = response['Item']
         
-        # Convertir Decimals a floats para respuesta JSON
-        pedido_for_response = convert_decimal_to_float(pedido)
-        
         print(f"Pedido encontrado: {tenant_id}/{uuid_pedido}")
         
         return {
             'statusCode': 200,
             'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'body': dumps({
                 "message": "Pedido obtenido exitosamente",
                 "tenant_id": tenant_id,
                 "uuid": uuid_pedido,
-                "pedido": pedido_for_response,
+                "pedido": pedido,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             })
         }
@@ -527,108 +649,226 @@ def obtenerPedidoPorId(event, context):
             'body': json.dumps({'error': f'Error interno del servidor: {str(e)}'})
         }
 
+class ErrorTransitorioPago(Exception):
+    """Fallo reintentable al procesar una notificación (MP caído, error de DynamoDB...)."""
+
+def leer_notificacion_webhook(event):
+    """
+    Extrae (payment_id, topic) de la notificación de Mercado Pago, ya sea del body
+    o de los query string parameters. Devuelve None si no hay nada que procesar.
+    """
+    body = {}
+    if 'body' in event and event['body']:
+        body_str = event['body']
+        body = json.loads(body_str) if isinstance(body_str, str) else body_str
+
+    payment_id = body.get("data", {}).get("id")
+    topic = body.get("type")
+
+    if not payment_id and event.get("queryStringParameters"):
+        qs = event["queryStringParameters"]
+        payment_id = qs.get("data.id") or qs.get("id")
+        topic = qs.get("type") or qs.get("topic")
+
+    if not payment_id:
+        return None
+    return str(payment_id), topic
+
+def procesar_notificacion_pago(payment_id, sdk, sns, sns_topic_arn):
+    """
+    Verifica el pago en MP y, si está aprobado, marca el pedido como PAGADO y avisa
+    a PedidosPagadosTopic. Devuelve el resultado del procesamiento; lanza
+    ErrorTransitorioPago cuando conviene reintentar la notificación.
+    """
+    import webhooks_dedup
+    from snapshot_pedido import serializar_mensaje
+
+    # Notificación repetida de un pago ya aprobado y procesado: ni siquiera se consulta MP
+    if webhooks_dedup.ya_procesado(payment_id, 'approved'):
+        return 'duplicado'
+
+    print(f"Verificando pago ID en MP: {payment_id}")
+
+    payment_info = sdk.payment().get(payment_id)
+
+    if payment_info["status"] != 200:
+        print(f"[Error MP API] Status: {payment_info['status']}")
+        if payment_info["status"] == 429 or payment_info["status"] >= 500:
+            raise ErrorTransitorioPago(f"MP respondió {payment_info['status']} para el pago {payment_id}")
+        return 'error_mp'
+
+    payment_data = payment_info["response"]
+    status = payment_data["status"]
+    external_ref_raw = payment_data.get("external_reference")
+
+    print(f"Estado del pago: {status}")
+
+    if status != "approved":
+        return 'no_aprobado'
+
+    try:
+        keys = json.loads(external_ref_raw)
+        tenant_id = keys.get("tenant_id")
+        uuid_pedido = keys.get("uuid")
+    except Exception:
+        print(f"[Error] external_reference inválida: {external_ref_raw}")
+        return 'referencia_invalida'
+
+    if not (PEDIDO_TABLE and tenant_id and uuid_pedido):
+        return 'sin_pedido'
+
+    # Otra notificación del mismo pago llegó antes: solo una marca PAGADO y publica en SNS
+    if not webhooks_dedup.reclamar(payment_id, status):
+        return 'duplicado'
+
+    table = obtener_tabla(PEDIDO_TABLE)
+
+    try:
+        response = table.update_item(
+            Key={
+                'tenant_id': tenant_id,
+                'uuid': uuid_pedido
+            },
+            UpdateExpression="set estado_pedido=:s",
+            ExpressionAttributeValues={
+                ':s': 'PAGADO',
+            },
+            ReturnValues="ALL_NEW"
+        )
+        print(f"DynamoDB actualizado: Pedido {uuid_pedido} -> PAGADO")
+
+        # Obtener datos del pedido actualizado
+        pedido_actualizado = response.get('Attributes', {})
+        cliente_email = pedido_actualizado.get('cliente_email')
+        cliente_nombre = pedido_actualizado.get('cliente_nombre')
+
+        # Enviar notificación a SNS para generar recibo y enviar email
+        if sns_topic_arn and cliente_email:
+            sns_message = {
+                'tenant_id': tenant_id,
+                'uuid': uuid_pedido,
+                'cliente_email': cliente_email,
+                'cliente_nombre': cliente_nombre or 'Cliente',
+                'payment_id': payment_id,
+                'evento': 'pedido_pagado'
+            }
+
+            # El pedido actualizado viaja en el mensaje: los consumidores no vuelven a leerlo
+            mensaje, con_snapshot = serializar_mensaje(sns_message, pedido_actualizado)
+
+            sns.publish(
+                TopicArn=sns_topic_arn,
+                Message=mensaje,
+                Subject=f'Pedido Pagado - {uuid_pedido}'
+            )
+            print(f"Notificación enviada a SNS para pedido: {uuid_pedido} (snapshot: {con_snapshot})")
+        else:
+            print(f"[Warning] No se pudo enviar a SNS - SNS_TOPIC_ARN: {sns_topic_arn}, cliente_email: {cliente_email}")
+
+    except Exception as e:
+        print(f"[Error Crítico DB] {str(e)}")
+        webhooks_dedup.liberar(payment_id, status)
+        raise ErrorTransitorioPago(str(e))
+
+    webhooks_dedup.confirmar(payment_id, status)
+    return 'pagado'
+
 def receiveWebhook(event, context):
+    """
+    Webhook de Mercado Pago. En modo "cola" (por defecto si WEBHOOKS_QUEUE_URL está
+    configurada) solo valida y encola la notificación para procesar_webhooks, así MP
+    recibe el 200 en milisegundos aunque su API o DynamoDB vayan lentos.
+    En modo "sincrono" procesa el pago dentro de la petición, como antes.
+    """
     print(f"[receiveWebhook] Evento recibido: {json.dumps(event)}")
 
     ACCESS_TOKEN = os.environ.get("ACCESS_TOKEN")
-    SNS_TOPIC_ARN = os.environ.get("SNS_TOPIC_ARN")
 
     if not ACCESS_TOKEN:
         print("[Error] Falta configuración ACCESS_TOKEN")
         return {'statusCode': 500, 'body': "Error de configuración"}
 
-    sdk = mercadopago.SDK(ACCESS_TOKEN)
-    sns = boto3.client('sns')
-    
     try:
-        body = {}
-        if 'body' in event and event['body']:
-            body_str = event['body']
-            body = json.loads(body_str) if isinstance(body_str, str) else body_str
-
-        payment_id = body.get("data", {}).get("id")
-        topic = body.get("type")
-
-        if not payment_id and event.get("queryStringParameters"):
-            qs = event["queryStringParameters"]
-            payment_id = qs.get("data.id") or qs.get("id")
-            topic = qs.get("type") or qs.get("topic")
+        notificacion = leer_notificacion_webhook(event)
+    except Exception as e:
+        # Body ilegible: reenviarlo no lo arregla
+        print(f"[Error Handler Webhook] Notificación inválida: {str(e)}")
+        return {'statusCode': 200, 'body': 'Ignored/OK'}
+    if notificacion is None:
+        return {'statusCode': 200, 'body': 'Ignored/OK'}
+    payment_id, topic = notificacion
+
+    if WEBHOOK_MODO == 'cola' and WEBHOOKS_QUEUE_URL:
+        try:
+            obtener_cliente('sqs').send_message(
+                QueueUrl=WEBHOOKS_QUEUE_URL,
+                MessageBody=json.dumps({
+                    'payment_id': payment_id,
+                    'topic': topic,
+                    'recibido_en': int(time.time())
+                })
+            )
+        except Exception as e:
+            # Sin encolar la notificación se perdería: un 5xx hace que MP la reenvíe
+            print(f"[Error Handler Webhook] No se pudo encolar el pago {payment_id}: {str(e)}")
+            return {'statusCode': 500, 'body': 'Error encolando el webhook'}
+        print(f"Notificación encolada para el pago: {payment_id}")
+        return {'statusCode': 200, 'body': 'Webhook encolado'}
 
-        if topic != "payment" and topic != "payment_created": 
-            if not payment_id:
-                return {'statusCode': 200, 'body': 'Ignored/OK'}
+    # Modo síncrono: solo aquí hace falta el SDK de Mercado Pago
+    from mp_cliente import obtener_sdk
 
-        print(f"Verificando pago ID en MP: {payment_id}")
+    try:
+        resultado = procesar_notificacion_pago(
+            payment_id, obtener_sdk(ACCESS_TOKEN), obtener_cliente('sns'), os.environ.get("SNS_TOPIC_ARN")
+        )
+    except Exception as e:
+        # ErrorTransitorioPago o cualquier fallo antes de marcar el pedido PAGADO
+        # (deduplicación en DynamoDB, transporte hacia MP...): un 5xx hace que MP
+        # vuelva a enviar la notificación
+        print(f"[Error Handler Webhook] Pago {payment_id} se reintentará: {type(e).__name__}: {str(e)}")
+        return {'statusCode': 500, 'body': 'Error procesando el pago'}
+
+    if resultado == 'error_mp':
+        return {'statusCode': 200, 'body': 'Error consultando MP'}
+    if resultado == 'referencia_invalida':
+        return {'statusCode': 200, 'body': 'Bad Reference'}
+    return {'statusCode': 200, 'body': 'Webhook procesado'}
+
+def procesar_webhooks(event, context):
+    """
+    Worker de WebhooksMPQueue: verifica los pagos encolados por receiveWebhook.
+    Devuelve batchItemFailures (ReportBatchItemFailures) para que solo se reintenten
+    los mensajes que fallaron; una notificación repetida dentro del lote se procesa una vez.
+    """
+    from mp_cliente import obtener_sdk
+    import webhooks_dedup
 
-        payment_info = sdk.payment().get(payment_id)
-        
-        if payment_info["status"] != 200:
-            print(f"[Error MP API] Status: {payment_info['status']}")
-            return {'statusCode': 200, 'body': 'Error consultando MP'}
+    ACCESS_TOKEN = os.environ.get("ACCESS_TOKEN")
+    sdk = obtener_sdk(ACCESS_TOKEN)
+    sns = obtener_cliente('sns')
+    sns_topic_arn = os.environ.get("SNS_TOPIC_ARN")
 
-        payment_data = payment_info["response"]
-        status = payment_data["status"]
-        external_ref_raw = payment_data.get("external_reference")
+    mensajes_por_pago = {}
+    fallidos = []
+    for record in event.get('Records', []):
+        try:
+            payment_id = str(json.loads(record['body'])['payment_id'])
+        except Exception:
+            # Mensaje mal formado: reintentarlo no lo arregla
+            print(f"[Error Webhooks] Mensaje inválido descartado: {record.get('messageId')}")
+            continue
+        mensajes_por_pago.setdefault(payment_id, []).append(record['messageId'])
 
-        print(f"Estado del pago: {status}")
+    webhooks_dedup.contar_repetidas_en_lote(sum(len(ids) - 1 for ids in mensajes_por_pago.values()))
 
-        if status == "approved":
-            try:
-                keys = json.loads(external_ref_raw)
-                tenant_id = keys.get("tenant_id")
-                uuid_pedido = keys.get("uuid")
-            except Exception:
-                print(f"[Error] external_reference inválida: {external_ref_raw}")
-                return {'statusCode': 200, 'body': 'Bad Reference'}
-
-            if PEDIDO_TABLE and tenant_id and uuid_pedido:
-                table = dynamodb.Table(PEDIDO_TABLE)
-                
-                try:
-                    response = table.update_item(
-                        Key={
-                            'tenant_id': tenant_id,
-                            'uuid': uuid_pedido
-                        },
-                        UpdateExpression="set estado_pedido=:s",
-                        ExpressionAttributeValues={
-                            ':s': 'PAGADO',
-                        },
-                        ReturnValues="ALL_NEW"
-                    )
-                    print(f"DynamoDB actualizado: Pedido {uuid_pedido} -> PAGADO")
-                    
-                    # Obtener datos del pedido actualizado
-                    pedido_actualizado = response.get('Attributes', {})
-                    cliente_email = pedido_actualizado.get('cliente_email')
-                    cliente_nombre = pedido_actualizado.get('cliente_nombre')
-                    
-                    # Enviar notificación a SNS para generar recibo y enviar email
-                    if SNS_TOPIC_ARN and cliente_email:
-                        sns_message = {
-                            'tenant_id': tenant_id,
-                            'uuid': uuid_pedido,
-                            'cliente_email': cliente_email,
-                            'cliente_nombre': cliente_nombre or 'Cliente',
-                            'payment_id': payment_id,
-                            'evento': 'pedido_pagado'
-                        }
-                        
-                        sns.publish(
-                            TopicArn=SNS_TOPIC_ARN,
-                            Message=json.dumps(sns_message),
-                            Subject=f'Pedido Pagado - {uuid_pedido}'
-                        )
-                        print(f"Notificación enviada a SNS para pedido: {uuid_pedido}")
-                    else:
-                        print(f"[Warning] No se pudo enviar a SNS - SNS_TOPIC_ARN: {SNS_TOPIC_ARN}, cliente_email: {cliente_email}")
-
-                except Exception as e:
-                    print(f"[Error Crítico DB] {str(e)}")
-                    return {'statusCode': 500, 'body': 'Error actualizando DB'}
-                    
-        return {'statusCode': 200, 'body': 'Webhook procesado'}
+    for payment_id, message_ids in mensajes_por_pago.items():
+        try:
+            resultado = procesar_notificacion_pago(payment_id, sdk, sns, sns_topic_arn)
+            print(f"[Webhooks] Pago {payment_id}: {resultado}")
+        except Exception as e:
+            print(f"[Error Webhooks] Pago {payment_id} se reintentará: {str(e)}")
+            fallidos.extend(message_ids)
 
-    except Exception as e:
-        print(f"[Error Handler Webhook] {str(e)}")
-        return {'statusCode': 200, 'body': 'Error manejado'}
\ No newline at end of file
+    print(f"[Webhooks] Lote: {len(mensajes_por_pago)} pagos, {len(fallidos)} mensajes fallidos")
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in fallidos]}
\ No newline at end of file
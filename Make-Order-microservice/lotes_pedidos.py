@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bembos_comun.aws import obtener_recurso, obtener_tabla
+from bembos_comun.serializacion import loads
+from snapshot_pedido import leer_snapshot
+
+# Registros de un lote procesados a la vez (generarRecibo / enviarEmail)
+LOTE_MAX_WORKERS = int(os.environ.get('LOTE_MAX_WORKERS', '8'))
+# BatchGetItem acepta hasta 100 claves por llamada
+BATCH_GET_MAX_CLAVES = 100
+BATCH_GET_MAX_INTENTOS = 4
+
+def leer_mensaje(record):
+    """
+    Mensaje de PedidosPagadosTopic contenido en un registro del lote: viene de la cola
+    suscrita con RawMessageDelivery (body), de una suscripción sin raw delivery
+    (sobre de SNS dentro del body) o de una invocación directa de SNS (Sns.Message).
+    Los decimales del snapshot del pedido quedan como Decimal.
+    """
+    if 'Sns' in record:
+        return loads(record['Sns']['Message'])
+    cuerpo = json.loads(record['body'])
+    if cuerpo.get('Type') == 'Notification' and 'Message' in cuerpo:
+        return loads(cuerpo['Message'])
+    return loads(record['body'])
+
+def identificador(record):
+    """itemIdentifier del registro para batchItemFailures."""
+    if 'Sns' in record:
+        return record['Sns'].get('MessageId')
+    return record.get('messageId')
+
+def obtener_pedidos(nombre_tabla, claves):
+    """
+    Lee los pedidos de `claves` [(tenant_id, uuid)] con BatchGetItem en bloques de 100.
+    Las claves no procesadas se reintentan con backoff y, si aún quedan, se leen con
+    get_item. Devuelve {(tenant_id, uuid): pedido}; los pedidos inexistentes no aparecen.
+    """
+    recurso = obtener_recurso('dynamodb')
+    pedidos = {}
+    unicas = list(dict.fromkeys(claves))
+
+    for inicio in range(0, len(unicas), BATCH_GET_MAX_CLAVES):
+        pendientes = [{'tenant_id': t, 'uuid': u} for t, u in unicas[inicio:inicio + BATCH_GET_MAX_CLAVES]]
+        for intento in range(BATCH_GET_MAX_INTENTOS):
+            if not pendientes:
+                break
+            if intento:
+                time.sleep(0.05 * 2 ** intento)
+            respuesta = recurso.batch_get_item(RequestItems={nombre_tabla: {'Keys': pendientes}})
+            for pedido in respuesta.get('Responses', {}).get(nombre_tabla, []):
+                pedidos[(pedido['tenant_id'], pedido['uuid'])] = pedido
+            pendientes = respuesta.get('UnprocessedKeys', {}).get(nombre_tabla, {}).get('Keys', [])
+
+        if pendientes:
+            print(f"[Lote] {len(pendientes)} claves sin procesar tras {BATCH_GET_MAX_INTENTOS} intentos, leyendo con get_item")
+            tabla = obtener_tabla(nombre_tabla)
+            for clave in pendientes:
+                pedido = tabla.get_item(Key=clave).get('Item')
+                if pedido:
+                    pedidos[(pedido['tenant_id'], pedido['uuid'])] = pedido
+
+    return pedidos
+
+def procesar_lote(event, nombre_tabla, procesar, nombre='Lote', campos=('tenant_id', 'uuid'), max_workers=None):
+    """
+    Procesa los registros del lote en paralelo con un pool acotado de hilos.
+
+    Los mensajes que traen el snapshot del pedido (snapshot_pedido.py) lo usan directamente;
+    los demás pedidos se leen antes con un solo BatchGetItem. `procesar(mensaje, pedido)`
+    se llama una vez por registro. Devuelve batchItemFailures (ReportBatchItemFailures) con los
+    registros cuyo `procesar` lanzó una excepción, para que solo esos se reintenten. Los mensajes
+    mal formados, incompletos (sin alguno de `campos`) o de pedidos inexistentes se descartan:
+    reintentarlos no los arregla.
+    """
+    inicio = time.perf_counter()
+    trabajos = []
+    for record in event.get('Records', []):
+        try:
+            mensaje = leer_mensaje(record)
+            if not isinstance(mensaje, dict):
+                raise ValueError(f"se esperaba un objeto JSON, llegó {type(mensaje).__name__}")
+        except Exception:
+            print(f"[Error {nombre}] Mensaje inválido descartado: {identificador(record)}")
+            continue
+        # Los campos clave son textos: otro tipo (lista, objeto) no identifica un pedido
+        if not all(isinstance(mensaje.get(campo), str) and mensaje.get(campo) for campo in campos):
+            print(f"[Error {nombre}] Datos incompletos en el mensaje: {mensaje}")
+            continue
+        trabajos.append((identificador(record), mensaje))
+
+    if not trabajos:
+        return {'batchItemFailures': []}
+
+    pedidos = {}
+    for _, mensaje in trabajos:
+        snapshot = leer_snapshot(mensaje)
+        if snapshot is not None:
+            pedidos[(mensaje['tenant_id'], mensaje['uuid'])] = snapshot
+    con_snapshot = len(pedidos)
+    faltantes = [(m['tenant_id'], m['uuid']) for _, m in trabajos if (m['tenant_id'], m['uuid']) not in pedidos]
+
+    try:
+        if faltantes:
+            pedidos.update(obtener_pedidos(nombre_tabla, faltantes))
+    except Exception as e:
+        # Sin pedidos no se puede procesar nada: se reintenta el lote completo
+        print(f"[Error {nombre}] No se pudieron leer los pedidos del lote: {str(e)}")
+        return {'batchItemFailures': [{'itemIdentifier': id_registro} for id_registro, _ in trabajos]}
+
+    def ejecutar(trabajo):
+        id_registro, mensaje = trabajo
+        pedido = pedidos.get((mensaje['tenant_id'], mensaje['uuid']))
+        if pedido is None:
+            print(f"[Error {nombre}] Pedido no encontrado: {mensaje['tenant_id']}/{mensaje['uuid']}")
+            return True
+        try:
+            procesar(mensaje, pedido)
+            return True
+        except Exception as e:
+            print(f"[Error {nombre}] Registro {id_registro} ({mensaje['uuid']}) se reintentará: {str(e)}")
+            return False
+
+    workers = max(1, min(max_workers or LOTE_MAX_WORKERS, len(trabajos)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resultados = list(pool.map(ejecutar, trabajos))
+
+    fallidos = [id_registro for (id_registro, _), exito in zip(trabajos, resultados) if not exito]
+    duracion_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    print(f"[{nombre}] Lote: {len(trabajos)} registros, {con_snapshot} con snapshot, "
+          f"{len(pedidos) - con_snapshot} pedidos leídos, "
+          f"{len(fallidos)} fallidos, {duracion_ms} ms")
+    return {'batchItemFailures': [{'itemIdentifier': id_registro} for id_registro in fallidos]}
@@ -0,0 +1,238 @@
+"""
+Plantillas de correos y recibos compiladas una vez por contenedor.
+
+Las plantillas viven en plantillas/ (PLANTILLAS_DIR) y se compilan en el primer uso
+a una función Python que se reutiliza en las invocaciones calientes: los
+{% include %} se insertan al compilar, el texto fijo queda como constantes (los
+fragmentos que no dependen del pedido no se vuelven a construir) y cada render
+solo evalúa las expresiones.
+
+Sintaxis:
+  {{ cliente_nombre }}               variable del contexto (None se muestra vacío)
+  {{ item.subtotal|moneda }}         acceso a claves con punto y filtros encadenados
+  {{ pago|default:"N/A" }}           filtro con argumento literal
+  {% for item in elementos %}...{% endfor %}
+  {% if preference_id %}...{% else %}...{% endif %}   (también "if not x")
+  {% include "_pie.html" %}
+En las plantillas .html todas las expresiones se escapan salvo con |seguro.
+Una línea que solo contiene un bloque {% %} no deja línea en blanco en la salida.
+"""
+import ast
+import html
+import os
+import re
+import threading
+from decimal import Decimal
+from functools import partial
+
+PLANTILLAS_DIR = os.environ.get(
+    'PLANTILLAS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plantillas'))
+
+_TOKEN = re.compile(r'({{.*?}}|{%.*?%})', re.S)
+_BLOQUE_SOLO = re.compile(r'^[ \t]*({%.*?%})[ \t]*\r?\n', re.M)
+_INCLUDE = re.compile(r'{%\s*include\s+("[^"]*"|\'[^\']*\')\s*%}')
+_RUTA = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$')
+
+_lock = threading.Lock()
+_plantillas = {}
+
+class ErrorPlantilla(ValueError):
+    """Plantilla inexistente o con sintaxis inválida (se detecta al compilar)."""
+
+def _texto(valor):
+    return '' if valor is None else str(valor)
+
+def _escapar(valor):
+    return '' if valor is None else html.escape(str(valor))
+
+def _valor(objeto, clave):
+    if isinstance(objeto, dict):
+        return objeto.get(clave)
+    return getattr(objeto, clave, None)
+
+def _moneda(valor):
+    if valor is None or valor == '':
+        return ''
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return f"{valor:.2f}"
+
+def _primero(valor):
+    if isinstance(valor, (list, tuple)):
+        return valor[0] if valor else None
+    return valor
+
+def _default(valor, alternativo=''):
+    return alternativo if valor is None or valor == '' else valor
+
+FILTROS = {
+    'moneda': _moneda,
+    'primero': _primero,
+    'default': _default,
+    'upper': lambda valor: _texto(valor).upper(),
+    'e': _escapar,
+}
+# Filtros que ya devuelven texto listo para la salida (sin str ni escape)
+FILTROS_FINALES = {'moneda', 'e'}
+
+class Plantilla:
+    """Plantilla compilada: renderizar(contexto) devuelve el texto final."""
+
+    __slots__ = ('nombre', 'codigo', '_render')
+
+    def __init__(self, nombre, codigo, render):
+        self.nombre = nombre
+        self.codigo = codigo
+        self._render = render
+
+    def renderizar(self, contexto):
+        return self._render(contexto)
+
+def _leer(nombre):
+    ruta = os.path.join(PLANTILLAS_DIR, nombre)
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        raise ErrorPlantilla(f"Plantilla no encontrada: {ruta}")
+
+def _expandir(nombre, fuente, incluidas):
+    """Quita las líneas de solo bloque e inserta los {% include %} recursivamente."""
+    fuente = _BLOQUE_SOLO.sub(r'\1', fuente)
+
+    def incluir(coincidencia):
+        hijo = ast.literal_eval(coincidencia.group(1))
+        if hijo in incluidas:
+            raise ErrorPlantilla(f"{nombre}: include circular de {hijo}")
+        return _expandir(hijo, _leer(hijo), incluidas + (hijo,))
+    return _INCLUDE.sub(incluir, fuente)
+
+def _acceso(ruta, locales, nombre):
+    if not _RUTA.match(ruta):
+        raise ErrorPlantilla(f"{nombre}: expresión inválida '{ruta}'")
+    partes = ruta.split('.')
+    if partes[0] not in locales:
+        codigo = f"_ctx.get({partes[0]!r})"
+    elif len(partes) > 1:
+        # g_<variable> se resuelve una vez por vuelta del for (dict.get para los elementos)
+        codigo = f"g_{partes[0]}({partes[1]!r})"
+        partes = partes[1:]
+    else:
+        codigo = f"l_{partes[0]}"
+    for parte in partes[1:]:
+        codigo = f"_v({codigo}, {parte!r})"
+    return codigo
+
+def _expresion(texto, locales, nombre, autoescape, constantes):
+    ruta, *filtros = [parte.strip() for parte in texto.split('|')]
+    codigo = _acceso(ruta, locales, nombre)
+    seguro = False
+    for filtro in filtros:
+        nombre_filtro, _, argumento = filtro.partition(':')
+        nombre_filtro = nombre_filtro.strip()
+        if nombre_filtro == 'seguro':
+            seguro = True
+            continue
+        if nombre_filtro not in FILTROS:
+            raise ErrorPlantilla(f"{nombre}: filtro desconocido '{nombre_filtro}'")
+        if argumento:
+            try:
+                literal = ast.literal_eval(argumento.strip())
+            except (ValueError, SyntaxError):
+                raise ErrorPlantilla(f"{nombre}: argumento inválido en '{filtro}'")
+            constantes.append(literal)
+            if nombre_filtro == 'default':
+                codigo = f"(_K[{len(constantes) - 1}] if (_d := {codigo}) is None or _d == '' else _d)"
+            else:
+                codigo = f"_f_{nombre_filtro}({codigo}, _K[{len(constantes) - 1}])"
+        elif nombre_filtro == 'moneda':
+            # Los importes ya llegan en Decimal: se formatean sin llamar a _moneda
+            codigo = f"(f'{{_m:.2f}}' if (_m := {codigo}).__class__ is _D else _f_moneda(_m))"
+        else:
+            codigo = f"_f_{nombre_filtro}({codigo})"
+    if filtros and filtros[-1].partition(':')[0].strip() in FILTROS_FINALES:
+        return codigo
+    if seguro or not autoescape:
+        return f"(_s if (_s := {codigo}).__class__ is str else '' if _s is None else str(_s))"
+    return f"_esc({codigo})"
+
+def compilar(nombre, fuente, autoescape=None):
+    """Compila el texto de una plantilla; `nombre` se usa para los includes y los errores."""
+    if autoescape is None:
+        autoescape = nombre.endswith('.html')
+    fuente = _expandir(nombre, fuente, (nombre,))
+
+    lineas = ['def _render(_ctx):', '    _o = []', '    _x = _o.extend']
+    constantes = []
+    abiertos = []
+    # Texto y expresiones entre dos bloques se agregan a la salida con un solo extend
+    piezas = []
+
+    def emitir_piezas():
+        if piezas:
+            lineas.append('    ' * (len(abiertos) + 1) + f"_x(({', '.join(piezas)},))")
+            piezas.clear()
+
+    for token in _TOKEN.split(fuente):
+        if not token:
+            continue
+        locales = {variable for tipo, variable in abiertos if tipo == 'for'}
+        if not token.startswith('{%'):
+            if token.startswith('{{'):
+                piezas.append(_expresion(token[2:-2].strip(), locales, nombre, autoescape, constantes))
+            else:
+                constantes.append(token)
+                piezas.append(f"_K[{len(constantes) - 1}]")
+            continue
+        emitir_piezas()
+        sangria = '    ' * (len(abiertos) + 1)
+
+        partes = token[2:-2].split()
+        if len(partes) == 4 and partes[0] == 'for' and partes[2] == 'in' and _RUTA.match(partes[1]) and '.' not in partes[1]:
+            variable = partes[1]
+            lineas.append(sangria + f"for l_{variable} in {_acceso(partes[3], locales, nombre)} or ():")
+            lineas.append(sangria + f"    g_{variable} = l_{variable}.get if l_{variable}.__class__ is dict "
+                                    f"else _p(_v, l_{variable})")
+            abiertos.append(('for', variable))
+        elif partes[:1] == ['if'] and len(partes) in (2, 3) and (len(partes) == 2 or partes[1] == 'not'):
+            negacion = 'not ' if len(partes) == 3 else ''
+            lineas.append(sangria + f"if {negacion}{_acceso(partes[-1], locales, nombre)}:")
+            abiertos.append(('if', None))
+        elif partes == ['else'] and abiertos and abiertos[-1][0] == 'if':
+            lineas.append('    ' * len(abiertos) + 'else:')
+            abiertos[-1] = ('else', None)
+        elif partes == ['endfor'] and abiertos and abiertos[-1][0] == 'for':
+            abiertos.pop()
+        elif partes == ['endif'] and abiertos and abiertos[-1][0] in ('if', 'else'):
+            abiertos.pop()
+        else:
+            raise ErrorPlantilla(f"{nombre}: bloque inválido o fuera de lugar {token}")
+        if partes[0] in ('if', 'else'):
+            # Un bloque vacío sigue siendo Python válido
+            lineas.append('    ' * (len(abiertos) + 1) + 'pass')
+
+    if abiertos:
+        raise ErrorPlantilla(f"{nombre}: falta cerrar {abiertos[-1][0]}")
+    emitir_piezas()
+    lineas.append("    return ''.join(_o)")
+
+    codigo = '\n'.join(lineas)
+    espacio = {'_K': tuple(constantes), '_v': _valor, '_p': partial, '_D': Decimal, '_esc': _escapar}
+    espacio.update({f"_f_{nombre_filtro}": funcion for nombre_filtro, funcion in FILTROS.items()})
+    exec(compile(codigo, f"<plantilla {nombre}>", 'exec'), espacio)
+    return Plantilla(nombre, codigo, espacio['_render'])
+
+def obtener(nombre):
+    """Plantilla compilada de PLANTILLAS_DIR, cacheada por contenedor."""
+    plantilla = _plantillas.get(nombre)
+    if plantilla is None:
+        with _lock:
+            plantilla = _plantillas.get(nombre)
+            if plantilla is None:
+                plantilla = compilar(nombre, _leer(nombre))
+                _plantillas[nombre] = plantilla
+    return plantilla
+
+def renderizar(nombre, contexto):
+    """Renderiza la plantilla `nombre` con el dict `contexto`."""
+    return obtener(nombre).renderizar(contexto)
@@ -0,0 +1,98 @@
+"""
+Cliente de Mercado Pago reutilizado entre invocaciones del mismo contenedor.
+
+mercadopago.SDK abre una requests.Session nueva (y un handshake TLS nuevo) por
+cada llamada. Aquí el SDK se crea una sola vez, de forma perezosa, con un
+HttpClient propio que mantiene una sesión persistente (keep-alive), timeouts
+explícitos y reintentos con backoff exponencial.
+
+Variables de entorno:
+  MP_API_BASE_URL     base de la API (un stand-in local para pruebas de carga)
+  MP_CONNECT_TIMEOUT  segundos para abrir la conexión
+  MP_TIMEOUT          segundos de lectura por petición
+  MP_MAX_REINTENTOS   reintentos ante errores de conexión / 429 / 5xx
+  MP_BACKOFF          factor de backoff entre reintentos
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+MP_URL_OFICIAL = 'https://api.mercadopago.com'
+MP_API_BASE_URL = os.environ.get('MP_API_BASE_URL', MP_URL_OFICIAL).rstrip('/')
+MP_CONNECT_TIMEOUT = float(os.environ.get('MP_CONNECT_TIMEOUT', '3'))
+MP_TIMEOUT = float(os.environ.get('MP_TIMEOUT', '10'))
+MP_MAX_REINTENTOS = int(os.environ.get('MP_MAX_REINTENTOS', '2'))
+MP_BACKOFF = float(os.environ.get('MP_BACKOFF', '0.3'))
+MP_POOL_CONEXIONES = int(os.environ.get('MP_POOL_CONEXIONES', '10'))
+
+# Solo se reintentan por status los métodos idempotentes (GET/PUT/DELETE...);
+# un POST solo se repite si falló al conectar, antes de llegar a MP.
+MP_REINTENTAR_STATUS = (429, 500, 502, 503, 504)
+
+_sdks = {}
+_lock = threading.Lock()
+
+def crear_sesion():
+    reintentos = Retry(
+        total=MP_MAX_REINTENTOS,
+        connect=MP_MAX_REINTENTOS,
+        read=MP_MAX_REINTENTOS,
+        status=MP_MAX_REINTENTOS,
+        backoff_factor=MP_BACKOFF,
+        status_forcelist=MP_REINTENTAR_STATUS,
+        raise_on_status=False
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=MP_POOL_CONEXIONES,
+        max_retries=reintentos
+    )
+    sesion = requests.Session()
+    sesion.mount('https://', adaptador)
+    sesion.mount('http://', adaptador)
+    return sesion
+
+def _clase_cliente_http():
+    # mercadopago solo se importa al crear el primer SDK
+    from mercadopago.http import HttpClient
+
+    class ClienteHttpPersistente(HttpClient):
+        """HttpClient del SDK sobre una requests.Session compartida."""
+
+        def __init__(self, sesion, base_url):
+            self.sesion = sesion
+            self.base_url = base_url
+
+        def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+            # Reintentos y timeouts los define la sesión, no cada llamada del SDK
+            if self.base_url != MP_URL_OFICIAL and url.startswith(MP_URL_OFICIAL):
+                url = self.base_url + url[len(MP_URL_OFICIAL):]
+            kwargs['timeout'] = (MP_CONNECT_TIMEOUT, MP_TIMEOUT)
+
+            respuesta = self.sesion.request(method, url, **kwargs)
+            resultado = {'status': respuesta.status_code, 'response': None}
+            if respuesta.status_code != 204 and respuesta.content:
+                try:
+                    resultado['response'] = respuesta.json()
+                except ValueError:
+                    print(f"[Error MP] Respuesta no JSON ({respuesta.status_code}) de {url}")
+            return resultado
+
+    return ClienteHttpPersistente
+
+def obtener_sdk(access_token):
+    """Devuelve el SDK de Mercado Pago del contenedor para `access_token`, creándolo la primera vez."""
+    sdk = _sdks.get(access_token)
+    if sdk is not None:
+        return sdk
+    with _lock:
+        sdk = _sdks.get(access_token)
+        if sdk is None:
+            import mercadopago
+            cliente_http = _clase_cliente_http()(crear_sesion(), MP_API_BASE_URL)
+            sdk = mercadopago.SDK(access_token, http_client=cliente_http)
+            _sdks[access_token] = sdk
+    return sdk
@@ -0,0 +1,79 @@
+"""
+Caché idempotente de preferencias de Mercado Pago para pagarPedido.
+
+Un reintento o doble clic sobre el mismo pedido con el mismo contenido devuelve
+la preferencia ya creada en vez de llamar otra vez a MP (y de pisar el
+preference_id guardado en Pedidos). Un item por pedido (tenant_id#uuid) con la
+huella del contenido; si el contenido cambia, se crea una preferencia nueva.
+Las entradas caducan por TTL (`expira_en`).
+"""
+import hashlib
+import json
+import os
+import time
+from decimal import Decimal
+from bembos_comun.aws import obtener_tabla
+
+PREFERENCIAS_TABLE = os.environ.get('PREFERENCIAS_TABLE')
+PREFERENCIA_TTL_SEGUNDOS = int(os.environ.get('PREFERENCIA_TTL_SEGUNDOS', '1800'))
+
+def _canonico(obj):
+    if isinstance(obj, Decimal):
+        # "25.90" y "25.9" son el mismo precio
+        return str(obj.normalize())
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no serializable a JSON")
+
+def clave_pedido(tenant_id, uuid_val):
+    return f"{tenant_id}#{uuid_val}"
+
+def huella_pedido(elementos, cliente_email=None):
+    """sha256 del contenido que determina la preferencia (independiente del orden de las claves)."""
+    contenido = json.dumps(
+        {'elementos': elementos, 'cliente_email': cliente_email},
+        sort_keys=True, separators=(',', ':'), default=_canonico
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+def _tabla():
+    return obtener_tabla(PREFERENCIAS_TABLE) if PREFERENCIAS_TABLE else None
+
+def buscar_preferencia(tenant_id, uuid_val, huella):
+    """
+    Devuelve {'preference_id', 'sandbox_init_point'} si hay una preferencia vigente
+    para el pedido con la misma huella, o None.
+    """
+    tabla = _tabla()
+    if tabla is None:
+        return None
+    try:
+        item = tabla.get_item(
+            Key={'clave': clave_pedido(tenant_id, uuid_val)},
+            ConsistentRead=True
+        ).get('Item')
+    except Exception as e:
+        print(f"[Error Preferencias] No se pudo leer la caché: {str(e)}")
+        return None
+
+    # El borrado por TTL no es inmediato: comprobar la expiración aquí también
+    if not item or item.get('huella') != huella or int(item.get('expira_en', 0)) <= int(time.time()):
+        return None
+    return {
+        'preference_id': item['preference_id'],
+        'sandbox_init_point': item['sandbox_init_point']
+    }
+
+def guardar_preferencia(tenant_id, uuid_val, huella, preference_id, sandbox_init_point):
+    tabla = _tabla()
+    if tabla is None:
+        return
+    try:
+        tabla.put_item(Item={
+            'clave': clave_pedido(tenant_id, uuid_val),
+            'huella': huella,
+            'preference_id': preference_id,
+            'sandbox_init_point': sandbox_init_point,
+            'expira_en': int(time.time()) + PREFERENCIA_TTL_SEGUNDOS
+        })
+    except Exception as e:
+        # Sin caché el siguiente reintento solo crea otra preferencia
+        print(f"[Error Preferencias] No se pudo guardar la preferencia {preference_id}: {str(e)}")
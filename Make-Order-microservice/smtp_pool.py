@@ -0,0 +1,251 @@
+"""
+Sesiones SMTP persistentes para lambda_enviar_email.
+
+Abrir la conexión, negociar STARTTLS y autenticarse cuesta varios round trips y el
+relay limita cuántas conexiones nuevas acepta. Aquí la sesión autenticada se
+reutiliza entre todos los mensajes de un lote de SNS y entre invocaciones calientes
+del mismo contenedor. Si la sesión se cae (el relay la cerró por inactividad o el
+contenedor estuvo congelado) antes de enviar el contenido del mensaje, se reconecta
+y el mensaje se reintenta una vez. Si cae después, el relay pudo haberlo encolado
+ya: el error se propaga y el registro falla en vez de arriesgar un correo duplicado.
+
+Si el servidor anuncia PIPELINING (RFC 2920), MAIL FROM, RCPT TO y DATA se envían
+en un solo write y sus respuestas se leen juntas: un round trip por mensaje en vez
+de tres.
+
+Variables de entorno:
+  SMTP_HOST, SMTP_PORT              servidor (por defecto smtp.gmail.com:587)
+  SMTP_STARTTLS                     "true" para negociar TLS antes de autenticarse
+  SMTP_TIMEOUT                      segundos por operación de socket
+  SMTP_SESION_MAX_MENSAJES          mensajes por sesión antes de renovarla
+  SMTP_SESION_INACTIVA_SEGUNDOS     inactividad tras la cual se verifica con NOOP
+"""
+import os
+import re
+import smtplib
+import ssl
+import threading
+import time
+
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true'
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', '10'))
+SMTP_SESION_MAX_MENSAJES = int(os.environ.get('SMTP_SESION_MAX_MENSAJES', '90'))
+SMTP_SESION_INACTIVA_SEGUNDOS = float(os.environ.get('SMTP_SESION_INACTIVA_SEGUNDOS', '30'))
+
+# Errores tras los que la sesión ya no sirve: se cierra y, si el contenido del
+# mensaje aún no se envió, se abre otra y se reintenta
+_ERRORES_CONEXION = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, ssl.SSLError)
+
+_lock = threading.Lock()
+# usuario -> sesiones abiertas sin usar (la última devuelta primero)
+_libres = {}
+_contadores = {'conexiones': 0, 'reconexiones': 0, 'mensajes': 0}
+
+def contadores():
+    return dict(_contadores)
+
+def _conectar(usuario, password):
+    inicio = time.perf_counter()
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        smtp.ehlo()
+        if SMTP_STARTTLS:
+            smtp.starttls(context=ssl.create_default_context())
+            smtp.ehlo()
+        if usuario and password:
+            smtp.login(usuario, password)
+    except Exception:
+        smtp.close()
+        raise
+    _contadores['conexiones'] += 1
+    ahora = time.monotonic()
+    return {
+        'smtp': smtp,
+        'usuario': usuario,
+        'pipelining': smtp.has_extn('pipelining'),
+        'mensajes': 0,
+        'datos_enviados': False,
+        'usada_en': ahora,
+        'conexion_ms': (time.perf_counter() - inicio) * 1000
+    }
+
+def _cerrar(sesion):
+    try:
+        sesion['smtp'].quit()
+    except (smtplib.SMTPException, OSError):
+        sesion['smtp'].close()
+
+def _tomar(usuario, password):
+    """Sesión libre y sana del usuario, o una nueva."""
+    while True:
+        with _lock:
+            libres = _libres.get(usuario) or []
+            sesion = libres.pop() if libres else None
+        if sesion is None:
+            return _conectar(usuario, password)
+
+        if time.monotonic() - sesion['usada_en'] < SMTP_SESION_INACTIVA_SEGUNDOS:
+            sesion['conexion_ms'] = 0.0
+            return sesion
+        try:
+            if sesion['smtp'].noop()[0] == 250:
+                sesion['conexion_ms'] = 0.0
+                return sesion
+        except (smtplib.SMTPException, OSError):
+            pass
+        sesion['smtp'].close()
+
+def _devolver(sesion):
+    sesion['mensajes'] += 1
+    sesion['usada_en'] = time.monotonic()
+    if sesion['mensajes'] >= SMTP_SESION_MAX_MENSAJES:
+        _cerrar(sesion)
+        return
+    with _lock:
+        _libres.setdefault(sesion['usuario'], []).append(sesion)
+
+def _preparar_datos(datos):
+    """Fin de línea CRLF, puntos al inicio de línea duplicados y el terminador de DATA."""
+    if isinstance(datos, str):
+        datos = datos.encode('utf-8')
+    datos = re.sub(br'(?:\r\n|\n|\r(?!\n))', b'\r\n', datos)
+    datos = re.sub(br'(?m)^\.', b'..', datos)
+    if not datos.endswith(b'\r\n'):
+        datos += b'\r\n'
+    return datos + b'.\r\n'
+
+def _enviar_datos(sesion, datos):
+    """Envía el contenido tras el 354. Desde aquí el relay puede haber aceptado el mensaje."""
+    smtp = sesion['smtp']
+    sesion['datos_enviados'] = True
+    smtp.send(_preparar_datos(datos))
+    codigo, respuesta = smtp.getreply()
+    if codigo != 250:
+        if codigo == 421:
+            raise smtplib.SMTPServerDisconnected(respuesta)
+        raise smtplib.SMTPDataError(codigo, respuesta)
+
+def _transaccion_pipelining(sesion, remitente, destinatarios, datos):
+    smtp = sesion['smtp']
+    comandos = [f'MAIL FROM:<{remitente}>'] + [f'RCPT TO:<{d}>' for d in destinatarios] + ['DATA']
+    smtp.send(''.join(f'{c}\r\n' for c in comandos).encode('ascii'))
+    respuestas = [smtp.getreply() for _ in comandos]
+
+    mail, rcpts, data = respuestas[0], respuestas[1:-1], respuestas[-1]
+    rechazados = {d: r for d, r in zip(destinatarios, rcpts) if r[0] not in (250, 251)}
+    if data[0] != 354:
+        if data[0] == 421:
+            raise smtplib.SMTPServerDisconnected(data[1])
+        smtp.rset()
+        if mail[0] != 250:
+            raise smtplib.SMTPSenderRefused(mail[0], mail[1], remitente)
+        if len(rechazados) == len(destinatarios):
+            raise smtplib.SMTPRecipientsRefused(rechazados)
+        raise smtplib.SMTPDataError(data[0], data[1])
+
+    _enviar_datos(sesion, datos)
+    return rechazados
+
+def _transaccion_simple(sesion, remitente, destinatarios, datos):
+    """Como smtplib.sendmail, un comando por round trip, pero marcando cuándo sale el contenido."""
+    smtp = sesion['smtp']
+    codigo, respuesta = smtp.mail(remitente)
+    if codigo != 250:
+        if codigo == 421:
+            raise smtplib.SMTPServerDisconnected(respuesta)
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(codigo, respuesta, remitente)
+
+    rechazados = {}
+    for destinatario in destinatarios:
+        codigo, respuesta = smtp.rcpt(destinatario)
+        if codigo == 421:
+            raise smtplib.SMTPServerDisconnected(respuesta)
+        if codigo not in (250, 251):
+            rechazados[destinatario] = (codigo, respuesta)
+    if len(rechazados) == len(destinatarios):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(rechazados)
+
+    codigo, respuesta = smtp.docmd('DATA')
+    if codigo != 354:
+        if codigo == 421:
+            raise smtplib.SMTPServerDisconnected(respuesta)
+        smtp.rset()
+        raise smtplib.SMTPDataError(codigo, respuesta)
+
+    _enviar_datos(sesion, datos)
+    return rechazados
+
+def _transaccion(sesion, remitente, destinatarios, datos):
+    sesion['datos_enviados'] = False
+    if sesion['pipelining']:
+        return _transaccion_pipelining(sesion, remitente, destinatarios, datos)
+    return _transaccion_simple(sesion, remitente, destinatarios, datos)
+
+def enviar(remitente, destinatarios, datos, usuario=None, password=None):
+    """
+    Envía un mensaje (bytes o str con cabeceras) reutilizando una sesión autenticada.
+    Devuelve los tiempos del envío:
+      {'ms', 'conexion_ms', 'reconectado', 'pipelining', 'rechazados'}
+    Los rechazos del servidor (remitente, destinatarios, datos) se propagan como
+    smtplib.SMTPException; la sesión sigue disponible para el siguiente mensaje.
+    Una caída antes de enviar el contenido se reintenta en una sesión nueva; una
+    caída después se propaga, porque el relay pudo haber encolado el mensaje.
+    """
+    if isinstance(destinatarios, str):
+        destinatarios = [destinatarios]
+
+    inicio = time.perf_counter()
+    reconectado = False
+    sesion = _tomar(usuario, password)
+    conexion_ms = sesion['conexion_ms']
+    try:
+        try:
+            rechazados = _transaccion(sesion, remitente, destinatarios, datos)
+        except _ERRORES_CONEXION as e:
+            sesion['smtp'].close()
+            if sesion['datos_enviados']:
+                # El relay pudo haber encolado el mensaje antes de caer: reintentar lo duplicaría
+                print(f"[SMTP] Sesión caída tras enviar el contenido ({type(e).__name__}: {e}), sin reintento")
+                sesion = None
+                raise
+            # Sesión caída antes del contenido (p. ej. tomada vencida del pool): nada se aceptó
+            print(f"[SMTP] Sesión caída ({type(e).__name__}: {e}), reconectando")
+            _contadores['reconexiones'] += 1
+            reconectado = True
+            sesion = None
+            sesion = _conectar(usuario, password)
+            conexion_ms += sesion['conexion_ms']
+            rechazados = _transaccion(sesion, remitente, destinatarios, datos)
+    except smtplib.SMTPException as e:
+        # Sólo vuelve al pool una sesión viva cuyo servidor respondió el rechazo
+        if sesion is not None:
+            if isinstance(e, _ERRORES_CONEXION):
+                sesion['smtp'].close()
+            else:
+                _devolver(sesion)
+        raise
+    except Exception:
+        if sesion is not None:
+            sesion['smtp'].close()
+        raise
+
+    _devolver(sesion)
+    _contadores['mensajes'] += 1
+    return {
+        'ms': round((time.perf_counter() - inicio) * 1000, 1),
+        'conexion_ms': round(conexion_ms, 1),
+        'reconectado': reconectado,
+        'pipelining': sesion['pipelining'],
+        'rechazados': sorted(rechazados)
+    }
+
+def cerrar_todas():
+    with _lock:
+        sesiones = [s for libres in _libres.values() for s in libres]
+        _libres.clear()
+    for sesion in sesiones:
+        _cerrar(sesion)
@@ -0,0 +1,87 @@
+"""
+Snapshot compacto del pedido dentro del evento pedido_pagado de PedidosPagadosTopic.
+
+procesar_notificacion_pago ya tiene el pedido completo (ReturnValues=ALL_NEW) al
+publicar, así que lo adjunta en `pedido` con los campos que usan generarRecibo y
+enviarEmail y el precio_total calculado por el servidor. Los consumidores lo usan
+tal cual y solo leen DynamoDB cuando el mensaje no lo trae: snapshot desactivado,
+pedido demasiado grande para SNS o versión que no conocen.
+"""
+import os
+from decimal import Decimal
+from bembos_comun.serializacion import dumps
+
+SNAPSHOT_VERSION = 1
+PEDIDO_SNAPSHOT = os.environ.get('PEDIDO_SNAPSHOT', 'true').lower() == 'true'
+# SNS admite 256 KiB por mensaje; el margen cubre el Subject y los atributos
+PEDIDO_SNAPSHOT_MAX_BYTES = int(os.environ.get('PEDIDO_SNAPSHOT_MAX_BYTES', '240000'))
+
+CAMPOS = ('tenant_id', 'uuid', 'estado_pedido', 'cliente_email', 'cliente_nombre', 'preference_id',
+          'precio_total', 'fecha_creacion', 'fecha_pedido')
+CAMPOS_ELEMENTO = ('combo', 'precio', 'cantidad_combo')
+
+def crear_snapshot(pedido):
+    """Proyección del pedido con los campos que leen los consumidores del evento."""
+    snapshot = {'v': SNAPSHOT_VERSION}
+    for campo in CAMPOS:
+        if pedido.get(campo) is not None:
+            snapshot[campo] = pedido[campo]
+    snapshot['elementos'] = [
+        {campo: item[campo] for campo in CAMPOS_ELEMENTO if campo in item}
+        for item in pedido.get('elementos', [])
+    ]
+    if 'precio_total' not in snapshot:
+        snapshot['precio_total'] = total_pedido(pedido)
+    return snapshot
+
+def serializar_mensaje(mensaje, pedido):
+    """
+    JSON del mensaje para sns.publish con el snapshot de `pedido` si está activado y
+    cabe en PEDIDO_SNAPSHOT_MAX_BYTES. Devuelve (json, incluido).
+    """
+    if PEDIDO_SNAPSHOT and pedido:
+        completo = dumps(dict(mensaje, pedido=crear_snapshot(pedido)))
+        if len(completo.encode('utf-8')) <= PEDIDO_SNAPSHOT_MAX_BYTES:
+            return completo, True
+        print(f"[Snapshot] Pedido {mensaje.get('uuid')} excede {PEDIDO_SNAPSHOT_MAX_BYTES} bytes, se publica sin snapshot")
+    return dumps(mensaje), False
+
+def leer_snapshot(mensaje):
+    """
+    Pedido adjunto al mensaje, o None si no lo trae, es de otra versión o no
+    corresponde a la clave del mensaje (el consumidor debe leerlo de DynamoDB).
+    """
+    snapshot = mensaje.get('pedido')
+    if not isinstance(snapshot, dict) or snapshot.get('v') != SNAPSHOT_VERSION:
+        return None
+    if snapshot.get('tenant_id') != mensaje.get('tenant_id') or snapshot.get('uuid') != mensaje.get('uuid'):
+        return None
+    return snapshot
+
+def _decimal(valor):
+    # DynamoDB ya devuelve Decimal: solo se convierte lo que viene de otra fuente
+    return valor if valor.__class__ is Decimal else Decimal(str(valor))
+
+def total_pedido(pedido):
+    """precio_total del servidor; para pedidos antiguos sin él, se suma con Decimal desde elementos."""
+    if pedido.get('precio_total') is not None:
+        return _decimal(pedido['precio_total'])
+    total = Decimal('0')
+    for item in pedido.get('elementos', []):
+        total += _decimal(item.get('precio', 0)) * int(item.get('cantidad_combo', 1))
+    return total
+
+def detalle_elementos(pedido):
+    """Líneas del pedido para recibos y correos: combo, cantidad, precio y subtotal en Decimal."""
+    detalle = []
+    for item in pedido.get('elementos', []):
+        combo = item.get('combo') or ['Producto']
+        precio = _decimal(item.get('precio', 0))
+        cantidad = int(item.get('cantidad_combo', 1))
+        detalle.append({
+            'combo': combo[0] if isinstance(combo, (list, tuple)) else combo,
+            'cantidad': cantidad,
+            'precio': precio,
+            'subtotal': precio * cantidad
+        })
+    return detalle
@@ -0,0 +1,148 @@
+"""
+Deduplicación de notificaciones de Mercado Pago.
+
+MP envía varias notificaciones por pago (payment, payment_created, variantes por
+body y por query string). Cada pago aprobado se reclama una sola vez con un put
+condicional sobre la tabla WebhooksProcesados (clave "payment_id#status", con TTL),
+así el pedido se marca PAGADO y se publica en SNS una sola vez.
+
+Contadores: en memoria por contenedor (contadores()) y en los logs, una línea
+"[Dedup Webhooks]" por supresión; no se escriben en DynamoDB para no sumar un round
+trip (ni una clave caliente) al camino de las notificaciones repetidas.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from bembos_comun.aws import obtener_tabla
+
+WEBHOOKS_DEDUP_TABLE = os.environ.get('WEBHOOKS_DEDUP_TABLE')
+WEBHOOK_DEDUP_TTL_SEGUNDOS = int(os.environ.get('WEBHOOK_DEDUP_TTL_SEGUNDOS', str(7 * 24 * 3600)))
+# Un reclamo EN_PROCESO más antiguo que esto se considera abandonado (worker caído)
+WEBHOOK_RECLAMO_VENCE_SEGUNDOS = int(os.environ.get('WEBHOOK_RECLAMO_VENCE_SEGUNDOS', '300'))
+# Pagos ya procesados que recuerda un contenedor caliente sin consultar DynamoDB
+WEBHOOK_DEDUP_MEMORIA = int(os.environ.get('WEBHOOK_DEDUP_MEMORIA', '1000'))
+
+EN_PROCESO = 'EN_PROCESO'
+PROCESADO = 'PROCESADO'
+
+_procesados = OrderedDict()
+_contadores = {
+    'procesadas': 0,
+    'suprimidas_lote': 0,
+    'suprimidas_memoria': 0,
+    'suprimidas_previas': 0,
+    'suprimidas_reclamo': 0
+}
+_lock = threading.Lock()
+
+def clave_dedup(payment_id, status):
+    return f"{payment_id}#{status}"
+
+def _tabla():
+    return obtener_tabla(WEBHOOKS_DEDUP_TABLE) if WEBHOOKS_DEDUP_TABLE else None
+
+def _recordar(clave):
+    with _lock:
+        _procesados[clave] = True
+        _procesados.move_to_end(clave)
+        while len(_procesados) > WEBHOOK_DEDUP_MEMORIA:
+            _procesados.popitem(last=False)
+
+def contadores():
+    """Copia de los contadores de este contenedor."""
+    with _lock:
+        return dict(_contadores)
+
+def _contar(motivo, cantidad=1):
+    with _lock:
+        _contadores[motivo] += cantidad
+    if not motivo.startswith('suprimidas'):
+        return
+    print(f"[Dedup Webhooks] {cantidad} notificación(es) suprimida(s) ({motivo}). Contadores: {contadores()}")
+
+def contar_repetidas_en_lote(cantidad):
+    """Notificaciones del mismo pago que llegaron juntas en un lote de SQS."""
+    if cantidad:
+        _contar('suprimidas_lote', cantidad)
+
+def ya_procesado(payment_id, status='approved'):
+    """
+    True si el pago ya se procesó con ese status. Se consulta antes de llamar a MP;
+    primero en la memoria del contenedor y luego en DynamoDB.
+    """
+    clave = clave_dedup(payment_id, status)
+    if clave in _procesados:
+        _contar('suprimidas_memoria')
+        return True
+
+    tabla = _tabla()
+    if tabla is None:
+        return False
+    try:
+        item = tabla.get_item(Key={'clave': clave}, ConsistentRead=True).get('Item')
+    except Exception as e:
+        print(f"[Error Dedup Webhooks] No se pudo consultar {clave}: {str(e)}")
+        return False
+
+    if item and item.get('estado') == PROCESADO:
+        _recordar(clave)
+        _contar('suprimidas_previas')
+        return True
+    return False
+
+def reclamar(payment_id, status):
+    """
+    Reclama el procesamiento de payment_id#status con un put condicional.
+    Devuelve False si otra notificación ya lo reclamó (y el reclamo sigue vigente).
+    """
+    tabla = _tabla()
+    if tabla is None:
+        return True
+
+    ahora = int(time.time())
+    try:
+        tabla.put_item(
+            Item={
+                'clave': clave_dedup(payment_id, status),
+                'estado': EN_PROCESO,
+                'reclamado_en': ahora,
+                'expira_en': ahora + WEBHOOK_DEDUP_TTL_SEGUNDOS
+            },
+            ConditionExpression='attribute_not_exists(clave) OR (estado = :en_proceso AND reclamado_en < :vencido)',
+            ExpressionAttributeValues={
+                ':en_proceso': EN_PROCESO,
+                ':vencido': ahora - WEBHOOK_RECLAMO_VENCE_SEGUNDOS
+            }
+        )
+        return True
+    except tabla.meta.client.exceptions.ConditionalCheckFailedException:
+        _contar('suprimidas_reclamo')
+        return False
+
+def confirmar(payment_id, status):
+    clave = clave_dedup(payment_id, status)
+    _recordar(clave)
+    _contar('procesadas')
+    tabla = _tabla()
+    if tabla is None:
+        return
+    try:
+        tabla.update_item(
+            Key={'clave': clave},
+            UpdateExpression='SET estado = :procesado',
+            ExpressionAttributeValues={':procesado': PROCESADO}
+        )
+    except Exception as e:
+        # El reclamo EN_PROCESO sigue bloqueando duplicados hasta que venza
+        print(f"[Error Dedup Webhooks] No se pudo confirmar {clave}: {str(e)}")
+
+def liberar(payment_id, status):
+    """Borra el reclamo tras un fallo para que el reintento pueda procesar el pago."""
+    tabla = _tabla()
+    if tabla is None:
+        return
+    try:
+        tabla.delete_item(Key={'clave': clave_dedup(payment_id, status)})
+    except Exception as e:
+        print(f"[Error Dedup Webhooks] No se pudo liberar {payment_id}#{status}: {str(e)}")
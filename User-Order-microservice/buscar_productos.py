@@ -0,0 +1,121 @@
+import os
+from validate_token import contexto_autorizador
+from bembos_comun.paginacion import TokenInvalido, codificar_token, decodificar_token, leer_limite
+from catalogo import tipos_catalogados, tipo_reservado
+from indice_productos import normalizar, leer_precio, obtener_indice, buscar
+
+BUSCAR_PRODUCTOS_LIMITE = int(os.environ.get('BUSCAR_PRODUCTOS_LIMITE', '20'))
+BUSCAR_PRODUCTOS_LIMITE_MAX = int(os.environ.get('BUSCAR_PRODUCTOS_LIMITE_MAX', '100'))
+ORDENES = ('relevancia', 'precio', '-precio', 'nombre')
+
+def _leer_float(params, nombre):
+    valor = params.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número: {valor}")
+
+def _leer_posicion(cursor):
+    """Posición del cursor en el resultado ordenado: entero no negativo."""
+    posicion = cursor.get('posicion', 0)
+    if posicion.__class__ is not int or posicion < 0:
+        raise TokenInvalido("next_token inválido: posición fuera de rango")
+    return posicion
+
+def _leer_bool(params, nombre):
+    valor = (params.get(nombre) or '').lower()
+    if valor == '':
+        return None
+    if valor not in ('true', 'false'):
+        raise ValueError(f"{nombre} debe ser true o false")
+    return valor == 'true'
+
+def _precio_orden(item, sin_precio):
+    precio = leer_precio(item)
+    return sin_precio if precio is None else precio
+
+def _clave_orden(orden):
+    # Los productos sin precio válido quedan al final en ambos sentidos
+    if orden == 'precio':
+        return lambda r: (_precio_orden(r[1], float('inf')), r[1]['product_id'])
+    if orden == '-precio':
+        return lambda r: (-_precio_orden(r[1], float('-inf')), r[1]['product_id'])
+    if orden == 'nombre':
+        return lambda r: (normalizar(r[1].get('nombre')), r[1]['product_id'])
+    return lambda r: (-r[0], normalizar(r[1].get('nombre')), r[1]['product_id'])
+
+def buscar_productos(event, context):
+    """
+    GET /productos/buscar?q=clas&tipo=hamburguesas&promo=true&precio_min=10&precio_max=30&orden=precio
+    Búsqueda por prefijo sin tildes sobre `nombre`, con filtros y orden. Sin `tipo`
+    busca en todos los tipos con catálogo generado.
+    """
+    # El token ya lo validó el autorizador de API Gateway
+    if contexto_autorizador(event) is None:
+        return {
+            'statusCode': 401,
+            'body': 'No autorizado'
+        }
+
+    query_params = event.get("queryStringParameters") or {}
+    texto = query_params.get("q") or ''
+    orden = query_params.get("orden") or 'relevancia'
+
+    try:
+        limite = leer_limite(query_params, defecto=BUSCAR_PRODUCTOS_LIMITE, maximo=BUSCAR_PRODUCTOS_LIMITE_MAX)
+        cursor = decodificar_token(query_params.get("next_token")) or {}
+        # El cursor es la posición en el resultado ordenado; los catálogos cambian poco
+        inicio = _leer_posicion(cursor)
+        precio_min = _leer_float(query_params, 'precio_min')
+        precio_max = _leer_float(query_params, 'precio_max')
+        promo = _leer_bool(query_params, 'promo')
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': str(e)
+        }
+
+    if orden not in ORDENES:
+        return {
+            'statusCode': 400,
+            'body': f"orden debe ser uno de: {', '.join(ORDENES)}"
+        }
+
+    if query_params.get("tipo") and tipo_reservado(query_params["tipo"]):
+        return {
+            'statusCode': 400,
+            'body': f'Tipo no válido: {query_params["tipo"]}'
+        }
+
+    tipos = [query_params["tipo"]] if query_params.get("tipo") else tipos_catalogados()
+
+    resultados = []
+    for tipo in tipos:
+        indice = obtener_indice(tipo)
+        if indice is None:
+            continue
+        resultados.extend(buscar(
+            indice,
+            texto=texto,
+            promo_id=query_params.get("promo_id"),
+            promo=promo,
+            precio_min=precio_min,
+            precio_max=precio_max
+        ))
+    resultados.sort(key=_clave_orden(orden))
+
+    pagina = resultados[inicio:inicio + limite]
+    siguiente = None
+    if inicio + limite < len(resultados):
+        siguiente = {'posicion': inicio + limite}
+
+    return {
+        'statusCode': 200,
+        'body': {
+            'items': [item for _, item in pagina],
+            'total': len(resultados),
+            'next_token': codificar_token(siguiente)
+        }
+    }
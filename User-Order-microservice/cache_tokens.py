@@ -0,0 +1,78 @@
+"""
+Caché en memoria (LRU acotada con TTL) de los tokens validados por validate_token.
+
+- Positivos: se guardan hasta min(TOKEN_CACHE_TTL, lo que le queda al token según `expires`).
+- Negativos (token inexistente o expirado): se guardan TOKEN_CACHE_NEGATIVO_TTL segundos
+  para que tokens inválidos repetidos no consulten DynamoDB en cada petición.
+
+Cada contenedor tiene su propia caché: invalidar_token solo limpia la del contenedor
+actual, en los demás un token revocado sigue vigente como máximo TOKEN_CACHE_TTL segundos.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+TOKEN_CACHE_MAX = int(os.environ.get('TOKEN_CACHE_MAX', '1000'))
+TOKEN_CACHE_TTL = float(os.environ.get('TOKEN_CACHE_TTL', '60'))
+TOKEN_CACHE_NEGATIVO_TTL = float(os.environ.get('TOKEN_CACHE_NEGATIVO_TTL', '5'))
+
+FORMATO_EXPIRES = '%Y-%m-%d %H:%M:%S'
+
+# token -> (expira_monotonic, token_item o None)
+_cache = OrderedDict()
+_lock = threading.Lock()
+_estadisticas = {'aciertos': 0, 'fallos': 0}
+
+def segundos_restantes(expires):
+    """Segundos hasta `expires` (mismo formato y hora local que login_user)."""
+    try:
+        return (datetime.strptime(expires, FORMATO_EXPIRES) - datetime.now()).total_seconds()
+    except (TypeError, ValueError):
+        return 0
+
+def buscar(token):
+    """
+    Devuelve (True, token_item) si el token está en caché (token_item es None para
+    un resultado negativo) o (False, None) si hay que consultar DynamoDB.
+    """
+    with _lock:
+        entrada = _cache.get(token)
+        if entrada is not None:
+            if entrada[0] > time.monotonic():
+                _cache.move_to_end(token)
+                _estadisticas['aciertos'] += 1
+                return True, entrada[1]
+            del _cache[token]
+        _estadisticas['fallos'] += 1
+    return False, None
+
+def _guardar(token, token_item, ttl):
+    if TOKEN_CACHE_MAX <= 0 or ttl <= 0:
+        return
+    with _lock:
+        _cache[token] = (time.monotonic() + ttl, token_item)
+        _cache.move_to_end(token)
+        while len(_cache) > TOKEN_CACHE_MAX:
+            _cache.popitem(last=False)
+
+def guardar(token, token_item):
+    restante = segundos_restantes(token_item.get('expires'))
+    if restante <= 0:
+        # Ya expirado: se recuerda como cualquier otro resultado negativo
+        _guardar(token, token_item, TOKEN_CACHE_NEGATIVO_TTL)
+    else:
+        _guardar(token, token_item, min(TOKEN_CACHE_TTL, restante))
+
+def guardar_negativo(token):
+    _guardar(token, None, TOKEN_CACHE_NEGATIVO_TTL)
+
+def invalidar_token(token):
+    """Hook de logout: olvida el token en la caché de este contenedor."""
+    with _lock:
+        _cache.pop(token, None)
+
+def estadisticas():
+    with _lock:
+        return dict(_estadisticas, tamanio=len(_cache))
@@ -0,0 +1,191 @@
+"""
+Catálogo de productos materializado por tipo (tenant_id de la tabla de productos).
+
+regenerar_catalogo(tipo) arma un documento JSON con los productos visibles del tipo,
+lo guarda comprimido con gzip en S3 (catalogo/{tipo}/v{version}.json.gz) y publica
+la versión en un item puntero de la misma tabla de productos:
+  tenant_id = "__catalogo__", product_id = tipo, version, etag, key, cantidad, generado
+Se regenera con el stream de DynamoDB de la tabla de productos (regenerar_catalogo_stream).
+
+obtener_catalogo(tipo) devuelve la copia del contenedor y solo la recarga de S3 cuando
+cambia la versión del puntero, que se consulta como mucho cada CATALOGO_REFRESCO segundos.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
+from bembos_comun.aws import obtener_cliente, obtener_tabla
+
+TENANT_CATALOGO = '__catalogo__'
+CATALOGO_PREFIJO = os.environ.get('CATALOGO_PREFIJO', 'catalogo/')
+CATALOGO_REFRESCO = float(os.environ.get('CATALOGO_REFRESCO', '5'))
+
+# tipo -> {'version', 'etag', 'items', 'ids', 'json', 'revisar_en'}
+_catalogos = {}
+_tipos = {'tipos': [], 'revisar_en': 0.0}
+_lock = threading.Lock()
+
+def tipo_reservado(tipo):
+    """Los tenant_id con "__" (p. ej. el puntero "__catalogo__") son internos, no tipos de producto."""
+    return str(tipo).startswith('__')
+
+def _a_json(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no serializable a JSON")
+
+def _tabla():
+    return obtener_tabla(os.environ["DYNAMODB_TABLE_PRODUCTOS"])
+
+def _bucket():
+    return os.environ['BUCKET_IMAGENES_PRODUCTOS']
+
+def productos_visibles(tipo):
+    """Todos los productos del tipo que listar_productos mostraría, ordenados por product_id."""
+    items = []
+    kwargs = {
+        'KeyConditionExpression': Key('tenant_id').eq(tipo),
+        'FilterExpression': Attr('estado').not_exists() | Attr('estado').eq('LISTO')
+    }
+    while True:
+        response = _tabla().query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def leer_puntero(tipo):
+    return _tabla().get_item(Key={'tenant_id': TENANT_CATALOGO, 'product_id': tipo}).get('Item')
+
+def regenerar_catalogo(tipo):
+    """
+    Reconstruye el catálogo del tipo. Si el contenido no cambió no publica versión nueva.
+    Devuelve la versión vigente.
+    """
+    items = productos_visibles(tipo)
+    contenido = json.dumps(items, default=_a_json, separators=(',', ':'), sort_keys=True)
+    etag = hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:32]
+
+    puntero = leer_puntero(tipo)
+    if puntero and puntero.get('etag') == etag:
+        return int(puntero['version'])
+
+    version_anterior = int(puntero['version']) if puntero else 0
+    version = version_anterior + 1
+    key = f"{CATALOGO_PREFIJO}{tipo}/v{version}.json.gz"
+    documento = (
+        f'{{"tipo":{json.dumps(tipo)},"version":{version},"etag":"{etag}",'
+        f'"generado":"{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}","items":{contenido}}}'
+    )
+
+    s3 = obtener_cliente('s3')
+    s3.put_object(
+        Bucket=_bucket(),
+        Key=key,
+        Body=gzip.compress(documento.encode('utf-8')),
+        ContentType='application/json',
+        ContentEncoding='gzip',
+        CacheControl='public, max-age=31536000, immutable'
+    )
+
+    tabla = _tabla()
+    try:
+        tabla.put_item(
+            Item={
+                'tenant_id': TENANT_CATALOGO,
+                'product_id': tipo,
+                'version': version,
+                'etag': etag,
+                'key': key,
+                'cantidad': len(items),
+                'generado': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            },
+            # Dos regeneraciones concurrentes: gana la primera, la otra se reintenta desde el stream
+            ConditionExpression='attribute_not_exists(product_id) OR version = :anterior',
+            ExpressionAttributeValues={':anterior': version_anterior}
+        )
+    except tabla.meta.client.exceptions.ConditionalCheckFailedException:
+        s3.delete_object(Bucket=_bucket(), Key=key)
+        raise
+
+    # Se conserva la versión anterior para los lectores que ya tenían el puntero viejo
+    if version_anterior > 1:
+        s3.delete_object(Bucket=_bucket(), Key=f"{CATALOGO_PREFIJO}{tipo}/v{version_anterior - 1}.json.gz")
+
+    print(f"Catálogo {tipo} regenerado: v{version}, {len(items)} productos")
+    return version
+
+def _cargar(tipo, puntero):
+    objeto = obtener_cliente('s3').get_object(Bucket=_bucket(), Key=puntero['key'])
+    documento = gzip.decompress(objeto['Body'].read()).decode('utf-8')
+    items = json.loads(documento)['items']
+    return {
+        'version': int(puntero['version']),
+        'etag': puntero['etag'],
+        'items': items,
+        'ids': [item['product_id'] for item in items],
+        'json': documento
+    }
+
+def obtener_catalogo(tipo):
+    """
+    Catálogo del tipo desde la copia del contenedor, o None si aún no se generó.
+    Devuelve {'version', 'etag', 'items', 'ids', 'json'}.
+    """
+    catalogo = _catalogos.get(tipo)
+    if catalogo is not None and catalogo['revisar_en'] > time.monotonic():
+        return catalogo
+
+    with _lock:
+        catalogo = _catalogos.get(tipo)
+        if catalogo is not None and catalogo['revisar_en'] > time.monotonic():
+            return catalogo
+
+        puntero = leer_puntero(tipo)
+        if puntero is None:
+            return None
+        if catalogo is None or catalogo['version'] != int(puntero['version']):
+            catalogo = _cargar(tipo, puntero)
+        catalogo['revisar_en'] = time.monotonic() + CATALOGO_REFRESCO
+        _catalogos[tipo] = catalogo
+        return catalogo
+
+def tipos_catalogados():
+    """Tipos que tienen catálogo generado (la partición de punteros), con la misma ventana de refresco."""
+    if _tipos['revisar_en'] <= time.monotonic():
+        tipos = []
+        kwargs = {
+            'KeyConditionExpression': Key('tenant_id').eq(TENANT_CATALOGO),
+            'ProjectionExpression': 'product_id'
+        }
+        while True:
+            response = _tabla().query(**kwargs)
+            tipos.extend(item['product_id'] for item in response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        _tipos['tipos'] = tipos
+        _tipos['revisar_en'] = time.monotonic() + CATALOGO_REFRESCO
+    return _tipos['tipos']
+
+def regenerar_catalogo_stream(event, context):
+    """
+    Consumidor del stream de la tabla de productos. También se puede invocar a mano
+    con {"tipos": ["hamburguesas", ...]} para generar los catálogos por primera vez.
+    """
+    tipos = set((event or {}).get('tipos') or [])
+    for record in (event or {}).get('Records', []):
+        tipo = record.get('dynamodb', {}).get('Keys', {}).get('tenant_id', {}).get('S')
+        # Los cambios del propio puntero también llegan por el stream
+        if tipo and tipo != TENANT_CATALOGO:
+            tipos.add(tipo)
+
+    versiones = {}
+    for tipo in sorted(tipos):
+        versiones[tipo] = regenerar_catalogo(tipo)
+    return versiones
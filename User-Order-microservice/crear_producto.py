@@ -1,59 +1,57 @@
-import boto3
 import uuid
-import base64
 import os
 from datetime import datetime
-from validate_token import validate_token  # reutilizamos tu función
+from validate_token import contexto_autorizador
+from bembos_comun.aws import obtener_cliente, obtener_tabla
+from catalogo import tipo_reservado
 
-s3 = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+# Las imágenes se suben directo a S3 con una URL prefirmada; procesar_imagen_producto
+# deriva la versión small a partir de la large y marca el producto como LISTO.
+PREFIJO_UPLOADS = 'uploads/'
+URL_SUBIDA_EXPIRA_SEGUNDOS = int(os.environ.get('URL_SUBIDA_EXPIRA_SEGUNDOS', '900'))
+TIPOS_IMAGEN = ('image/jpeg', 'image/png', 'image/webp')
 
-def upload_image(base64_data, filename):
-    bucket = os.environ['BUCKET_IMAGENES_PRODUCTOS']
-    binary = base64.b64decode(base64_data)
-    
-    s3.put_object(
-        Bucket=bucket,
-        Key=filename,
-        Body=binary,
-        ContentType="image/jpeg"
-    )
-
-    return f"https://{bucket}.s3.amazonaws.com/{filename}"
+def clave_subida(tipo, product_id):
+    return f"{PREFIJO_UPLOADS}{tipo}/{product_id}"
 
 def crear_producto(event, context):
-    # Validación de token
-    token_validation = validate_token(event, context)
-    if token_validation['statusCode'] != 200:
-        return token_validation
+    # El token ya lo validó el autorizador de API Gateway
+    if contexto_autorizador(event) is None:
+        return {
+            'statusCode': 401,
+            'body': 'No autorizado'
+        }
     
     body = event['body']
     nombre = body.get('nombre')
     tipo = body.get('tipo')  # <- será tenant_id
     precio = body.get('precio')
     promo = body.get('promo', False)
-    imagen_small = body.get('imagen_small')
-    imagen_large = body.get('imagen_large')
+    content_type = body.get('content_type', 'image/jpeg')
 
-    if not nombre or not tipo or not precio or not imagen_small or not imagen_large:
+    if not nombre or not tipo or not precio:
         return {
             'statusCode': 400,
             'body': 'Faltan datos'
         }
 
-    product_id = str(uuid.uuid4())
-    promo_id = f"{uuid.uuid4()}#FoT" if promo else "NO_PROMO"
+    if tipo_reservado(tipo):
+        return {
+            'statusCode': 400,
+            'body': f'Tipo no válido: {tipo}'
+        }
 
-    # Crear nombres de archivos S3
-    filename_small = f"{tipo}/{product_id}_small.jpg"
-    filename_large = f"{tipo}/{product_id}_large.jpg"
+    if content_type not in TIPOS_IMAGEN:
+        return {
+            'statusCode': 400,
+            'body': f"content_type debe ser uno de: {', '.join(TIPOS_IMAGEN)}"
+        }
 
-    # Guardar imágenes
-    url_small = upload_image(imagen_small, filename_small)
-    url_large = upload_image(imagen_large, filename_large)
+    product_id = str(uuid.uuid4())
+    promo_id = f"{uuid.uuid4()}#FoT" if promo else "NO_PROMO"
 
-    # Guardar en DynamoDB
-    table = dynamodb.Table(os.environ["DYNAMODB_TABLE_PRODUCTOS"])
+    # Guardar en DynamoDB; las URLs de las imágenes las completa el procesador de S3
+    table = obtener_tabla(os.environ["DYNAMODB_TABLE_PRODUCTOS"])
     table.put_item(
         Item={
             "tenant_id": tipo,
@@ -61,18 +59,30 @@ def crear_producto(event, context):
             "nombre": nombre,
             "precio": precio,
             "promo_id": promo_id,
-            "url_small": url_small,
-            "url_large": url_large,
+            "estado": "PENDIENTE_IMAGEN",
             "creado": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     )
 
+    # URL prefirmada para subir la imagen grande (el cliente hace PUT con el mismo Content-Type)
+    upload_url = obtener_cliente('s3').generate_presigned_url(
+        'put_object',
+        Params={
+            'Bucket': os.environ['BUCKET_IMAGENES_PRODUCTOS'],
+            'Key': clave_subida(tipo, product_id),
+            'ContentType': content_type
+        },
+        ExpiresIn=URL_SUBIDA_EXPIRA_SEGUNDOS
+    )
+
     return {
         'statusCode': 200,
         'body': {
-            "message": "Producto creado",
+            "message": "Producto creado, pendiente de imagen",
             "product_id": product_id,
-            "url_small": url_small,
-            "url_large": url_large
+            "upload_url": upload_url,
+            "upload_method": "PUT",
+            "upload_headers": {"Content-Type": content_type},
+            "expira_en_segundos": URL_SUBIDA_EXPIRA_SEGUNDOS
         }
-    }
+    }
\ No newline at end of file
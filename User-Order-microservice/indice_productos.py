@@ -0,0 +1,164 @@
+"""
+Índice de búsqueda en memoria sobre el catálogo materializado (catalogo.py).
+
+Por cada tipo se mantiene:
+  - vocabulario: lista ordenada de términos normalizados de `nombre` (prefijos con bisect)
+  - postings: término -> set de product_id
+  - precios: lista ordenada de (precio, product_id) para rangos de precio
+  - promos: promo_id -> set de product_id
+El índice se actualiza de forma incremental cuando cambia la versión del catálogo:
+solo se reindexan los productos nuevos, modificados o eliminados.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from catalogo import obtener_catalogo
+
+SIN_PROMO = 'NO_PROMO'
+_SEPARADOR = re.compile(r'[^0-9a-z]+')
+
+# tipo -> {'version', 'items', 'vocabulario', 'postings', 'precios', 'promos'}
+_indices = {}
+_lock = threading.Lock()
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Combo Clásico' -> 'combo clasico'."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+def terminos(texto):
+    return [t for t in _SEPARADOR.split(normalizar(texto)) if t]
+
+def leer_precio(item):
+    try:
+        return float(item.get('precio'))
+    except (TypeError, ValueError):
+        return None
+
+def _indice_vacio():
+    return {'version': None, 'items': {}, 'vocabulario': [], 'postings': {}, 'precios': [], 'promos': {}}
+
+def _agregar(indice, item):
+    product_id = item['product_id']
+    indice['items'][product_id] = item
+    for termino in set(terminos(item.get('nombre'))):
+        ids = indice['postings'].get(termino)
+        if ids is None:
+            ids = indice['postings'][termino] = set()
+            insort(indice['vocabulario'], termino)
+        ids.add(product_id)
+    precio = leer_precio(item)
+    if precio is not None:
+        insort(indice['precios'], (precio, product_id))
+    indice['promos'].setdefault(item.get('promo_id') or SIN_PROMO, set()).add(product_id)
+
+def _quitar(indice, product_id):
+    item = indice['items'].pop(product_id)
+    for termino in set(terminos(item.get('nombre'))):
+        ids = indice['postings'][termino]
+        ids.discard(product_id)
+        if not ids:
+            del indice['postings'][termino]
+            del indice['vocabulario'][bisect_left(indice['vocabulario'], termino)]
+    precio = leer_precio(item)
+    if precio is not None:
+        del indice['precios'][bisect_left(indice['precios'], (precio, product_id))]
+    promo_id = item.get('promo_id') or SIN_PROMO
+    indice['promos'][promo_id].discard(product_id)
+    if not indice['promos'][promo_id]:
+        del indice['promos'][promo_id]
+
+def actualizar_indice(indice, items):
+    """Lleva el índice al contenido de `items`. Devuelve cuántos productos se reindexaron."""
+    nuevos = {item['product_id']: item for item in items}
+    cambios = 0
+    for product_id in list(indice['items']):
+        if nuevos.get(product_id) != indice['items'][product_id]:
+            _quitar(indice, product_id)
+            cambios += 1
+    for product_id, item in nuevos.items():
+        if product_id not in indice['items']:
+            _agregar(indice, item)
+            cambios += 1
+    return cambios
+
+def obtener_indice(tipo):
+    """Índice del tipo al día con la versión del catálogo, o None si no hay catálogo."""
+    catalogo = obtener_catalogo(tipo)
+    if catalogo is None:
+        return None
+
+    indice = _indices.get(tipo)
+    if indice is not None and indice['version'] == catalogo['version']:
+        return indice
+
+    with _lock:
+        indice = _indices.get(tipo) or _indice_vacio()
+        if indice['version'] != catalogo['version']:
+            cambios = actualizar_indice(indice, catalogo['items'])
+            print(f"Índice {tipo}: v{indice['version']} -> v{catalogo['version']}, {cambios} productos reindexados")
+            indice['version'] = catalogo['version']
+            _indices[tipo] = indice
+        return indice
+
+def _por_prefijo(indice, prefijo):
+    """product_id cuyo nombre tiene algún término que empieza por `prefijo`, con el puntaje del término."""
+    vocabulario = indice['vocabulario']
+    encontrados = {}
+    i = bisect_left(vocabulario, prefijo)
+    while i < len(vocabulario) and vocabulario[i].startswith(prefijo):
+        termino = vocabulario[i]
+        # Término completo pesa más que prefijo; entre prefijos, el más corto se parece más
+        puntaje = 2.0 if termino == prefijo else len(prefijo) / len(termino)
+        for product_id in indice['postings'][termino]:
+            if puntaje > encontrados.get(product_id, 0):
+                encontrados[product_id] = puntaje
+        i += 1
+    return encontrados
+
+def _por_precio(indice, precio_min, precio_max):
+    precios = indice['precios']
+    desde = 0 if precio_min is None else bisect_left(precios, (precio_min, ''))
+    hasta = len(precios) if precio_max is None else bisect_right(precios, (precio_max, '\uffff'))
+    return {product_id for _, product_id in precios[desde:hasta]}
+
+def buscar(indice, texto=None, promo_id=None, promo=None, precio_min=None, precio_max=None):
+    """
+    Productos del índice que cumplen todos los filtros, como lista de (puntaje, item).
+    Todos los términos de `texto` deben coincidir como prefijo de algún término del nombre.
+    """
+    consulta = terminos(texto)
+    puntajes = None
+    for posicion, prefijo in enumerate(consulta):
+        encontrados = _por_prefijo(indice, prefijo)
+        if puntajes is None:
+            puntajes = encontrados
+        else:
+            puntajes = {pid: p + encontrados[pid] for pid, p in puntajes.items() if pid in encontrados}
+        if not puntajes:
+            return []
+
+    if puntajes is None:
+        candidatos = set(indice['items'])
+        puntajes = {}
+    else:
+        candidatos = set(puntajes)
+
+    if precio_min is not None or precio_max is not None:
+        candidatos &= _por_precio(indice, precio_min, precio_max)
+    if promo_id:
+        candidatos &= indice['promos'].get(promo_id, set())
+    if promo is not None:
+        sin_promo = indice['promos'].get(SIN_PROMO, set())
+        candidatos = candidatos - sin_promo if promo else candidatos & sin_promo
+
+    resultado = []
+    for product_id in candidatos:
+        item = indice['items'][product_id]
+        puntaje = puntajes.get(product_id, 0)
+        # Desempate: coincidencia al inicio del nombre
+        if consulta and normalizar(item.get('nombre')).startswith(consulta[0]):
+            puntaje += 0.5
+        resultado.append((puntaje, item))
+    return resultado
@@ -1,28 +1,145 @@
-import boto3
 import os
-from validate_token import validate_token
+from bisect import bisect_right
+from boto3.dynamodb.conditions import Key, Attr
+from validate_token import contexto_autorizador
+from bembos_comun.aws import obtener_tabla
+from bembos_comun.paginacion import codificar_token, decodificar_token, leer_limite, paginar
+from catalogo import obtener_catalogo, tipo_reservado
 
-dynamodb = boto3.resource('dynamodb')
+LISTAR_PRODUCTOS_LIMITE = int(os.environ.get('LISTAR_PRODUCTOS_LIMITE', '100'))
+LISTAR_PRODUCTOS_LIMITE_MAX = int(os.environ.get('LISTAR_PRODUCTOS_LIMITE_MAX', '500'))
+
+def _if_none_match(event):
+    headers = event.get('headers') or {}
+    for nombre, valor in headers.items():
+        if nombre.lower() == 'if-none-match':
+            return [etag.strip() for etag in (valor or '').split(',')]
+    return []
+
+def _pagina_catalogo(catalogo, tipo, limite, exclusive_start_key):
+    """Misma página que daría el Query, servida desde el catálogo materializado."""
+    inicio = 0
+    if exclusive_start_key:
+        inicio = bisect_right(catalogo['ids'], exclusive_start_key.get('product_id', ''))
+    items = catalogo['items'][inicio:inicio + limite]
+    last_evaluated_key = None
+    if inicio + limite < len(catalogo['items']):
+        last_evaluated_key = {'tenant_id': tipo, 'product_id': items[-1]['product_id']}
+    etag = f'"{catalogo["etag"]}-{inicio}-{limite}"'
+    return items, last_evaluated_key, etag
 
 def listar_productos(event, context):
-    token_validation = validate_token(event, context)
-    if token_validation['statusCode'] != 200:
-        return token_validation
+    # El token ya lo validó el autorizador de API Gateway
+    if contexto_autorizador(event) is None:
+        return {
+            'statusCode': 401,
+            'body': 'No autorizado'
+        }
 
-    tipo = event["queryStringParameters"].get("tipo")
+    query_params = event.get("queryStringParameters") or {}
+    tipo = query_params.get("tipo")
     if not tipo:
         return {
             'statusCode': 400,
             'body': 'Debes enviar ?tipo=pizza'
         }
+    if tipo_reservado(tipo):
+        return {
+            'statusCode': 400,
+            'body': f'Tipo no válido: {tipo}'
+        }
 
-    table = dynamodb.Table(os.environ["DYNAMODB_TABLE_PRODUCTOS"])
+    try:
+        limite = leer_limite(query_params, defecto=LISTAR_PRODUCTOS_LIMITE, maximo=LISTAR_PRODUCTOS_LIMITE_MAX)
+        exclusive_start_key = decodificar_token(query_params.get("next_token"))
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': str(e)
+        }
 
-    response = table.query(
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("tenant_id").eq(tipo)
+    catalogo = obtener_catalogo(tipo)
+    if catalogo is not None:
+        items, last_evaluated_key, etag = _pagina_catalogo(catalogo, tipo, limite, exclusive_start_key)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in _if_none_match(event):
+            return {
+                'statusCode': 304,
+                'headers': headers
+            }
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': {
+                'items': items,
+                'next_token': codificar_token(last_evaluated_key)
+            }
+        }
+
+    # Tipo sin catálogo generado todavía: se consulta la tabla
+    table = obtener_tabla(os.environ["DYNAMODB_TABLE_PRODUCTOS"])
+
+    # Orden estable por product_id (clave de rango). Los productos cuya imagen aún
+    # no se procesó no se listan; los anteriores al flujo de subida no tienen estado.
+    items, last_evaluated_key, _ = paginar(
+        table.query,
+        {
+            'KeyConditionExpression': Key("tenant_id").eq(tipo),
+            'FilterExpression': Attr("estado").not_exists() | Attr("estado").eq("LISTO")
+        },
+        limite,
+        ("tenant_id", "product_id"),
+        exclusive_start_key
     )
 
     return {
         'statusCode': 200,
-        'body': response["Items"]
+        'body': {
+            'items': items,
+            'next_token': codificar_token(last_evaluated_key)
+        }
+    }
+
+def catalogo_productos(event, context):
+    """Catálogo completo del tipo en un solo documento, con ETag / If-None-Match."""
+    if contexto_autorizador(event) is None:
+        return {
+            'statusCode': 401,
+            'body': 'No autorizado'
+        }
+
+    tipo = (event.get("queryStringParameters") or {}).get("tipo")
+    if not tipo:
+        return {
+            'statusCode': 400,
+            'body': 'Debes enviar ?tipo=pizza'
+        }
+    if tipo_reservado(tipo):
+        return {
+            'statusCode': 400,
+            'body': f'Tipo no válido: {tipo}'
+        }
+
+    catalogo = obtener_catalogo(tipo)
+    if catalogo is None:
+        return {
+            'statusCode': 404,
+            'body': f'No hay catálogo generado para {tipo}'
+        }
+
+    headers = {
+        'ETag': f'"{catalogo["etag"]}"',
+        'Cache-Control': 'private, no-cache',
+        'Content-Type': 'application/json'
+    }
+    if headers['ETag'] in _if_none_match(event):
+        return {
+            'statusCode': 304,
+            'headers': headers
+        }
+    # El documento ya está serializado; API Gateway lo comprime si el cliente acepta gzip
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': catalogo['json']
     }
@@ -1,8 +1,10 @@
-import boto3
 import hashlib
 import uuid
 import os
 from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key
+from bembos_comun.aws import obtener_tabla
+import tokens_firmados
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -19,12 +21,11 @@ def login_user(event, context):
         usuarios_table_name = os.environ['DYNAMODB_TABLE_USUARIOS']
         tokens_table_name = os.environ['DYNAMODB_TABLE_TOKENS']
 
-        dynamodb = boto3.resource('dynamodb')
-        usuarios_table = dynamodb.Table(usuarios_table_name)
+        usuarios_table = obtener_tabla(usuarios_table_name)
 
         # Buscar el usuario usando solo tenant_id (correo electrónico)
         response = usuarios_table.query(
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('tenant_id').eq(tenant_id)
+            KeyConditionExpression=Key('tenant_id').eq(tenant_id)
         )
 
         if 'Items' not in response or len(response['Items']) == 0:
@@ -38,7 +39,19 @@ def login_user(event, context):
         hashed_password_bd = user['password']
 
         if hashed_password_bd == hash_password(password):
-            # Generar token
+            if tokens_firmados.emision_activa():
+                # Token firmado: se valida sin consultar la tabla de tokens
+                token, _ = tokens_firmados.emitir(user['user_id'], user['role'], tenant_id)
+                return {
+                    'statusCode': 200,
+                    'body': {
+                        'message': 'Login exitoso',
+                        'token': token,
+                        'role': user['role']
+                    }
+                }
+
+            # Generar token opaco (antes de la migración a tokens firmados)
             token = str(uuid.uuid4())  # UUID único para el token
             token_id = str(uuid.uuid4())  # UUID para el token_id (clave de ordenamiento)
             expiration_time = datetime.now() + timedelta(hours=1)
@@ -53,7 +66,7 @@ def login_user(event, context):
             }
 
             # Almacenar el token en DynamoDB
-            tokens_table = dynamodb.Table(tokens_table_name)
+            tokens_table = obtener_tabla(tokens_table_name)
             tokens_table.put_item(Item=token_data)
 
             return {
@@ -0,0 +1,84 @@
+import os
+import uuid
+from boto3.dynamodb.conditions import Key
+from bembos_comun.aws import obtener_tabla
+from cache_tokens import invalidar_token
+import tokens_firmados
+
+def es_token_opaco(token):
+    try:
+        return str(uuid.UUID(token)) == token
+    except ValueError:
+        return False
+
+def logout_user(event, context):
+    try:
+        # Obtener el token desde el header Authorization (formato Bearer <token>)
+        token = (event.get('headers') or {}).get('Authorization', '').replace('Bearer ', '')
+        if not token:
+            return {
+                'statusCode': 400,
+                'body': {'error': 'Faltan datos en los headers'}
+            }
+
+        if tokens_firmados.es_firmado(token):
+            claims, motivo = tokens_firmados.verificar(token)
+            if claims is None:
+                return {
+                    'statusCode': 403,
+                    'body': 'Token no válido o no encontrado' if motivo == 'invalido' else f'Token {motivo}'
+                }
+            # Lista de revocación hasta que el token expire
+            tokens_firmados.revocar(claims)
+            return {
+                'statusCode': 200,
+                'body': {'message': 'Logout exitoso'}
+            }
+
+        # Los tokens opacos son UUID (login_user): cualquier otro valor no es una partición de token
+        if not es_token_opaco(token):
+            return {
+                'statusCode': 403,
+                'body': 'Token no válido o no encontrado'
+            }
+
+        tokens_table = obtener_tabla(os.environ['DYNAMODB_TABLE_TOKENS'])
+
+        # El token es la clave de partición: borrar todos sus items
+        response = tokens_table.query(
+            KeyConditionExpression=Key('tenant_id').eq(token)
+        )
+        with tokens_table.batch_writer() as batch:
+            for item in response.get('Items', []):
+                batch.delete_item(Key={'tenant_id': item['tenant_id'], 'token_id': item['token_id']})
+
+        # Olvidar el token en la caché de este contenedor
+        invalidar_token(token)
+
+        return {
+            'statusCode': 200,
+            'body': {'message': 'Logout exitoso'}
+        }
+
+    except Exception as e:
+        print("Error en logout_user:", str(e))  # Log en CloudWatch
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+# Expiración forzada (cambio de password, rol, etc.): invocar a mano con
+# `serverless invoke -f revocarTokensUsuario -d '{"user_id": "..."}'`
+def revocar_tokens_usuario(event, context):
+    user_id = (event or {}).get('user_id')
+    if not user_id:
+        return {
+            'statusCode': 400,
+            'body': {'error': 'Falta user_id'}
+        }
+
+    tokens_firmados.revocar_usuario(user_id)
+    return {
+        'statusCode': 200,
+        'body': {'message': f'Tokens del usuario {user_id} revocados'}
+    }
@@ -0,0 +1,130 @@
+"""
+Procesador de eventos S3 (ObjectCreated en uploads/) para las imágenes de producto.
+
+Por cada imagen subida con la URL prefirmada de crear_producto:
+  1. valida que sea una imagen (Pillow) y que no pase de IMAGEN_MAX_BYTES,
+  2. guarda la versión large con el Content-Type correcto ({tipo}/{product_id}_large.<ext>),
+  3. deriva la versión small como miniatura JPEG ({tipo}/{product_id}_small.jpg),
+  4. marca el producto como LISTO con url_small / url_large y borra el original.
+S3 puede entregar un evento más de una vez: si el original ya no está, esa subida ya se
+procesó (y se borró) y el evento repetido se ignora sin error.
+"""
+import io
+import os
+import warnings
+from urllib.parse import unquote_plus
+from bembos_comun.aws import obtener_cliente, obtener_tabla
+
+PREFIJO_UPLOADS = 'uploads/'
+IMAGEN_MAX_BYTES = int(os.environ.get('IMAGEN_MAX_BYTES', str(10 * 1024 * 1024)))
+# Lado mayor de la miniatura, en píxeles
+IMAGEN_SMALL_LADO = int(os.environ.get('IMAGEN_SMALL_LADO', '320'))
+IMAGEN_SMALL_CALIDAD = int(os.environ.get('IMAGEN_SMALL_CALIDAD', '82'))
+
+# formato de Pillow -> (extensión, Content-Type)
+FORMATOS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp')
+}
+
+class ImagenInvalida(Exception):
+    pass
+
+def _url(bucket, key):
+    return f"https://{bucket}.s3.amazonaws.com/{key}"
+
+def derivar_small(imagen):
+    """Miniatura JPEG de la imagen (sin canal alfa), como bytes."""
+    from PIL import Image
+
+    small = imagen.copy()
+    small.thumbnail((IMAGEN_SMALL_LADO, IMAGEN_SMALL_LADO), Image.LANCZOS)
+    if small.mode != 'RGB':
+        # Transparencias sobre fondo blanco
+        fondo = Image.new('RGB', small.size, (255, 255, 255))
+        fondo.paste(small, mask=small.convert('RGBA').split()[-1])
+        small = fondo
+    salida = io.BytesIO()
+    small.save(salida, format='JPEG', quality=IMAGEN_SMALL_CALIDAD, optimize=True, progressive=True)
+    return salida.getvalue()
+
+def abrir_imagen(datos):
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # Dimensiones sobre Image.MAX_IMAGE_PIXELS (bomba de descompresión): Pillow solo
+        # avisa hasta el doble del límite y lanza DecompressionBombError por encima
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            imagen = Image.open(io.BytesIO(datos))
+            imagen.load()
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError) as e:
+        raise ImagenInvalida(f"Imagen demasiado grande: {e}")
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImagenInvalida(f"No es una imagen válida: {e}")
+    if imagen.format not in FORMATOS:
+        raise ImagenInvalida(f"Formato no soportado: {imagen.format}")
+    return imagen
+
+def procesar_subida(bucket, key):
+    """Procesa uploads/{tipo}/{product_id}. Devuelve el estado final del producto."""
+    tipo, _, product_id = key[len(PREFIJO_UPLOADS):].rpartition('/')
+    if not tipo or not product_id:
+        print(f"Clave de subida inesperada, se ignora: {key}")
+        return None
+
+    s3 = obtener_cliente('s3')
+    table = obtener_tabla(os.environ["DYNAMODB_TABLE_PRODUCTOS"])
+
+    try:
+        objeto = s3.get_object(Bucket=bucket, Key=key)
+    except s3.exceptions.NoSuchKey:
+        print(f"La subida {key} ya fue procesada, se ignora el evento repetido")
+        return None
+
+    try:
+        if objeto['ContentLength'] > IMAGEN_MAX_BYTES:
+            raise ImagenInvalida(f"La imagen pesa {objeto['ContentLength']} bytes (máximo {IMAGEN_MAX_BYTES})")
+        datos = objeto['Body'].read()
+        imagen = abrir_imagen(datos)
+
+        extension, content_type = FORMATOS[imagen.format]
+        key_large = f"{tipo}/{product_id}_large.{extension}"
+        key_small = f"{tipo}/{product_id}_small.jpg"
+
+        s3.put_object(Bucket=bucket, Key=key_large, Body=datos, ContentType=content_type,
+                      CacheControl='public, max-age=31536000, immutable')
+        s3.put_object(Bucket=bucket, Key=key_small, Body=derivar_small(imagen), ContentType='image/jpeg',
+                      CacheControl='public, max-age=31536000, immutable')
+
+        estado = 'LISTO'
+        expresion = "SET estado = :estado, url_small = :small, url_large = :large"
+        valores = {':estado': estado, ':small': _url(bucket, key_small), ':large': _url(bucket, key_large)}
+    except ImagenInvalida as e:
+        print(f"Imagen rechazada para el producto {product_id}: {str(e)}")
+        estado = 'IMAGEN_INVALIDA'
+        expresion = "SET estado = :estado"
+        valores = {':estado': estado}
+
+    try:
+        table.update_item(
+            Key={'tenant_id': tipo, 'product_id': product_id},
+            UpdateExpression=expresion,
+            ConditionExpression='attribute_exists(product_id)',
+            ExpressionAttributeValues=valores
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        print(f"El producto {product_id} no existe, se descarta la imagen")
+        estado = None
+
+    s3.delete_object(Bucket=bucket, Key=key)
+    return estado
+
+def procesar_imagen(event, context):
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        # Las claves llegan codificadas en el evento de S3
+        key = unquote_plus(record['s3']['object']['key'])
+        estado = procesar_subida(bucket, key)
+        print(f"Imagen {key} procesada: {estado}")
@@ -1,8 +1,8 @@
-import boto3
 import hashlib
 import uuid
 import os
 from datetime import datetime
+from bembos_comun.aws import obtener_tabla
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -34,8 +34,7 @@ def register_user(event, context):
         fecha_registro = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         # Conectar a DynamoDB
-        dynamodb = boto3.resource('dynamodb')
-        usuarios_table = dynamodb.Table(os.environ['DYNAMODB_TABLE_USUARIOS'])
+        usuarios_table = obtener_tabla(os.environ['DYNAMODB_TABLE_USUARIOS'])
 
         # Almacenar el usuario en DynamoDB
         usuario_data = {
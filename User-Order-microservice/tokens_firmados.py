@@ -0,0 +1,184 @@
+"""
+Tokens de acceso firmados (sin estado) para User-Order.
+
+Formato: "v1.<payload>.<firma>", con payload = base64url(JSON) y
+firma = base64url(HMAC-SHA256(TOKEN_SECRETO, "v1.<payload>")). El payload lleva
+  uid (user_id), rol, ten (correo del usuario), iat, exp (epoch) y jti (id único)
+y se verifica localmente, sin consultar la tabla de tokens.
+
+Logout y expiración forzada van por una lista de revocación compacta guardada en
+su propia tabla (DYNAMODB_TABLE_REVOCADOS, partición lista = "revocados", con TTL en
+`expira_en`), aparte de la tabla de tokens opacos cuyas claves vienen del cliente:
+  - token_id = "<jti>"          revoca un token concreto (logout)
+  - token_id = "uid#<user_id>"  revoca los tokens del usuario emitidos antes de `desde`
+Cada contenedor la recarga cada TOKEN_REVOCADOS_REFRESCO segundos.
+
+Migración: mientras TOKEN_SECRETO no esté definido login_user sigue emitiendo los
+tokens opacos de antes, y estos se aceptan hasta TOKENS_OPACOS_HASTA (vacío = sin límite).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from boto3.dynamodb.conditions import Key
+from bembos_comun.aws import obtener_tabla
+
+TOKEN_SECRETO = os.environ.get('TOKEN_SECRETO', '')
+TOKEN_TTL_SEGUNDOS = int(os.environ.get('TOKEN_TTL_SEGUNDOS', '3600'))
+TOKEN_REVOCADOS_REFRESCO = float(os.environ.get('TOKEN_REVOCADOS_REFRESCO', '30'))
+# Fecha ISO (YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS) hasta la que se aceptan tokens opacos
+TOKENS_OPACOS_HASTA = os.environ.get('TOKENS_OPACOS_HASTA', '')
+
+VERSION = 'v1'
+LISTA_REVOCADOS = 'revocados'
+PREFIJO_USUARIO = 'uid#'
+
+# Lista de revocación del contenedor
+_revocados = {'jti': set(), 'usuarios': {}, 'refrescar_en': 0.0}
+_lock = threading.Lock()
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+def _desde_b64(texto):
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+def _firma(mensaje):
+    return _b64(hmac.new(TOKEN_SECRETO.encode('utf-8'), mensaje.encode('ascii'), hashlib.sha256).digest())
+
+def _firma_valida(mensaje, firma):
+    # El token viene del cliente: lo que no sea ASCII no puede ser un token nuestro
+    try:
+        return hmac.compare_digest(firma.encode('ascii'), _firma(mensaje).encode('ascii'))
+    except UnicodeError:
+        return False
+
+def es_firmado(token):
+    return token.startswith(VERSION + '.')
+
+def emision_activa():
+    """login_user emite tokens firmados solo cuando hay secreto configurado."""
+    return bool(TOKEN_SECRETO)
+
+def opacos_aceptados():
+    if not TOKENS_OPACOS_HASTA:
+        return True
+    return datetime.now().isoformat() <= TOKENS_OPACOS_HASTA
+
+def emitir(user_id, role, tenant_id):
+    """Devuelve (token, exp) para el usuario."""
+    ahora = int(time.time())
+    claims = {
+        'uid': user_id,
+        'rol': role,
+        'ten': tenant_id,
+        'iat': ahora,
+        'exp': ahora + TOKEN_TTL_SEGUNDOS,
+        'jti': uuid.uuid4().hex
+    }
+    payload = _b64(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    mensaje = f"{VERSION}.{payload}"
+    return f"{mensaje}.{_firma(mensaje)}", claims['exp']
+
+def decodificar(token):
+    """Claims del token si la firma es válida (sin mirar expiración ni revocación), o None."""
+    if not TOKEN_SECRETO:
+        return None
+    version, _, resto = token.partition('.')
+    payload, _, firma = resto.partition('.')
+    if version != VERSION or not payload or not firma:
+        return None
+    if not _firma_valida(f"{version}.{payload}", firma):
+        return None
+    try:
+        claims = json.loads(_desde_b64(payload))
+    except (ValueError, TypeError):
+        return None
+    return claims if isinstance(claims, dict) else None
+
+def _tabla_revocados():
+    return obtener_tabla(os.environ['DYNAMODB_TABLE_REVOCADOS'])
+
+def _refrescar_revocados():
+    jti = set()
+    usuarios = {}
+    ahora = int(time.time())
+    kwargs = {
+        'KeyConditionExpression': Key('lista').eq(LISTA_REVOCADOS),
+        'ProjectionExpression': 'token_id, desde, expira_en'
+    }
+    while True:
+        response = _tabla_revocados().query(**kwargs)
+        for item in response.get('Items', []):
+            # El TTL de DynamoDB borra con retraso: ignorar lo ya vencido
+            if int(item.get('expira_en', 0)) <= ahora:
+                continue
+            token_id = item['token_id']
+            if token_id.startswith(PREFIJO_USUARIO):
+                usuarios[token_id[len(PREFIJO_USUARIO):]] = int(item.get('desde', 0))
+            else:
+                jti.add(token_id)
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    _revocados['jti'] = jti
+    _revocados['usuarios'] = usuarios
+
+def _lista_revocacion():
+    if _revocados['refrescar_en'] <= time.monotonic():
+        with _lock:
+            if _revocados['refrescar_en'] <= time.monotonic():
+                try:
+                    _refrescar_revocados()
+                except Exception as e:
+                    # Se sigue con la última lista conocida y se reintenta en el próximo periodo
+                    print("Error refrescando la lista de revocación:", str(e))
+                _revocados['refrescar_en'] = time.monotonic() + TOKEN_REVOCADOS_REFRESCO
+    return _revocados
+
+def verificar(token):
+    """
+    Devuelve (claims, None) si el token es válido, o (None, motivo) con motivo en
+    'invalido', 'expirado' o 'revocado'.
+    """
+    claims = decodificar(token)
+    if claims is None:
+        return None, 'invalido'
+    if int(claims.get('exp', 0)) <= int(time.time()):
+        return None, 'expirado'
+
+    revocados = _lista_revocacion()
+    if claims.get('jti') in revocados['jti']:
+        return None, 'revocado'
+    desde = revocados['usuarios'].get(claims.get('uid'))
+    if desde is not None and int(claims.get('iat', 0)) < desde:
+        return None, 'revocado'
+    return claims, None
+
+def revocar(claims):
+    """Revoca un token concreto (logout) hasta su expiración."""
+    _tabla_revocados().put_item(Item={
+        'lista': LISTA_REVOCADOS,
+        'token_id': claims['jti'],
+        'expira_en': int(claims['exp'])
+    })
+    # Efecto inmediato en este contenedor; los demás lo ven en el próximo refresco
+    _revocados['jti'].add(claims['jti'])
+
+def revocar_usuario(user_id, desde=None):
+    """Expiración forzada: invalida los tokens del usuario emitidos antes de `desde` (epoch)."""
+    desde = int(desde if desde is not None else time.time()) + 1
+    _tabla_revocados().put_item(Item={
+        'lista': LISTA_REVOCADOS,
+        'token_id': f"{PREFIJO_USUARIO}{user_id}",
+        'desde': desde,
+        # Pasado un TTL de token ya no queda ninguno emitido antes de `desde`
+        'expira_en': desde + TOKEN_TTL_SEGUNDOS
+    })
+    _revocados['usuarios'][user_id] = desde
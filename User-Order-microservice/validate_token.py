@@ -1,10 +1,69 @@
-import boto3
 import os  # Para acceder a las variables de entorno
 from datetime import datetime
+from boto3.dynamodb.conditions import Key
+from bembos_comun.aws import obtener_tabla
+import cache_tokens
+import tokens_firmados
 
-def validate_token(event, context):
-    print("Event recibido en validate_token:", event)  # Log en CloudWatch
+MENSAJES_RECHAZO = {
+    'invalido': 'Token no válido o no encontrado',
+    'expirado': 'Token expirado',
+    'revocado': 'Token revocado'
+}
+
+def buscar_token(token):
+    """Devuelve el item del token (o None si no existe), pasando por la caché del contenedor."""
+    en_cache, token_item = cache_tokens.buscar(token)
+    if en_cache:
+        return token_item
+
+    # Obtener el nombre de la tabla de tokens desde las variables de entorno
+    tokens_table = obtener_tabla(os.environ['DYNAMODB_TABLE_TOKENS'])
+
+    # Ahora necesitamos hacer una consulta usando el token como tenant_id
+    response = tokens_table.query(
+        KeyConditionExpression=Key('tenant_id').eq(token)
+    )
+
+    # Verificar si existe el token
+    if 'Items' not in response or len(response['Items']) == 0:
+        cache_tokens.guardar_negativo(token)
+        return None
+
+    # Obtener el primer item (se supone que el token es único para cada usuario)
+    token_item = response['Items'][0]
+    cache_tokens.guardar(token, token_item)
+    return token_item
+
+def identificar_token(token):
+    """
+    Devuelve (identidad, None) con identidad = {'user_id', 'role', 'tenant_id'} si el
+    token es válido, o (None, motivo). Los tokens firmados se verifican sin I/O; los
+    opacos (anteriores a la migración) se buscan en la tabla de tokens.
+    """
+    if tokens_firmados.es_firmado(token):
+        claims, motivo = tokens_firmados.verificar(token)
+        if claims is None:
+            return None, motivo
+        return {'user_id': claims['uid'], 'role': claims['rol'], 'tenant_id': claims.get('ten')}, None
+
+    if not tokens_firmados.opacos_aceptados():
+        return None, 'invalido'
 
+    token_item = buscar_token(token)
+    if token_item is None:
+        return None, 'invalido'
+
+    # Validar si el token ha expirado
+    expires = token_item['expires']
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    if now > expires:
+        return None, 'expirado'
+
+    return {'user_id': token_item.get('user_id'), 'role': token_item.get('role'), 'tenant_id': None}, None
+
+def validate_token(event, context):
     try:
         # Obtener el token desde el header Authorization (formato Bearer <token>)
         token = event['headers'].get('Authorization').replace('Bearer ', '')  
@@ -14,35 +73,12 @@ def validate_token(event, context):
                 'body': {'error': 'Faltan datos en los headers'}
             }
 
-        # Obtener el nombre de la tabla de tokens desde las variables de entorno
-        tokens_table_name = os.environ['DYNAMODB_TABLE_TOKENS']
-
-        dynamodb = boto3.resource('dynamodb')
-        tokens_table = dynamodb.Table(tokens_table_name)
-
-        # Ahora necesitamos hacer una consulta usando el token como tenant_id
-        response = tokens_table.query(
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('tenant_id').eq(token)
-        )
+        identidad, motivo = identificar_token(token)
 
-        # Verificar si existe el token
-        if 'Items' not in response or len(response['Items']) == 0:
+        if identidad is None:
             return {
                 'statusCode': 403,
-                'body': 'Token no válido o no encontrado'
-            }
-
-        # Obtener el primer item (se supone que el token es único para cada usuario)
-        token_item = response['Items'][0]
-        
-        # Validar si el token ha expirado
-        expires = token_item['expires']
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        if now > expires:
-            return {
-                'statusCode': 403,
-                'body': 'Token expirado'
+                'body': MENSAJES_RECHAZO[motivo]
             }
 
         return {
@@ -55,4 +91,69 @@ def validate_token(event, context):
         return {
             'statusCode': 500,
             'body': {'error': str(e)}
-        }
\ No newline at end of file
+        }
+
+def _recurso_politica(method_arn):
+    """
+    arn:aws:execute-api:region:cuenta:api/stage/METODO/ruta -> arn:...:api/stage/*/*
+    La política queda en la caché del authorizer y se reutiliza para todos los endpoints.
+    """
+    prefijo, _, ruta = method_arn.partition(':execute-api:')
+    partes = ruta.split('/')
+    return f"{prefijo}:execute-api:{partes[0]}/{partes[1]}/*/*" if len(partes) >= 2 else method_arn
+
+def _politica(principal_id, efecto, method_arn, contexto=None):
+    respuesta = {
+        'principalId': principal_id,
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{
+                'Action': 'execute-api:Invoke',
+                'Effect': efecto,
+                'Resource': _recurso_politica(method_arn)
+            }]
+        }
+    }
+    if contexto:
+        respuesta['context'] = contexto
+    return respuesta
+
+def autorizador(event, context):
+    """
+    Authorizer REQUEST de API Gateway. API Gateway cachea el resultado por el header
+    Authorization (resultTtlInSeconds), así que los handlers protegidos ya no validan
+    el token: solo leen requestContext.authorizer (user_id, role, tenant_id).
+    """
+    headers = event.get('headers') or {}
+    token = (headers.get('Authorization') or headers.get('authorization') or '').replace('Bearer ', '')
+    if not token:
+        # API Gateway responde 401
+        raise Exception('Unauthorized')
+
+    try:
+        identidad, motivo = identificar_token(token)
+    except Exception as e:
+        print("Error en autorizador:", str(e))  # Log en CloudWatch
+        raise Exception('Unauthorized')
+
+    if identidad is None:
+        print(f"Token rechazado por el autorizador: {motivo}")
+        return _politica('anonimo', 'Deny', event['methodArn'])
+
+    # El contexto solo admite string, número o booleano
+    return _politica(identidad['user_id'] or 'desconocido', 'Allow', event['methodArn'], {
+        'user_id': identidad['user_id'] or '',
+        'role': identidad['role'] or '',
+        'tenant_id': identidad['tenant_id'] or ''
+    })
+
+def contexto_autorizador(event):
+    """Identidad que dejó el autorizador en requestContext.authorizer, o None."""
+    contexto = (event.get('requestContext') or {}).get('authorizer') or {}
+    if not contexto.get('user_id'):
+        return None
+    return {
+        'user_id': contexto['user_id'],
+        'role': contexto.get('role'),
+        'tenant_id': contexto.get('tenant_id') or None
+    }
\ No newline at end of file
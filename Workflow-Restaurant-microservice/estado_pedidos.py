@@ -1,35 +1,28 @@
 import os
 import json
-import boto3
 from datetime import datetime, timezone
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
+from bembos_comun.aws import obtener_cliente, obtener_tabla
+from bembos_comun.serializacion import dumps, loads
+from bembos_comun.paginacion import codificar_token, decodificar_token, leer_limite, paginar
 
-dynamodb = boto3.resource("dynamodb")
-stepfunctions_client = boto3.client("stepfunctions")
+stepfunctions_client = obtener_cliente("stepfunctions")
 
 TABLA_PEDIDOS = os.getenv("TABLA_PEDIDOS", "PEDIDOS")
 TABLA_COCINA = os.getenv("TABLA_COCINA", "COCINA")
 TABLA_DESPACHADOR = os.getenv("TABLA_DESPACHADOR", "DESPACHADOR")
 TABLA_DELIVERY = os.getenv("TABLA_DELIVERY", "DELIVERY")
+LISTAR_PEDIDOS_LIMITE = int(os.getenv("LISTAR_PEDIDOS_LIMITE", "200"))
+LISTAR_PEDIDOS_LIMITE_MAX = int(os.getenv("LISTAR_PEDIDOS_LIMITE_MAX", "500"))
 
-tabla_pedidos = dynamodb.Table(TABLA_PEDIDOS)
-tabla_cocina = dynamodb.Table(TABLA_COCINA)
-tabla_despachador = dynamodb.Table(TABLA_DESPACHADOR)
-tabla_delivery = dynamodb.Table(TABLA_DELIVERY)
+tabla_pedidos = obtener_tabla(TABLA_PEDIDOS)
+tabla_cocina = obtener_tabla(TABLA_COCINA)
+tabla_despachador = obtener_tabla(TABLA_DESPACHADOR)
+tabla_delivery = obtener_tabla(TABLA_DELIVERY)
 
 
 # ------------------------- Utilitarios ------------------------- #
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        # Si el número es entero, devuélvelo como int
-        if obj % 1 == 0:
-            return int(obj)
-        # Si tiene decimales, devuélvelo como float
-        return float(obj)
-    raise TypeError
-
 def obtener_timestamp_iso():
     return datetime.now(timezone.utc).isoformat()
 
@@ -47,7 +40,7 @@ def parse_event(event):
         if record.get("eventSource") == "aws:sqs":
             body_str = record.get("body", "{}")
             try:
-                body = json.loads(body_str)
+                body = loads(body_str)
             except Exception:
                 body = {"raw_body": body_str}
             return body
@@ -78,7 +71,7 @@ def parse_event(event):
         body = event.get("body")
         if body:
             try:
-                body_data = json.loads(body)
+                body_data = loads(body)
                 if isinstance(body_data, dict):
                     for k, v in body_data.items():
                         result[k] = v
@@ -480,12 +473,12 @@ def obtener_pedido(event, context):
 
     return {
     "statusCode": 200,
-    "body": json.dumps({
+    "body": dumps({
         "pedido": pedido,
         "cocina": cocina,
         "empaquetamiento": despachador,
         "delivery": delivery
-    }, default=decimal_default)
+    })
     }
 
 
@@ -493,20 +486,32 @@ def obtener_pedido(event, context):
 
 def listar_pedidos(event, context):
     """
-    GET /pedidos
-    Devuelve todos los pedidos que NO tengan estado PENDIENTE_PAGO.
+    GET /pedidos?limit=N&next_token=...
+    Devuelve los pedidos que NO tengan estado PENDIENTE_PAGO, paginados.
     """
 
     print("DEBUG listar_pedidos raw event:", json.dumps(event))
 
-    pedidos_filtrados = []
+    params = parse_event(event)
+
+    try:
+        limite = leer_limite(params, defecto=LISTAR_PEDIDOS_LIMITE, maximo=LISTAR_PEDIDOS_LIMITE_MAX)
+        exclusive_start_key = decodificar_token(params.get("next_token"))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"mensaje": str(e)})
+        }
 
     try:
-        # Scan toda la tabla para buscar pedidos que NO sean PENDIENTE_PAGO
-        resp = tabla_pedidos.scan(
-            FilterExpression=Attr("estado_pedido").ne("PENDIENTE_PAGO")
+        # Scan paginado siguiendo LastEvaluatedKey hasta completar la página
+        pedidos_filtrados, last_evaluated_key, _ = paginar(
+            tabla_pedidos.scan,
+            {"FilterExpression": Attr("estado_pedido").ne("PENDIENTE_PAGO")},
+            limite,
+            ("tenant_id", "uuid"),
+            exclusive_start_key
         )
-        pedidos_filtrados = resp.get("Items", [])
 
     except Exception as e:
         return {
@@ -519,10 +524,11 @@ def listar_pedidos(event, context):
 
     return {
         "statusCode": 200,
-        "body": json.dumps({
+        "body": dumps({
             "cantidad": len(pedidos_filtrados),
-            "pedidos": pedidos_filtrados
-        }, default=decimal_default)
+            "pedidos": pedidos_filtrados,
+            "next_token": codificar_token(last_evaluated_key)
+        })
     }
 
 
@@ -541,7 +547,7 @@ def confirmar_paso(event, context):
     print("DEBUG raw event:", json.dumps(event))
 
     event = parse_event(event)
-    print("DEBUG parsed event:", json.dumps(event))
+    print("DEBUG parsed event:", dumps(event))
 
     tenant_id = event.get("tenant_id")
     uuid_pedido = event.get("uuid_pedido") or event.get("uuid")
@@ -556,7 +562,7 @@ def confirmar_paso(event, context):
     if not tenant_id or not uuid_pedido or not paso:
         return {
             "statusCode": 400,
-            "body": json.dumps({
+            "body": dumps({
                 "mensaje": "Faltan tenant_id, uuid o paso",
                 "event": event
             })
@@ -793,12 +799,12 @@ def iniciar_proceso_step_function(event, context):
         response = stepfunctions_client.start_execution(
             stateMachineArn=sf_arn,
             name=execution_name, 
-            input=json.dumps(input_sf)
+            input=dumps(input_sf)
         )
 
         return {
             "statusCode": 200,
-            "body": json.dumps({
+            "body": dumps({
                 "mensaje": "Step Function iniciada correctamente",
                 "executionArn": response.get("executionArn"),
                 "fecha_inicio": response.get("startDate").isoformat(),
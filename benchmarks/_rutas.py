@@ -0,0 +1,21 @@
+"""Agrega los directorios de los microservicios al sys.path para importar sus handlers."""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAYER_COMUN = os.path.join(RAIZ, 'Common-Layer', 'python')
+
+SERVICIOS = {
+    'make_order': os.path.join(RAIZ, 'Make-Order-microservice'),
+    'user_order': os.path.join(RAIZ, 'User-Order-microservice'),
+    'workflow': os.path.join(RAIZ, 'Workflow-Restaurant-microservice'),
+}
+
+def agregar(*servicios):
+    if LAYER_COMUN not in sys.path:
+        sys.path.insert(0, LAYER_COMUN)
+    for servicio in servicios:
+        ruta = SERVICIOS[servicio]
+        if ruta not in sys.path:
+            sys.path.insert(0, ruta)
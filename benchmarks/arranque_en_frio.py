@@ -0,0 +1,438 @@
+"""
+Arranque en frío de cada entry point Lambda de los tres servicios.
+
+Lee las funciones, tablas, colas, topics y buckets de cada serverless.yml, los crea
+en un servidor moto local (AWS_ENDPOINT_URL) junto con el stand-in de Mercado Pago
+(stubs/mercadopago_fake.py) y, por cada entry point y repetición, en un intérprete
+nuevo:
+  - importa el módulo del handler con -X importtime (ms y paquetes más costosos)
+  - hace la primera invocación con un evento representativo y una segunda en caliente
+El estado de AWS se reinicia y se vuelve a sembrar antes de cada repetición.
+
+El reporte JSON (--salida) sirve de línea base: con --comparar se marcan como
+regresión los entry points cuyo import o primera invocación empeoran más de
+--tolerancia y más de --minimo-ms, y el script sale con código 1.
+
+    pip install "moto[server]" pyyaml   # además de las dependencias de cada servicio
+    python benchmarks/arranque_en_frio.py [--repeticiones 3] [--servicios make_order,user_order]
+                                          [--salida base.json] [--comparar base.json]
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import _rutas
+
+ETAPA = 'dev'
+REGION = 'us-east-1'
+TENANT = 'bembos-miraflores'
+EMAIL = 'cliente@example.com'
+TOKEN = '6f1c2a9e-4b7d-4e21-9c3a-8d5e0f1b2a34'  # UUID como los de login_user
+PESADOS = ('boto3', 'botocore', 'mercadopago', 'requests', 'PIL')
+INICIO, FIN = '#arranque:inicio#', '#arranque:fin#'
+
+# Se ejecuta con `python -X importtime -c TRABAJADOR modulo funcion`: antes de medir
+# solo se usa lo que el intérprete ya trae cargado (sys, time, os).
+TRABAJADOR = '''
+import os, sys, time
+sys.stderr.write("%s\\n"); sys.stderr.flush()
+inicio = time.perf_counter()
+__import__(sys.argv[1])
+import_ms = (time.perf_counter() - inicio) * 1000
+sys.stderr.write("%s\\n"); sys.stderr.flush()
+
+import contextlib, io, json
+modulo = sys.modules[sys.argv[1]]
+pesados = json.loads(os.environ["ARRANQUE_PESADOS"])
+cargados = lambda: [p for p in pesados if p in sys.modules]
+resultado = {"import_ms": import_ms, "pesados_import": cargados(), "invocaciones": []}
+
+class Contexto:
+    function_name = sys.argv[2]
+    aws_request_id = "arranque-en-frio"
+    memory_limit_in_mb = 1024
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+if os.environ.get("ARRANQUE_EVENTO"):
+    funcion = getattr(modulo, sys.argv[2])
+    for _ in range(2):
+        evento = json.loads(os.environ["ARRANQUE_EVENTO"])
+        inicio = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = funcion(evento, Contexto())
+            estado = respuesta.get("statusCode", "ok") if isinstance(respuesta, dict) else "ok"
+        except Exception as e:
+            estado = type(e).__name__
+        resultado["invocaciones"].append({"ms": (time.perf_counter() - inicio) * 1000, "estado": estado})
+    resultado["pesados_primera"] = cargados()
+print(json.dumps(resultado))
+''' % (INICIO, FIN)
+
+# ------------------------- serverless.yml ------------------------- #
+
+_VARIABLE = re.compile(r'\$\{([^{}]+)\}')
+
+def resolver(valor, configuracion, refs):
+    """Resuelve ${self:...}, ${sls:stage} y {Ref: X}; lo que no se puede resolver queda igual."""
+    if isinstance(valor, dict):
+        if set(valor) == {'Ref'}:
+            return refs.get(valor['Ref'], valor)
+        return {k: resolver(v, configuracion, refs) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [resolver(v, configuracion, refs) for v in valor]
+    if not isinstance(valor, str):
+        return valor
+
+    def reemplazo(coincidencia):
+        expresion = coincidencia.group(1).strip()
+        if expresion == 'sls:stage':
+            return ETAPA
+        if expresion.startswith('self:'):
+            actual = configuracion
+            for parte in expresion[len('self:'):].split('.'):
+                if not isinstance(actual, dict) or parte not in actual:
+                    return coincidencia.group(0)
+                actual = actual[parte]
+            if isinstance(actual, (str, int, float)):
+                return str(actual)
+        return coincidencia.group(0)
+
+    for _ in range(10):
+        nuevo = _VARIABLE.sub(reemplazo, valor)
+        if nuevo == valor:
+            break
+        valor = nuevo
+    return valor
+
+def leer_servicio(servicio):
+    import yaml
+
+    ruta = _rutas.SERVICIOS[servicio]
+    with open(os.path.join(ruta, 'serverless.yml'), encoding='utf-8') as f:
+        configuracion = yaml.safe_load(f)
+    configuracion.setdefault('provider', {}).setdefault('stage', ETAPA)
+    return configuracion
+
+def crear_recursos(configuracion, refs):
+    """Crea en moto las tablas, colas, topics y buckets de resources.Resources."""
+    import boto3
+
+    recursos = ((configuracion.get('resources') or {}).get('Resources')) or {}
+    for nombre, recurso in recursos.items():
+        propiedades = resolver(recurso.get('Properties') or {}, configuracion, refs)
+        tipo = recurso.get('Type')
+        if tipo == 'AWS::DynamoDB::Table':
+            kwargs = {k: propiedades[k] for k in ('TableName', 'AttributeDefinitions', 'KeySchema',
+                                                  'GlobalSecondaryIndexes', 'BillingMode') if k in propiedades}
+            if 'StreamSpecification' in propiedades:
+                kwargs['StreamSpecification'] = dict(propiedades['StreamSpecification'], StreamEnabled=True)
+            boto3.client('dynamodb').create_table(**kwargs)
+            refs[nombre] = kwargs['TableName']
+        elif tipo == 'AWS::SQS::Queue':
+            atributos = {k: str(propiedades[k]).lower() for k in ('FifoQueue', 'ContentBasedDeduplication') if k in propiedades}
+            refs[nombre] = boto3.client('sqs').create_queue(
+                QueueName=propiedades.get('QueueName', nombre), Attributes=atributos)['QueueUrl']
+        elif tipo == 'AWS::SNS::Topic':
+            refs[nombre] = boto3.client('sns').create_topic(Name=nombre)['TopicArn']
+        elif tipo == 'AWS::S3::Bucket':
+            boto3.client('s3').create_bucket(Bucket=propiedades['BucketName'])
+            refs[nombre] = propiedades['BucketName']
+
+def entorno_servicio(configuracion, refs):
+    entorno = resolver((configuracion.get('provider') or {}).get('environment') or {}, configuracion, refs)
+    return {k: str(v) for k, v in entorno.items() if isinstance(v, (str, int, float)) and '${' not in str(v)}
+
+# ------------------------- estado de cada servicio ------------------------- #
+
+def sembrar_make_order(entorno, mp):
+    import boto3
+
+    entorno.update(ACCESS_TOKEN='TEST-local', MP_API_BASE_URL=mp.base_url, WEBHOOK_MODO='cola')
+    ddb = boto3.resource('dynamodb')
+    ahora = datetime.now(timezone.utc).isoformat()
+    elementos = [{'combo': ['Combo Clásico'], 'precio': Decimal('25.90'), 'cantidad_combo': 2}]
+    pedidos = ddb.Table(entorno['PEDIDO_TABLE'])
+    for uuid_pedido, estado in (('pedido-pendiente', 'PENDIENTE_PAGO'), ('pedido-pagado', 'PAGADO')):
+        pedidos.put_item(Item={
+            'tenant_id': TENANT, 'uuid': uuid_pedido, 'estado_pedido': estado, 'cliente_email': EMAIL,
+            'cliente_nombre': 'Cliente', 'elementos': elementos, 'precio_total': Decimal('51.80'),
+            'fecha_creacion': ahora, 'fecha_pedido': ahora, 'dia_pedido': ahora[:10]
+        })
+    ddb.Table(entorno['CONNECTIONS_TABLE']).put_item(Item={
+        'connectionId': 'conexion-chef', 'role': 'CHEF', 'tenant_id': 'GLOBAL', 'role_tenant': 'CHEF#GLOBAL'})
+    mp.registrar_pago(1001, 'approved', json.dumps({'tenant_id': TENANT, 'uuid': 'pedido-pendiente'}))
+
+def sembrar_user_order(entorno, mp):
+    import boto3
+    from PIL import Image
+
+    ddb = boto3.resource('dynamodb')
+    ddb.Table(entorno['DYNAMODB_TABLE_USUARIOS']).put_item(Item={
+        'tenant_id': EMAIL, 'user_id': 'usuario-1', 'password': hashlib.sha256(b'secreto').hexdigest(),
+        'role': 'cliente', 'nombre': 'Ana', 'apellido': 'Pérez'})
+    ddb.Table(entorno['DYNAMODB_TABLE_TOKENS']).put_item(Item={
+        'tenant_id': TOKEN, 'token_id': 'token-1', 'user_id': 'usuario-1', 'role': 'cliente', 'token': TOKEN,
+        'expires': (datetime.now() + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')})
+
+    s3 = boto3.client('s3')
+    s3.create_bucket(Bucket=entorno['BUCKET_IMAGENES_PRODUCTOS'])
+    with ddb.Table(entorno['DYNAMODB_TABLE_PRODUCTOS']).batch_writer() as lote:
+        for i in range(50):
+            lote.put_item(Item={'tenant_id': 'hamburguesas', 'product_id': f'p{i:03d}', 'nombre': f'Royal Clásica {i}',
+                                'precio': 12 + i % 7, 'promo_id': 'NO_PROMO', 'estado': 'LISTO'})
+        lote.put_item(Item={'tenant_id': 'hamburguesas', 'product_id': 'p-pendiente', 'nombre': 'Nueva',
+                            'precio': 15, 'promo_id': 'NO_PROMO', 'estado': 'PENDIENTE_IMAGEN'})
+    imagen = io.BytesIO()
+    Image.new('RGB', (1200, 900), (200, 40, 40)).save(imagen, 'JPEG')
+    s3.put_object(Bucket=entorno['BUCKET_IMAGENES_PRODUCTOS'], Key='uploads/hamburguesas/p-pendiente',
+                  Body=imagen.getvalue(), ContentType='image/jpeg')
+
+    # Catálogo materializado (user-017) para listar, catálogo y búsqueda
+    _rutas.agregar('user_order')
+    os.environ.update(entorno)
+    import catalogo
+    catalogo.regenerar_catalogo('hamburguesas')
+
+def sembrar_workflow(entorno, mp):
+    import boto3
+
+    pedidos = boto3.resource('dynamodb').Table(entorno['TABLA_PEDIDOS'])
+    for uuid_pedido, estado in (('wf-pagado', 'PAGADO'), ('wf-cocina', 'COCINA'),
+                                ('wf-empaque', 'EMPAQUETAMIENTO'), ('wf-delivery', 'DELIVERY')):
+        pedidos.put_item(Item={'tenant_id': TENANT, 'uuid': uuid_pedido, 'estado_pedido': estado, 'cliente_email': EMAIL})
+    maquina = boto3.client('stepfunctions').create_state_machine(
+        name='WorkflowRestaurante',
+        definition=json.dumps({'StartAt': 'Inicio', 'States': {'Inicio': {'Type': 'Pass', 'End': True}}}),
+        roleArn='arn:aws:iam::123456789012:role/LabRole'
+    )
+    entorno['STATE_MACHINE_ARN'] = maquina['stateMachineArn']
+
+SEMBRAR = {'make_order': sembrar_make_order, 'user_order': sembrar_user_order, 'workflow': sembrar_workflow}
+
+CONTEXTO_AUTORIZADOR = {'requestContext': {'authorizer': {'user_id': 'usuario-1', 'role': 'cliente', 'tenant_id': EMAIL}}}
+WEBSOCKET = {'requestContext': {'connectionId': 'conexion-1', 'routeKey': '$connect', 'domainName': '127.0.0.1', 'stage': ETAPA},
+             'queryStringParameters': {'role': 'CHEF', 'tenant_id': TENANT}}
+
+# handler de serverless.yml -> evento de la primera invocación (None: solo se mide el import)
+EVENTOS = {
+    'handler.connection_manager': WEBSOCKET,
+    'handler.default_handler': WEBSOCKET,
+    'handler.pedidoFiltro': {'queryStringParameters': {'estado_pedido': 'PAGADO'}},
+    'handler.pagarPedido': {
+        'requestContext': {'domainName': 'api.local', 'stage': ETAPA},
+        'body': json.dumps({'tenant_id': TENANT, 'uuid': 'pedido-nuevo', 'cliente_email': EMAIL,
+                            'elementos': [{'combo': ['Combo Clásico'], 'precio': 25.90, 'cantidad_combo': 2}]})
+    },
+    'handler.receiveWebhook': {'body': json.dumps({'type': 'payment', 'data': {'id': '1001'}})},
+    'handler.procesar_webhooks': {'Records': [{'messageId': 'mensaje-1', 'body': json.dumps({'payment_id': '1001'})}]},
+    'handler.obtenerPedidosPorEmail': {'queryStringParameters': {'cliente_email': EMAIL}},
+    'handler.obtenerPedidoPorId': {'queryStringParameters': {'tenant_id': TENANT, 'uuid': 'pedido-pagado'}},
+    'handler.backfill_indices_pedidos': {},
+    'lambda_generar_recibo.lambda_handler': {'Records': [{'messageId': 'mensaje-1', 'body': json.dumps(
+        {'tenant_id': TENANT, 'uuid': 'pedido-pagado', 'cliente_email': EMAIL, 'payment_id': '1001'})}]},
+    'almacen_recibos.archivar_recibos': {'dia': datetime.now(timezone.utc).strftime('%Y-%m-%d')},
+    'lambda_enviar_email.lambda_handler': {'Records': [{'messageId': 'mensaje-1', 'body': json.dumps(
+        {'tenant_id': TENANT, 'uuid': 'pedido-pagado', 'cliente_email': EMAIL, 'cliente_nombre': 'Cliente'})}]},
+
+    'validate_token.autorizador': {'headers': {'Authorization': f'Bearer {TOKEN}'},
+                                   'methodArn': 'arn:aws:execute-api:us-east-1:123456789012:api/dev/GET/productos/listar'},
+    'validate_token.validate_token': {'headers': {'Authorization': f'Bearer {TOKEN}'}},
+    'register_user.register_user': {'body': {'tenant_id': 'nuevo@example.com', 'password': 'secreto', 'role': 'cliente',
+                                             'nombre': 'Luis', 'apellido': 'Rojas'}},
+    'login_user.login_user': {'body': {'tenant_id': EMAIL, 'password': 'secreto'}},
+    'logout_user.logout_user': {'headers': {'Authorization': f'Bearer {TOKEN}'}},
+    'logout_user.revocar_tokens_usuario': {'user_id': 'usuario-1'},
+    'crear_producto.crear_producto': dict(CONTEXTO_AUTORIZADOR, body={'nombre': 'Royal Doble', 'tipo': 'hamburguesas',
+                                                                       'precio': 21, 'content_type': 'image/jpeg'}),
+    'procesar_imagen_producto.procesar_imagen': {'Records': [{'s3': {
+        'bucket': {'name': f'{ETAPA}-productos-img'}, 'object': {'key': 'uploads/hamburguesas/p-pendiente'}}}]},
+    'listar_productos.listar_productos': dict(CONTEXTO_AUTORIZADOR, queryStringParameters={'tipo': 'hamburguesas'}),
+    'listar_productos.catalogo_productos': dict(CONTEXTO_AUTORIZADOR, queryStringParameters={'tipo': 'hamburguesas'}),
+    'buscar_productos.buscar_productos': dict(CONTEXTO_AUTORIZADOR, queryStringParameters={'q': 'roy cla'}),
+    'catalogo.regenerar_catalogo_stream': {'tipos': ['hamburguesas']},
+
+    'estado_pedidos.pagado_a_cocina': {'tenant_id': TENANT, 'uuid': 'wf-pagado', 'id_empleado': 'cocinero-1'},
+    'estado_pedidos.cocina_a_empaquetamiento': {'tenant_id': TENANT, 'uuid': 'wf-cocina', 'id_empleado': 'despachador-1'},
+    'estado_pedidos.empaquetamiento_a_delivery': {'tenant_id': TENANT, 'uuid': 'wf-empaque', 'repartidor': 'Rosa',
+                                                  'id_repartidor': 'repartidor-1', 'origen': 'Local', 'destino': 'Casa'},
+    'estado_pedidos.delivery_a_entregado': {'tenant_id': TENANT, 'uuid': 'wf-delivery'},
+    'estado_pedidos.confirmar_paso': {'tenant_id': TENANT, 'uuid': 'wf-cocina', 'paso': 'cocina'},
+    'estado_pedidos.obtener_pedido': {'tenant_id': TENANT, 'uuid': 'wf-pagado'},
+    'estado_pedidos.listar_pedidos': {'version': '2.0', 'queryStringParameters': {'limit': '50'}},
+    'estado_pedidos.iniciar_proceso_step_function': {'tenant_id': TENANT, 'uuid': 'wf-pagado', 'cliente_email': EMAIL},
+}
+
+# ------------------------- medición ------------------------- #
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def mas_costosos(importtime, cuantos=5):
+    """Tiempo propio (ms) de lo importado por el handler, sumado por paquete de primer nivel."""
+    dentro, por_paquete = False, {}
+    for linea in importtime.splitlines():
+        if linea == INICIO:
+            dentro = True
+        elif linea == FIN:
+            break
+        elif dentro and linea.startswith('import time:') and '|' in linea:
+            propio, _, nombre = linea[len('import time:'):].split('|')
+            if propio.strip().isdigit():
+                paquete = nombre.strip().split('.')[0]
+                por_paquete[paquete] = por_paquete.get(paquete, 0) + int(propio) / 1000
+    orden = sorted(por_paquete.items(), key=lambda p: -p[1])[:cuantos]
+    return {nombre: round(ms, 1) for nombre, ms in orden}
+
+def medir_entry_point(servicio, handler, entorno):
+    modulo, funcion = handler.rsplit('.', 1)
+    evento = EVENTOS.get(handler)
+    variables = dict(
+        os.environ, **entorno,
+        PYTHONPATH=os.pathsep.join([_rutas.LAYER_COMUN, _rutas.SERVICIOS[servicio]]),
+        ARRANQUE_PESADOS=json.dumps(PESADOS),
+        ARRANQUE_EVENTO=json.dumps(evento) if evento is not None else ''
+    )
+    salida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', TRABAJADOR, modulo, funcion],
+        cwd=_rutas.SERVICIOS[servicio], env=variables, capture_output=True, text=True, timeout=120
+    )
+    if salida.returncode != 0 or not salida.stdout.strip():
+        errores = [l for l in salida.stderr.splitlines() if not l.startswith('import time:')]
+        return {'error': '\n'.join(errores[-5:])}
+    resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+    resultado['mas_costosos'] = mas_costosos(salida.stderr)
+    return resultado
+
+def resumir(mediciones):
+    """Mediana de las repeticiones de un entry point."""
+    errores = [m['error'] for m in mediciones if 'error' in m]
+    if errores:
+        return {'error': errores[0]}
+    validas = mediciones
+    resumen = {
+        'import_ms': round(statistics.median(m['import_ms'] for m in validas), 1),
+        'pesados_import': validas[0]['pesados_import'],
+        'mas_costosos': validas[len(validas) // 2]['mas_costosos'],
+    }
+    if validas[0]['invocaciones']:
+        resumen.update(
+            primera_ms=round(statistics.median(m['invocaciones'][0]['ms'] for m in validas), 1),
+            caliente_ms=round(statistics.median(m['invocaciones'][1]['ms'] for m in validas), 1),
+            estado=validas[0]['invocaciones'][0]['estado'],
+            pesados_primera=validas[0]['pesados_primera'],
+        )
+    return resumen
+
+def reiniciar_aws(puerto, servicios, mp):
+    """Estado limpio en moto: recursos de todos los servicios y datos de prueba."""
+    urllib.request.urlopen(urllib.request.Request(f'http://127.0.0.1:{puerto}/moto-api/reset', method='POST')).read()
+    configuraciones = {s: leer_servicio(s) for s in _rutas.SERVICIOS}
+    refs = {}
+    for configuracion in configuraciones.values():
+        crear_recursos(configuracion, refs)
+    entornos = {}
+    for servicio in servicios:
+        entornos[servicio] = entorno_servicio(configuraciones[servicio], refs)
+        SEMBRAR[servicio](entornos[servicio], mp)
+    return configuraciones, entornos
+
+def comparar(reporte, base, tolerancia, minimo_ms):
+    regresiones = []
+    for nombre, actual in reporte['entry_points'].items():
+        anterior = base.get('entry_points', {}).get(nombre)
+        if not anterior or 'error' in actual or 'error' in anterior:
+            continue
+        for metrica in ('import_ms', 'primera_ms'):
+            if metrica in actual and metrica in anterior:
+                delta = actual[metrica] - anterior[metrica]
+                if delta > minimo_ms and delta > anterior[metrica] * tolerancia:
+                    regresiones.append(f"{nombre} {metrica}: {anterior[metrica]:.1f} -> {actual[metrica]:.1f} ms")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--servicios', default=','.join(_rutas.SERVICIOS))
+    parser.add_argument('--salida', help='archivo JSON donde guardar el reporte')
+    parser.add_argument('--comparar', help='reporte JSON anterior para detectar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    parser.add_argument('--minimo-ms', type=float, default=10)
+    args = parser.parse_args()
+    servicios = [s for s in args.servicios.split(',') if s]
+
+    from moto.server import ThreadedMotoServer
+    from stubs.mercadopago_fake import MercadoPagoFake
+    from stubs.smtp_sink import BuzonSmtp
+
+    puerto = puerto_libre()
+    os.environ.update(AWS_ACCESS_KEY_ID='local', AWS_SECRET_ACCESS_KEY='local', AWS_DEFAULT_REGION=REGION,
+                      AWS_ENDPOINT_URL=f'http://127.0.0.1:{puerto}')
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    servidor = ThreadedMotoServer(ip_address='127.0.0.1', port=puerto, verbose=False)
+    servidor.start()
+    try:
+        with MercadoPagoFake() as mp, BuzonSmtp() as buzon:
+            # lambda_enviar_email entrega al relay local en lugar de Gmail
+            smtp = dict(SMTP_HOST='127.0.0.1', SMTP_PORT=str(buzon.puerto), SMTP_STARTTLS='false',
+                        SMTP_USER=EMAIL, SMTP_PASSWORD='local')
+            configuraciones, _ = reiniciar_aws(puerto, servicios, mp)
+            mediciones = {}
+            for _ in range(args.repeticiones):
+                for servicio in servicios:
+                    for funcion in (configuraciones[servicio].get('functions') or {}).values():
+                        handler = funcion['handler'].strip()
+                        _, entornos = reiniciar_aws(puerto, [servicio], mp)
+                        entorno = dict(entornos[servicio], **smtp) if servicio == 'make_order' else entornos[servicio]
+                        medicion = medir_entry_point(servicio, handler, entorno)
+                        mediciones.setdefault(f'{servicio}/{handler}', []).append(medicion)
+    finally:
+        servidor.stop()
+
+    reporte = {
+        'generado': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'repeticiones': args.repeticiones,
+        'entry_points': {nombre: resumir(m) for nombre, m in mediciones.items()},
+    }
+
+    print(f"{'entry point':<55} {'import':>7} {'1ra':>7} {'caliente':>8}  {'estado':<8} más costosos al importar (ms)")
+    for nombre, r in reporte['entry_points'].items():
+        if 'error' in r:
+            print(f"{nombre:<55} ERROR {r['error'].splitlines()[-1] if r['error'] else ''}")
+            continue
+        primera = f"{r['primera_ms']:>7.1f}" if 'primera_ms' in r else f"{'-':>7}"
+        caliente = f"{r['caliente_ms']:>8.1f}" if 'caliente_ms' in r else f"{'-':>8}"
+        costosos = ', '.join(f'{p} {ms:.0f}' for p, ms in r['mas_costosos'].items())
+        print(f"{nombre:<55} {r['import_ms']:>7.1f} {primera} {caliente}  {str(r.get('estado', '-')):<8} {costosos}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"Reporte guardado en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regresiones = comparar(reporte, json.load(f), args.tolerancia, args.minimo_ms)
+        for regresion in regresiones:
+            print(f"[REGRESIÓN] {regresion}")
+        sys.exit(1 if regresiones else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Simula el flujo API Gateway -> autorizador -> handler de listar_productos y lo compara
+con la validación en línea de antes (cada handler consulta la tabla de tokens).
+
+SimuladorApiGateway reproduce lo que hace API Gateway con un authorizer REQUEST:
+cachea la política por el valor del header Authorization durante resultTtlInSeconds,
+responde 401/403 sin invocar al handler y pasa el `context` del autorizador en
+requestContext.authorizer. DynamoDB corre en moto con latencia simulada.
+
+    python benchmarks/bench_autorizador.py [--usuarios 20] [--paginas 25] [--latencia-ms 8] [--ttl 60]
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import _rutas
+
+_rutas.agregar('user_order')
+
+from bench_validate_token import TablaConLatencia, crear_tablas, navegar, validar_y_listar
+
+import boto3
+from moto import mock_aws
+
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:api1234/dev/GET/productos/listar'
+
+class SimuladorApiGateway:
+    def __init__(self, autorizador, handler, ttl):
+        self.autorizador = autorizador
+        self.handler = handler
+        self.ttl = ttl
+        self.cache = {}
+        self.invocaciones_autorizador = 0
+
+    def __call__(self, evento):
+        identidad = evento['headers'].get('Authorization')
+        if not identidad:
+            return {'statusCode': 401, 'body': 'Unauthorized'}
+
+        entrada = self.cache.get(identidad)
+        if entrada is None or entrada[0] <= time.monotonic():
+            self.invocaciones_autorizador += 1
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    politica = self.autorizador({'type': 'REQUEST', 'methodArn': METHOD_ARN, 'headers': evento['headers']}, None)
+            except Exception:
+                return {'statusCode': 401, 'body': 'Unauthorized'}
+            entrada = (time.monotonic() + self.ttl, politica)
+            if self.ttl > 0:
+                self.cache[identidad] = entrada
+
+        politica = entrada[1]
+        if politica['policyDocument']['Statement'][0]['Effect'] != 'Allow':
+            return {'statusCode': 403, 'body': 'User is not authorized to access this resource'}
+        return self.handler(dict(evento, requestContext={'authorizer': politica.get('context', {})}), None)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--paginas', type=int, default=25)
+    parser.add_argument('--latencia-ms', type=float, default=8)
+    parser.add_argument('--ttl', type=float, default=60)
+    args = parser.parse_args()
+
+    with mock_aws():
+        tokens = crear_tablas(args.usuarios)
+        tokens += [f'invalido-{i}' for i in range(max(1, args.usuarios // 10))]
+
+        import cache_tokens
+        import listar_productos
+        import validate_token
+
+        ddb = boto3.resource('dynamodb')
+        tabla_tokens = TablaConLatencia(ddb.Table('tokens'), args.latencia_ms / 1000)
+        tabla_productos = TablaConLatencia(ddb.Table('productos'), args.latencia_ms / 1000)
+        validate_token.obtener_tabla = lambda nombre: tabla_tokens
+        listar_productos.obtener_tabla = lambda nombre: tabla_productos
+        # Sin la caché de tokens del contenedor: se mide solo el efecto del autorizador
+        cache_tokens.TOKEN_CACHE_MAX = 0
+
+        print(f"{len(tokens)} tokens x {args.paginas} páginas, {args.latencia_ms} ms por llamada a DynamoDB, "
+              f"resultTtlInSeconds={args.ttl:g}")
+        print(f"{'flujo':<22} | {'p50 ms':>7} | {'p99 ms':>7} | {'queries tokens':>14} | {'autorizador':>11}")
+
+        tabla_tokens.llamadas = 0
+        p50, p99 = navegar(validar_y_listar, tokens, args.paginas)
+        print(f"{'validación en línea':<22} | {p50:>7.2f} | {p99:>7.2f} | {tabla_tokens.llamadas:>14} | {'-':>11}")
+
+        api = SimuladorApiGateway(validate_token.autorizador, listar_productos.listar_productos, args.ttl)
+        tabla_tokens.llamadas = 0
+        p50, p99 = navegar(api, tokens, args.paginas)
+        print(f"{'autorizador cacheado':<22} | {p50:>7.2f} | {p99:>7.2f} | {tabla_tokens.llamadas:>14} | "
+              f"{api.invocaciones_autorizador:>11}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Búsqueda de productos (User-Order buscar_productos.py / indice_productos.py) sobre
+catálogos materializados en DynamoDB y S3 en memoria (moto):
+  - resultados del índice == filtrado lineal de referencia (lo que hacía el front)
+  - latencia por búsqueda: índice vs recorrido lineal del catálogo
+  - costo de actualizar el índice tras un producto nuevo vs reconstruirlo
+
+    python benchmarks/bench_buscar_productos.py [productos_por_tipo]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+import _rutas
+
+_rutas.agregar('user_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    DYNAMODB_TABLE_PRODUCTOS='productos',
+    BUCKET_IMAGENES_PRODUCTOS='productos-img',
+    PAGINACION_SECRETO='local',
+    CATALOGO_REFRESCO='60'
+)
+
+import boto3
+from moto import mock_aws
+
+TIPOS = ('hamburguesas', 'pollo', 'combos', 'postres', 'bebidas')
+PALABRAS = ('Clásica', 'Royal', 'Cheese', 'Doble', 'Queso', 'Tocino', 'Pollo', 'Crispy', 'Helado',
+            'Chicha', 'Morada', 'Papas', 'Ají', 'Parrillera', 'Económico', 'Mediano', 'Familiar')
+CONTEXTO = {'requestContext': {'authorizer': {'user_id': 'u1', 'role': 'cliente', 'tenant_id': 'bembos'}}}
+CONSULTAS = [
+    {'q': 'cla'},
+    {'q': 'economico', 'tipo': 'combos'},
+    {'q': 'doble que', 'orden': 'precio'},
+    {'q': 'aji', 'precio_max': '20'},
+    {'promo': 'true', 'precio_min': '15', 'precio_max': '25', 'orden': '-precio'},
+    {'q': 'p', 'tipo': 'pollo', 'orden': 'nombre'},
+]
+
+def preparar(por_tipo):
+    ddb = boto3.resource('dynamodb')
+    ddb.create_table(
+        TableName='productos',
+        AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'product_id', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'product_id', 'KeyType': 'RANGE'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    boto3.client('s3').create_bucket(Bucket='productos-img')
+    azar = random.Random(7)
+    with ddb.Table('productos').batch_writer() as lote:
+        for tipo in TIPOS:
+            for i in range(por_tipo):
+                lote.put_item(Item={
+                    'tenant_id': tipo,
+                    'product_id': f'{tipo[:3]}-{i:05d}',
+                    'nombre': ' '.join(azar.sample(PALABRAS, 3)),
+                    'precio': azar.randint(5, 40),
+                    'promo_id': f'promo-{i}#FoT' if i % 4 == 0 else 'NO_PROMO',
+                    'estado': 'LISTO'
+                })
+
+def referencia(items, params):
+    """Filtrado lineal: lo que hacía el front con la categoría completa."""
+    from indice_productos import terminos, leer_precio
+    consulta = terminos(params.get('q'))
+    ids = []
+    for item in items:
+        nombre = terminos(item['nombre'])
+        if not all(any(t.startswith(c) for t in nombre) for c in consulta):
+            continue
+        precio = leer_precio(item)
+        if 'precio_min' in params and precio < float(params['precio_min']):
+            continue
+        if 'precio_max' in params and precio > float(params['precio_max']):
+            continue
+        if params.get('promo') == 'true' and item['promo_id'] == 'NO_PROMO':
+            continue
+        ids.append(item['product_id'])
+    return sorted(ids)
+
+def evento(params):
+    return dict(CONTEXTO, queryStringParameters=dict(params, limit='100'))
+
+def todos(buscar_productos, params):
+    ids, next_token = [], None
+    while True:
+        consulta = dict(params, next_token=next_token) if next_token else params
+        respuesta = buscar_productos(evento(consulta), None)
+        assert respuesta['statusCode'] == 200, respuesta
+        ids.extend(p['product_id'] for p in respuesta['body']['items'])
+        next_token = respuesta['body']['next_token']
+        if not next_token:
+            return ids
+
+def medir(funcion, repeticiones=50):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def main():
+    por_tipo = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with mock_aws():
+        preparar(por_tipo)
+        import catalogo
+        import indice_productos
+        from buscar_productos import buscar_productos
+
+        catalogo.regenerar_catalogo_stream({'tipos': list(TIPOS)}, None)
+        inicio = time.perf_counter()
+        for tipo in TIPOS:
+            indice_productos.obtener_indice(tipo)
+        ms_construccion = (time.perf_counter() - inicio) * 1000
+
+        print(f"{por_tipo * len(TIPOS)} productos en {len(TIPOS)} tipos; índice construido en {ms_construccion:.0f} ms")
+        print(f"{'consulta':<70} {'resultados':>10} {'índice ms':>10} {'lineal ms':>10}")
+        for params in CONSULTAS:
+            tipos = [params['tipo']] if 'tipo' in params else TIPOS
+            items = [i for t in tipos for i in catalogo.obtener_catalogo(t)['items']]
+            esperado = referencia(items, params)
+            obtenido = todos(buscar_productos, params)
+            assert sorted(obtenido) == esperado, params
+            assert len(set(obtenido)) == len(obtenido), 'resultados repetidos entre páginas'
+            ms_indice = medir(lambda: buscar_productos(evento(params), None))
+            ms_lineal = medir(lambda: referencia(items, params))
+            print(f"{str(params):<70} {len(esperado):>10} {ms_indice:>10.2f} {ms_lineal:>10.2f}")
+
+        # Orden por precio y relevancia
+        primeros = buscar_productos(evento({'q': 'doble que', 'orden': 'precio'}), None)['body']['items']
+        precios = [int(p['precio']) for p in primeros]
+        assert precios == sorted(precios)
+        mejor = buscar_productos(evento({'q': 'queso'}), None)['body']['items'][0]
+        assert indice_productos.normalizar(mejor['nombre']).split()[0] == 'queso', mejor
+
+        # Cambio incremental: un producto nuevo reindexa solo ese producto
+        from bembos_comun.aws import obtener_tabla
+        obtener_tabla('productos').put_item(Item={'tenant_id': 'postres', 'product_id': 'pos-nuevo',
+                                                  'nombre': 'Pié de Limón', 'precio': 9, 'promo_id': 'NO_PROMO'})
+        catalogo.regenerar_catalogo('postres')
+        catalogo._catalogos['postres']['revisar_en'] = 0
+        catalogo.obtener_catalogo('postres')
+        inicio = time.perf_counter()
+        indice = indice_productos.obtener_indice('postres')
+        ms_incremental = (time.perf_counter() - inicio) * 1000
+        assert indice['version'] == 2
+        encontrados = buscar_productos(evento({'q': 'pie lim', 'tipo': 'postres'}), None)['body']['items']
+        assert [p['product_id'] for p in encontrados] == ['pos-nuevo'], encontrados
+
+        completo = indice_productos._indice_vacio()
+        inicio = time.perf_counter()
+        indice_productos.actualizar_indice(completo, catalogo.obtener_catalogo('postres')['items'])
+        ms_completo = (time.perf_counter() - inicio) * 1000
+        print(f"Producto nuevo: actualización incremental {ms_incremental:.1f} ms "
+              f"vs reconstrucción {ms_completo:.1f} ms")
+        print("OK")
+
+if __name__ == '__main__':
+    main()
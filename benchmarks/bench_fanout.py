@@ -0,0 +1,64 @@
+"""
+Benchmark de la difusión WebSocket de transmitir: envío secuencial (comportamiento
+anterior) contra fanout.difundir, usando un stub local de la API de administración.
+
+    python benchmarks/bench_fanout.py [--latencia-ms 10] [--workers 16]
+"""
+import argparse
+import os
+import time
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+
+import boto3
+from botocore.config import Config
+
+from fanout import difundir
+from stubs.apigw_management_stub import StubGestionWebSocket
+
+TAMANIOS = (10, 100, 1000)
+
+def envio_secuencial(cliente, connection_ids, data):
+    inicio = time.perf_counter()
+    for connection_id in connection_ids:
+        try:
+            cliente.post_to_connection(ConnectionId=connection_id, Data=data)
+        except cliente.exceptions.GoneException:
+            pass
+    return (time.perf_counter() - inicio) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latencia-ms', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    data = b'{"pedido": {"tenant_id": "bench", "uuid": "1"}}'
+
+    print(f"{'conexiones':>10} {'secuencial ms':>14} {'concurrente ms':>15} {'speedup':>8} {'caidos':>7}")
+    for total in TAMANIOS:
+        connection_ids = [f"conn-{i}" for i in range(total)]
+        caidas = connection_ids[::20]
+
+        with StubGestionWebSocket(latencia_ms=args.latencia_ms, caidas=caidas) as stub:
+            cliente = boto3.client(
+                'apigatewaymanagementapi',
+                endpoint_url=stub.endpoint_url,
+                config=Config(max_pool_connections=args.workers, retries={'max_attempts': 1})
+            )
+            secuencial_ms = envio_secuencial(cliente, connection_ids, data)
+            estadisticas = difundir(cliente, connection_ids, data, max_workers=args.workers)
+
+        print(
+            f"{total:>10} {secuencial_ms:>14.1f} {estadisticas['duracion_ms']:>15.1f} "
+            f"{secuencial_ms / estadisticas['duracion_ms']:>7.1f}x {estadisticas['caidos']:>7}"
+        )
+
+if __name__ == '__main__':
+    main()
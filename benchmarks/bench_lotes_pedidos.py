@@ -0,0 +1,209 @@
+"""
+Consumidores de PedidosPagadosTopic (generarRecibo y enviarEmail) con lotes de la cola:
+  - bucle secuencial con un get_item por registro (comportamiento anterior) contra
+    lotes_pedidos.procesar_lote (un BatchGetItem + pool acotado de hilos)
+  - fallo parcial: solo el registro que falla vuelve en batchItemFailures
+  - entrega real SNS -> SQS con RawMessageDelivery hasta el handler
+
+DynamoDB y S3 son un servidor moto y el relay SMTP es aiosmtpd, ambos detrás de un
+proxy con latencia de red.
+
+    python benchmarks/bench_lotes_pedidos.py [--registros 10] [--latencia-aws-ms 10] [--latencia-smtp-ms 30]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+TENANT = 'bembos-miraflores'
+# Los recibos se guardan bajo el día del pedido en Lima (UTC-5)
+FECHA_PEDIDO = datetime.now(timezone(timedelta(hours=-5))).isoformat()
+DIA = FECHA_PEDIDO[:10]
+BUCKET = 'recibos-bembos-bench'
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def mensaje(i):
+    return {'tenant_id': TENANT, 'uuid': f'pedido-{i}', 'cliente_email': f'cliente{i}@example.com',
+            'cliente_nombre': 'Cliente', 'payment_id': str(1000 + i), 'evento': 'pedido_pagado'}
+
+def evento_sqs(n, desde=0):
+    return {'Records': [{'messageId': f'mensaje-{i}', 'body': json.dumps(mensaje(i))} for i in range(desde, desde + n)]}
+
+def contar_llamadas(cliente):
+    llamadas = {}
+
+    def contar(model, **kwargs):
+        llamadas[model.name] = llamadas.get(model.name, 0) + 1
+    cliente.meta.events.register('before-call.*.*', contar)
+    return llamadas
+
+def secuencial_email(event, tabla, smtp_user):
+    """Bucle anterior de lambda_enviar_email: get_item y envío registro por registro."""
+    import lambda_enviar_email
+
+    for record in event['Records']:
+        m = json.loads(record['body'])
+        pedido = tabla.get_item(Key={'tenant_id': m['tenant_id'], 'uuid': m['uuid']})['Item']
+        total = sum(float(e.get('precio', 0)) * int(e.get('cantidad_combo', 1)) for e in pedido.get('elementos', []))
+        lambda_enviar_email.enviar_email_confirmacion(m['cliente_email'], m['cliente_nombre'], m['uuid'],
+                                                      total, smtp_user, 'local')
+
+def secuencial_recibo(event, tabla, s3):
+    """Bucle anterior de lambda_generar_recibo: get_item y put_object (clave por email) registro por registro."""
+    import lambda_generar_recibo
+
+    for record in event['Records']:
+        m = json.loads(record['body'])
+        pedido = tabla.get_item(Key={'tenant_id': m['tenant_id'], 'uuid': m['uuid']})['Item']
+        s3.put_object(Bucket=BUCKET, Key=f"recibos/{m['cliente_email']}.txt",
+                      Body=lambda_generar_recibo.generar_recibo_txt(pedido, m['payment_id']).encode('utf-8'),
+                      ContentType='text/plain')
+
+def medir(funcion, repeticiones=3, preparar=None):
+    mejores = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = funcion()
+        mejores.append((time.perf_counter() - inicio) * 1000)
+    return min(mejores), resultado
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--registros', type=int, default=10)
+    parser.add_argument('--latencia-aws-ms', type=float, default=10)
+    parser.add_argument('--latencia-smtp-ms', type=float, default=30)
+    args = parser.parse_args()
+    n = args.registros
+
+    from moto.server import ThreadedMotoServer
+    from stubs.smtp_sink import BuzonSmtp, ProxyLatencia
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    puerto_moto = puerto_libre()
+    servidor = ThreadedMotoServer(ip_address='127.0.0.1', port=puerto_moto, verbose=False)
+    servidor.start()
+    try:
+        with ProxyLatencia(puerto_moto, args.latencia_aws_ms) as proxy_aws, \
+                BuzonSmtp() as buzon, ProxyLatencia(buzon.puerto, args.latencia_smtp_ms) as proxy_smtp:
+            os.environ.update(
+                AWS_DEFAULT_REGION='us-east-1', AWS_ACCESS_KEY_ID='local', AWS_SECRET_ACCESS_KEY='local',
+                AWS_ENDPOINT_URL=f'http://127.0.0.1:{proxy_aws.puerto}',
+                PEDIDO_TABLE='Pedidos', S3_BUCKET=BUCKET,
+                SMTP_HOST='127.0.0.1', SMTP_PORT=str(proxy_smtp.puerto), SMTP_STARTTLS='false',
+                SMTP_USER='pedidos@bembos.local', SMTP_PASSWORD='local'
+            )
+            import boto3
+            import lambda_enviar_email
+            import lambda_generar_recibo
+            from almacen_recibos import clave_recibo
+            from bembos_comun.aws import obtener_cliente, obtener_recurso, obtener_tabla
+
+            ddb = boto3.client('dynamodb')
+            ddb.create_table(
+                TableName='Pedidos',
+                AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                                      {'AttributeName': 'uuid', 'AttributeType': 'S'}],
+                KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                           {'AttributeName': 'uuid', 'KeyType': 'RANGE'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            boto3.client('s3').create_bucket(Bucket=BUCKET)
+            tabla = obtener_tabla('Pedidos')
+            with tabla.batch_writer() as lote:
+                for i in range(max(n, 20)):
+                    lote.put_item(Item=dict(mensaje(i), estado_pedido='PAGADO', fecha_pedido=FECHA_PEDIDO, elementos=[
+                        {'combo': ['Combo Clásico'], 'precio': Decimal('25.90'), 'cantidad_combo': 2}]))
+            s3 = obtener_cliente('s3')
+            llamadas_ddb = contar_llamadas(obtener_recurso('dynamodb').meta.client)
+            evento = evento_sqs(n)
+
+            def borrar_recibos(cuantos=n):
+                # Sin recibos previos: cada corrida sube todos (HEAD 404 + PUT), no solo el HEAD de una reentrega
+                s3.delete_objects(Bucket=BUCKET, Delete={'Objects': [
+                    {'Key': clave_recibo(TENANT, f'pedido-{i}', DIA)} for i in range(cuantos)]})
+
+            print(f"Lote de {n} registros; AWS a {args.latencia_aws_ms} ms y SMTP a {args.latencia_smtp_ms} ms de round trip")
+            print(f"{'consumidor':<16} | {'secuencial ms':>13} | {'en lote ms':>10} | {'x':>5} | lecturas DynamoDB (antes -> ahora)")
+            for nombre, anterior, nuevo, preparar in (
+                ('generarRecibo', lambda: secuencial_recibo(evento, tabla, s3),
+                 lambda: lambda_generar_recibo.lambda_handler(evento, None), borrar_recibos),
+                ('enviarEmail', lambda: secuencial_email(evento, tabla, os.environ['SMTP_USER']),
+                 lambda: lambda_enviar_email.lambda_handler(evento, None), None),
+            ):
+                # Calentar clientes y sesiones SMTP para comparar solo el procesamiento del lote
+                medir(anterior, 1), medir(nuevo, 1, preparar)
+                llamadas_ddb.clear()
+                ms_anterior, _ = medir(anterior, 1)
+                lecturas_antes = dict(llamadas_ddb)
+                llamadas_ddb.clear()
+                ms_nuevo, respuesta = medir(nuevo, 1, preparar)
+                lecturas_ahora = dict(llamadas_ddb)
+                assert respuesta == {'batchItemFailures': []}, respuesta
+                ms_anterior = min(ms_anterior, medir(anterior)[0])
+                ms_nuevo = min(ms_nuevo, medir(nuevo, preparar=preparar)[0])
+                print(f"{nombre:<16} | {ms_anterior:>13.1f} | {ms_nuevo:>10.1f} | {ms_anterior / ms_nuevo:>5.1f} | "
+                      f"{lecturas_antes} -> {lecturas_ahora}")
+
+            # Fallo parcial: el envío de un registro falla y solo ese vuelve a la cola
+            enviar_original = lambda_enviar_email.enviar_email_confirmacion
+
+            def enviar_con_fallo(**kwargs):
+                if kwargs['uuid_pedido'] == 'pedido-3':
+                    raise ConnectionError('relay no disponible')
+                return enviar_original(**kwargs)
+            lambda_enviar_email.enviar_email_confirmacion = enviar_con_fallo
+            entregados = len(buzon.mensajes)
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = lambda_enviar_email.lambda_handler(evento_sqs(10), None)
+            lambda_enviar_email.enviar_email_confirmacion = enviar_original
+            assert respuesta == {'batchItemFailures': [{'itemIdentifier': 'mensaje-3'}]}, respuesta
+            assert len(buzon.mensajes) - entregados == 9
+            print("Fallo parcial: 9 correos enviados, batchItemFailures = [mensaje-3]")
+
+            # Mensaje mal formado y pedido inexistente: se descartan, no se reintentan
+            raro = {'Records': [{'messageId': 'roto', 'body': '{no es json'},
+                                {'messageId': 'fantasma', 'body': json.dumps(dict(mensaje(999)))}]}
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert lambda_generar_recibo.lambda_handler(raro, None) == {'batchItemFailures': []}
+            print("Mensaje inválido y pedido inexistente: descartados")
+
+            # Entrega real: PedidosPagadosTopic -> cola con RawMessageDelivery -> handler
+            sns, sqs = boto3.client('sns'), boto3.client('sqs')
+            topic = sns.create_topic(Name='PedidosPagadosTopic')['TopicArn']
+            cola = sqs.create_queue(QueueName='GenerarRecibo')['QueueUrl']
+            arn_cola = sqs.get_queue_attributes(QueueUrl=cola, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+            sns.subscribe(TopicArn=topic, Protocol='sqs', Endpoint=arn_cola, Attributes={'RawMessageDelivery': 'true'})
+            for i in range(5):
+                sns.publish(TopicArn=topic, Message=json.dumps(mensaje(i)), Subject=f'Pedido Pagado - pedido-{i}')
+            recibidos = sqs.receive_message(QueueUrl=cola, MaxNumberOfMessages=10, WaitTimeSeconds=1)['Messages']
+            registros = [{'messageId': m['MessageId'], 'body': m['Body']} for m in recibidos]
+            borrar_recibos(5)
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = lambda_generar_recibo.lambda_handler({'Records': registros}, None)
+            assert respuesta == {'batchItemFailures': []}, respuesta
+            claves = {o['Key'] for o in s3.list_objects_v2(Bucket=BUCKET, Prefix='recibos/dia=').get('Contents', [])}
+            assert all(clave_recibo(TENANT, f'pedido-{i}', DIA) in claves for i in range(5))
+            print(f"SNS -> SQS (raw) -> generarRecibo: {len(registros)} mensajes, {len(registros)} recibos en S3")
+    finally:
+        servidor.stop()
+    print("OK")
+
+if __name__ == '__main__':
+    main()
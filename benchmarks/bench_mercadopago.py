@@ -0,0 +1,104 @@
+"""
+Throughput de checkout (pagarPedido) y webhook (receiveWebhook) contra un Mercado
+Pago local: SDK nuevo por invocación (comportamiento anterior, una sesión HTTP por
+petición) contra mp_cliente.obtener_sdk (sesión persistente con keep-alive).
+DynamoDB corre en memoria con moto.
+
+    python benchmarks/bench_mercadopago.py [--invocaciones 100] [--latencia-ms 20] [--latencia-conexion-ms 40]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    ACCESS_TOKEN='TEST-local'
+)
+os.environ.pop('PREFERENCIAS_TABLE', None)
+os.environ.pop('SNS_TOPIC_ARN', None)
+
+import boto3
+import mercadopago
+from moto import mock_aws
+
+from stubs.mercadopago_fake import MercadoPagoFake
+
+def crear_tabla_pedidos():
+    boto3.client('dynamodb').create_table(
+        TableName='Pedidos',
+        AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'uuid', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'uuid', 'KeyType': 'RANGE'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+def evento_checkout(i):
+    return {
+        'requestContext': {'domainName': 'api.local', 'stage': 'dev'},
+        'body': json.dumps({
+            'tenant_id': 'bembos-miraflores',
+            'uuid': f'pedido-{i}',
+            'cliente_email': 'cliente@example.com',
+            'elementos': [{'combo': ['Combo Clásico'], 'precio': 25.90, 'cantidad_combo': 2}]
+        })
+    }
+
+def evento_webhook(payment_id):
+    return {'body': json.dumps({'type': 'payment', 'data': {'id': str(payment_id)}})}
+
+def correr(funcion, eventos):
+    inicio = time.perf_counter()
+    # Los handlers loguean cada invocación con print
+    with contextlib.redirect_stdout(io.StringIO()):
+        for evento in eventos:
+            respuesta = funcion(evento, None)
+            assert respuesta['statusCode'] == 200, respuesta
+    segundos = time.perf_counter() - inicio
+    return len(eventos) / segundos, segundos * 1000 / len(eventos)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--invocaciones', type=int, default=100)
+    parser.add_argument('--latencia-ms', type=float, default=20)
+    parser.add_argument('--latencia-conexion-ms', type=float, default=40)
+    args = parser.parse_args()
+
+    with mock_aws(), MercadoPagoFake(args.latencia_ms, args.latencia_conexion_ms) as mp:
+        crear_tabla_pedidos()
+        os.environ['MP_API_BASE_URL'] = mp.base_url
+        import handler
+        import mp_cliente
+
+        for i in range(args.invocaciones):
+            mp.registrar_pago(1000 + i, 'pending', json.dumps({'tenant_id': 'bembos-miraflores', 'uuid': f'pedido-{i}'}))
+
+        estrategias = [
+            ('SDK por invocación', lambda token: mercadopago.SDK(token, http_client=mp.cliente_http())),
+            ('mp_cliente persistente', mp_cliente.obtener_sdk),
+        ]
+        print(f"MP local: {args.latencia_ms} ms por petición, {args.latencia_conexion_ms} ms por conexión nueva")
+        print(f"{'estrategia':<24} | {'endpoint':<14} | {'inv/s':>7} | {'ms/inv':>7} | {'conexiones':>10}")
+        for nombre, fabrica in estrategias:
+            # handler importa obtener_sdk desde mp_cliente en cada invocación
+            mp_cliente.obtener_sdk = fabrica
+            for endpoint, funcion, eventos in (
+                ('pagarPedido', handler.pagarPedido, [evento_checkout(i) for i in range(args.invocaciones)]),
+                ('receiveWebhook', handler.receiveWebhook, [evento_webhook(1000 + i) for i in range(args.invocaciones)]),
+            ):
+                conexiones_antes = mp.conexiones
+                por_segundo, ms = correr(funcion, eventos)
+                print(f"{nombre:<24} | {endpoint:<14} | {por_segundo:>7.1f} | {ms:>7.1f} | {mp.conexiones - conexiones_antes:>10}")
+
+if __name__ == '__main__':
+    main()
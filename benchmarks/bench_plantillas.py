@@ -0,0 +1,296 @@
+"""
+Render de recibos y correos de confirmación con motor_plantillas.py para pedidos de
+1 a 200 elementos:
+  - recibo: armado línea por línea (comportamiento anterior) contra plantillas/recibo.txt
+  - correo: el HTML en f-string de enviar_email_confirmacion (comportamiento anterior,
+    sin detalle ni escape) contra el HTML de plantillas/email_confirmacion.html, las
+    partes texto + HTML, compilar la plantilla en cada mensaje y el mensaje MIME
+Verifica además que el recibo sea idéntico al anterior y que el HTML escape los datos
+del cliente.
+
+    python benchmarks/bench_plantillas.py [--repeticiones 2000]
+"""
+import argparse
+import re
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+import motor_plantillas
+from lambda_generar_recibo import generar_recibo_txt
+from snapshot_pedido import detalle_elementos, total_pedido
+
+TAMANIOS = (1, 10, 50, 200)
+
+def pedido_con(n):
+    return {
+        'tenant_id': 'bembos-miraflores', 'uuid': 'pedido-1', 'cliente_email': 'ana@example.com',
+        'cliente_nombre': 'Ana', 'preference_id': 'pref-1',
+        'elementos': [{'combo': [f'Combo {i}'], 'precio': Decimal('25.90') + i, 'cantidad_combo': 1 + i % 3}
+                      for i in range(n)]
+    }
+
+def total_anterior(pedido):
+    if pedido.get('precio_total') is not None:
+        return Decimal(str(pedido['precio_total']))
+    total = Decimal('0')
+    for item in pedido.get('elementos', []):
+        total += Decimal(str(item.get('precio', 0))) * int(item.get('cantidad_combo', 1))
+    return total
+
+def recibo_anterior(pedido, payment_id):
+    """generar_recibo_txt antes de las plantillas (con el total en Decimal)."""
+    fecha_actual = datetime.now(timezone.utc).strftime("%d/%m/%Y %H:%M:%S UTC")
+    detalle_items = []
+    for item in pedido.get('elementos', []):
+        precio = Decimal(str(item.get('precio', 0)))
+        cantidad = int(item.get('cantidad_combo', 1))
+        subtotal = precio * cantidad
+        detalle_items.append(f"  {item.get('combo', ['Producto'])[0]}")
+        detalle_items.append(f"    Cantidad: {cantidad}")
+        detalle_items.append(f"    Precio unitario: S/. {precio:.2f}")
+        detalle_items.append(f"    Subtotal: S/. {subtotal:.2f}")
+        detalle_items.append("")
+    recibo = f"""
+========================================
+           RECIBO DE PAGO - BEMBOS
+========================================
+
+Fecha de generación: {fecha_actual}
+ID de Pedido: {pedido.get('uuid', 'N/A')}
+Tenant ID: {pedido.get('tenant_id', 'N/A')}
+ID de Pago MercadoPago: {payment_id}
+ID de Preferencia: {pedido.get('preference_id', 'N/A')}
+
+----------------------------------------
+           DATOS DEL CLIENTE
+----------------------------------------
+Nombre: {pedido.get('cliente_nombre', 'Cliente')}
+Email: {pedido.get('cliente_email', 'N/A')}
+
+----------------------------------------
+           DETALLE DEL PEDIDO
+----------------------------------------
+{chr(10).join(detalle_items)}
+----------------------------------------
+           RESUMEN DE PAGO
+----------------------------------------
+Total pagado: S/. {total_anterior(pedido):.2f}
+Estado: PAGADO
+Método de pago: MercadoPago
+
+----------------------------------------
+¡Gracias por tu compra!
+
+Este recibo confirma que tu pago ha sido
+procesado exitosamente. Tu pedido está
+siendo preparado.
+
+Para consultas: soporte@bembos.com
+========================================
+"""
+    return recibo.strip()
+
+def email_anterior(cliente_nombre, uuid_pedido, total_pedido):
+    """HTML de enviar_email_confirmacion antes de las plantillas."""
+    html_body = f"""
+    <!DOCTYPE html>
+    <html lang="es">
+    <head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Bembos – Pedido Confirmado</title>
+    </head>
+
+    <body style="margin:0; padding:0; background:#ececec; font-family:Arial, sans-serif;">
+    <table width="100%" cellpadding="0" cellspacing="0" style="padding:40px 0;">
+        <tr>
+            <td align="center">
+                <table width="640" cellpadding="0" cellspacing="0"
+                    style="background:#ffffff; border-radius:14px; overflow:hidden;
+                    box-shadow:0 5px 18px rgba(0,0,0,0.15);">
+                    
+                    <!-- HEADER PATRONES -->
+                    <tr>
+                        <td style="padding:0;">
+                            <table width="100%" cellpadding="0" cellspacing="0" style="border-collapse:collapse;">
+                                <tr>
+                                    <td width="25%" style="background:#e60012;">
+                                        <div style="height:120px;
+                                            background-image: repeating-linear-gradient(135deg,
+                                                #0060a0 0, #0060a0 10px,
+                                                transparent 10px, transparent 20px);"></div>
+                                    </td>
+                                    <td width="25%" style="background:#ffd400;">
+                                        <div style="height:120px;
+                                            background-image: radial-gradient(circle,
+                                                #e60012 0%, #e60012 12%, transparent 13%);
+                                            background-size:42px 42px;
+                                            background-position:center;"></div>
+                                    </td>
+                                    <td width="25%" style="background:#0060a0;">
+                                        <div style="height:120px;
+                                            background-image: radial-gradient(circle,
+                                                #ffd400 0%, #ffd400 20%, transparent 21%);
+                                            background-size:22px 22px;"></div>
+                                    </td>
+                                    <td width="25%" style="background:#ffd400;">
+                                        <div style="height:120px;
+                                            background-image: repeating-linear-gradient(45deg,
+                                                #e60012 0, #e60012 6px,
+                                                transparent 6px, transparent 12px);"></div>
+                                    </td>
+                                </tr>
+                            </table>
+                        </td>
+                    </tr>
+
+                    <!-- LOGO -->
+                    <tr>
+                        <td align="center" style="padding:35px 20px 5px;">
+                            <img src="https://upload.wikimedia.org/wikipedia/commons/d/d0/Bembos_logo15.png"
+                            alt="Bembos" width="170" style="display:block;">
+                        </td>
+                    </tr>
+
+                    <!-- TITULO -->
+                    <tr>
+                        <td align="center" style="padding:0 25px;">
+                            <h1 style="margin:8px 0 0; font-size:33px; color:#002f6c; font-weight:900; letter-spacing:1px; text-transform:uppercase;">
+                                ¡Pedido Confirmado!
+                            </h1>
+                        </td>
+                    </tr>
+
+                    <!-- TEXTO -->
+                    <tr>
+                        <td align="center" style="padding:22px 40px 28px; color:#444; font-size:18px; line-height:1.65;">
+                            <p style="margin:0 0 14px; font-weight:500; letter-spacing:0.3px;">
+                                Hola <strong style="color:#002f6c; font-weight:800;">{cliente_nombre}</strong>,
+                            </p>
+                            <p style="margin:0 0 14px; font-weight:500; letter-spacing:0.2px;">
+                                ¡Tu pago ha sido procesado exitosamente! 
+                            </p>
+                            <p style="margin:0 0 20px; font-weight:500;">
+                                <strong>Número de pedido:</strong> #{uuid_pedido}<br>
+                                <strong>Total pagado:</strong> S/. {total_pedido:.2f}
+                            </p>
+                            <p style="margin:0; font-weight:500; background:#f0f9ff; padding:15px; border-radius:8px; border-left:4px solid #0060a0;">
+                                Tu pedido está siendo preparado por nuestro equipo. 
+                                Te notificaremos cuando esté listo para recoger.
+                            </p>
+                        </td>
+                    </tr>
+
+                    <!-- BOTÓN -->
+                    <tr>
+                        <td align="center" style="padding-bottom:38px;">
+                            <a href="https://www.bembos.com.pe"
+                            style="display:inline-block; background:#0060a0; padding:14px 48px; color:#ffffff;
+                                font-size:18px; font-weight:900; text-decoration:none; border:2px solid #003f73;
+                                letter-spacing:1px; transition:0.25s ease; text-transform:uppercase;"
+                            onmouseover="this.style.background='transparent'; this.style.color='#003f73';"
+                            onmouseout="this.style.background='#0060a0'; this.style.color='#ffffff';">
+                                Ver mis pedidos
+                            </a>
+                        </td>
+                    </tr>
+
+                    <!-- FOOTER -->
+                    <tr>
+                        <td style="background:#f5f5f5; padding:18px 15px; color:#666; font-size:14px; text-align:center;">
+                            © 2025 Bembos — ¡Gracias por tu preferencia!<br>
+                            Para consultas: soporte@bembos.com
+                        </td>
+                    </tr>
+
+                </table>
+            </td>
+        </tr>
+    </table>
+    </body>
+    </html>
+    """
+    return html_body
+
+def contexto_email(pedido):
+    return {'cliente_nombre': pedido['cliente_nombre'], 'uuid': pedido['uuid'],
+            'total': total_pedido(pedido), 'elementos': detalle_elementos(pedido)}
+
+def email_precompilado(contexto):
+    return (motor_plantillas.renderizar('email_confirmacion.txt', contexto),
+            motor_plantillas.renderizar('email_confirmacion.html', contexto))
+
+def html_precompilado(contexto):
+    return motor_plantillas.renderizar('email_confirmacion.html', contexto)
+
+def email_sin_cache(contexto):
+    partes = []
+    for nombre in ('email_confirmacion.txt', 'email_confirmacion.html'):
+        partes.append(motor_plantillas.compilar(nombre, motor_plantillas._leer(nombre)).renderizar(contexto))
+    return partes
+
+def mensaje_mime(contexto):
+    texto, html = email_precompilado(contexto)
+    msg = MIMEMultipart('alternative')
+    msg['From'], msg['To'], msg['Subject'] = 'pedidos@bembos.local', 'ana@example.com', 'Pedido confirmado'
+    msg.attach(MIMEText(texto, 'plain', 'utf-8'))
+    msg.attach(MIMEText(html, 'html', 'utf-8'))
+    return msg.as_bytes()
+
+def microsegundos(funcion, repeticiones, rondas=5):
+    """Mejor promedio por llamada de varias rondas (µs)."""
+    mejor = float('inf')
+    for _ in range(rondas):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - inicio) * 1e6 / repeticiones)
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    # Equivalencia con el recibo anterior (salvo la fecha de generación)
+    sin_fecha = lambda recibo: re.sub(r'Fecha de generación: .*', 'Fecha de generación: FECHA', recibo)
+    for n in TAMANIOS:
+        pedido = pedido_con(n)
+        assert sin_fecha(generar_recibo_txt(pedido, '1001')) == sin_fecha(recibo_anterior(pedido, '1001')), n
+
+    # Escape del HTML y partes del correo
+    pedido = dict(pedido_con(2), cliente_nombre='<script>alert(1)</script> & Cía')
+    texto, html = email_precompilado(contexto_email(pedido))
+    assert '&lt;script&gt;alert(1)&lt;/script&gt; &amp; Cía' in html and '<script>' not in html
+    assert '<script>alert(1)</script> & Cía' in texto
+    assert html.count('<tr>') >= 2 and 'Combo 1' in html and 'Combo 1' in texto
+    print("Recibo idéntico al anterior; HTML escapado; partes texto y HTML con el detalle")
+
+    # "HTML antes" no tiene detalle de elementos ni escape: su costo no depende del pedido
+    print(f"{'elementos':>9} | {'recibo antes µs':>15} | {'recibo µs':>9} | {'HTML antes µs':>13} | "
+          f"{'HTML µs':>7} | {'email µs':>8} | {'email sin caché µs':>18} | {'MIME µs':>8} | {'emails/s':>8}")
+    for n in TAMANIOS:
+        pedido = pedido_con(n)
+        contexto = contexto_email(pedido)
+        repeticiones = max(20, args.repeticiones // n)
+        recibo_antes = microsegundos(lambda: recibo_anterior(pedido, '1001'), repeticiones)
+        recibo = microsegundos(lambda: generar_recibo_txt(pedido, '1001'), repeticiones)
+        html_antes = microsegundos(lambda: email_anterior(pedido['cliente_nombre'], pedido['uuid'],
+                                                          total_anterior(pedido)), repeticiones)
+        html = microsegundos(lambda: html_precompilado(contexto), repeticiones)
+        email = microsegundos(lambda: email_precompilado(contexto), repeticiones)
+        sin_cache = microsegundos(lambda: email_sin_cache(contexto), max(10, repeticiones // 10))
+        mime = microsegundos(lambda: mensaje_mime(contexto), max(10, repeticiones // 4))
+        print(f"{n:>9} | {recibo_antes:>15.1f} | {recibo:>9.1f} | {html_antes:>13.1f} | "
+              f"{html:>7.1f} | {email:>8.1f} | {sin_cache:>18.1f} | {mime:>8.1f} | {1e6 / email:>8.0f}")
+    print("OK")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark de serialización de pedidos con `elementos` grandes: las estrategias
+anteriores (convert_decimal_to_float recursivo y el round trip
+json.loads(json.dumps(..., default=decimal_default))) contra bembos_comun.serializacion.
+
+    python benchmarks/bench_serializacion.py [--repeticiones 20]
+"""
+import argparse
+import json
+import timeit
+import tracemalloc
+from decimal import Decimal
+
+import _rutas
+
+_rutas.agregar()
+
+from bembos_comun import serializacion
+from bembos_comun.serializacion import dumps
+
+TAMANIOS = (10, 100, 1000, 5000)
+
+# --- Estrategias anteriores (copiadas tal cual de los handlers) ---
+
+def convert_decimal_to_float(obj):
+    if isinstance(obj, list):
+        return [convert_decimal_to_float(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {key: convert_decimal_to_float(value) for key, value in obj.items()}
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    else:
+        return obj
+
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def anterior_convert(pedido):
+    return json.dumps(convert_decimal_to_float(pedido))
+
+def anterior_round_trip(pedido):
+    return json.dumps(json.loads(json.dumps(pedido, default=decimal_default)))
+
+def pedido_de_prueba(n):
+    return {
+        'tenant_id': 'bembos-miraflores',
+        'uuid': 'a1b2c3d4-0000-0000-0000-000000000000',
+        'cliente_email': 'cliente@example.com',
+        'precio_total': Decimal('1234.50'),
+        'elementos': [
+            {
+                'combo': [f'Combo {i}', 'Papas', 'Gaseosa'],
+                'precio': Decimal('25.90'),
+                'cantidad_combo': Decimal(i % 5 + 1),
+                'extras': {'salsas': ['mayonesa', 'ketchup'], 'recargo': Decimal('1.50')},
+            }
+            for i in range(n)
+        ],
+    }
+
+def medir(funcion, pedido, repeticiones):
+    segundos = min(timeit.repeat(lambda: funcion(pedido), number=repeticiones, repeat=3))
+    tracemalloc.start()
+    funcion(pedido)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos / repeticiones * 1000, pico / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    estrategias = [
+        ('convert_decimal_to_float', anterior_convert),
+        ('round trip decimal_default', anterior_round_trip),
+        ('serializacion (json)', serializacion._dumps_stdlib),
+    ]
+    if serializacion.orjson is not None:
+        estrategias.append(('serializacion (orjson)', serializacion._dumps_orjson))
+
+    print(f"Backend por defecto: {serializacion.BACKEND}")
+    print(f"{'elementos':>9} | {'estrategia':<28} | {'ms/op':>9} | {'pico KiB':>9}")
+    for n in TAMANIOS:
+        pedido = pedido_de_prueba(n)
+        esperado = json.loads(anterior_convert(pedido))
+        for nombre, funcion in estrategias:
+            # Mismo JSON que antes (salvo enteros, que ya no salen como 1.0)
+            assert json.loads(funcion(pedido)) == esperado, nombre
+            ms, kib = medir(funcion, pedido, args.repeticiones)
+            print(f"{n:>9} | {nombre:<28} | {ms:>9.3f} | {kib:>9.1f}")
+    print(f"\nEjemplo: {dumps(pedido_de_prueba(1))}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Envío de correos de lambda_enviar_email contra un relay SMTP local (aiosmtpd) detrás
+de un proxy con latencia de red:
+  - conexión + login por mensaje (como antes) vs sesión persistente de smtp_pool.py,
+    con y sin PIPELINING
+  - reconexión transparente cuando el relay corta la sesión
+  - lambda_handler completo: la sesión se reutiliza entre los registros de un lote
+    de SNS y entre invocaciones calientes
+
+Sin TLS: en el relay real STARTTLS suma más round trips a cada conexión nueva.
+
+    python benchmarks/bench_smtp.py [--mensajes 50] [--latencia-ms 30]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import smtplib
+import statistics
+import time
+from decimal import Decimal
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    SMTP_HOST='127.0.0.1',
+    SMTP_STARTTLS='false',
+    SMTP_USER='pedidos@bembos.local',
+    SMTP_PASSWORD='local'
+)
+
+import boto3
+from moto import mock_aws
+
+from stubs.smtp_sink import BuzonSmtp, ProxyLatencia
+
+REMITENTE = 'pedidos@bembos.local'
+
+def mensaje(i):
+    return (f"From: {REMITENTE}\r\nTo: cliente{i}@example.com\r\nSubject: Pedido {i}\r\n\r\n"
+            f"Tu pedido {i} fue confirmado.\r\n.linea que empieza con punto\r\n").encode('utf-8')
+
+def conexion_por_mensaje(puerto, i):
+    """Lo que hacía enviar_email_confirmacion: conectar, autenticarse y cerrar por cada correo."""
+    with smtplib.SMTP('127.0.0.1', puerto) as server:
+        server.login(REMITENTE, 'local')
+        server.sendmail(REMITENTE, f'cliente{i}@example.com', mensaje(i))
+
+def medir(enviar, n):
+    tiempos = []
+    inicio = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        enviar(i)
+        tiempos.append((time.perf_counter() - t) * 1000)
+    total = time.perf_counter() - inicio
+    tiempos.sort()
+    return n / total, statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95) - 1]
+
+def evento_cola(inicio, n):
+    return {'Records': [{'messageId': f'mensaje-{i}', 'body': json.dumps({
+        'tenant_id': 'bembos-miraflores', 'uuid': f'pedido-{i}',
+        'cliente_email': f'cliente{i}@example.com', 'cliente_nombre': 'Cliente'})} for i in range(inicio, inicio + n)]}
+
+def lambda_enviar_email_workers():
+    import lotes_pedidos
+    return lotes_pedidos.LOTE_MAX_WORKERS
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mensajes', type=int, default=50)
+    parser.add_argument('--latencia-ms', type=float, default=30)
+    args = parser.parse_args()
+    n = args.mensajes
+
+    import smtp_pool
+
+    print(f"Relay local con {args.latencia_ms} ms de round trip, {n} mensajes")
+    print(f"{'estrategia':<28} | {'msg/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'conexiones':>10} | {'logins':>6}")
+    for nombre, pipelining, persistente in (
+        ('conexión por mensaje', True, False),
+        ('smtp_pool sin PIPELINING', False, True),
+        ('smtp_pool con PIPELINING', True, True),
+    ):
+        with BuzonSmtp(pipelining=pipelining) as buzon, ProxyLatencia(buzon.puerto, args.latencia_ms) as proxy:
+            conexiones_antes = buzon.conexiones
+            if persistente:
+                smtp_pool.cerrar_todas()
+                smtp_pool.SMTP_PORT = proxy.puerto
+                enviar = lambda i: smtp_pool.enviar(REMITENTE, [f'cliente{i}@example.com'], mensaje(i),
+                                                    usuario=REMITENTE, password='local')
+            else:
+                enviar = lambda i: conexion_por_mensaje(proxy.puerto, i)
+            por_segundo, p50, p95 = medir(enviar, n)
+            assert len(buzon.mensajes) == n
+            assert b'\r\n.linea que empieza con punto' in buzon.mensajes[0]['datos'].replace(b'\n', b'\r\n').replace(b'\r\r', b'\r')
+            smtp_pool.cerrar_todas()
+            print(f"{nombre:<28} | {por_segundo:>7.1f} | {p50:>7.1f} | {p95:>7.1f} | "
+                  f"{buzon.conexiones - conexiones_antes:>10} | {buzon.logins:>6}")
+
+    # El relay corta la sesión a mitad de camino: el siguiente envío reconecta y no se pierde nada
+    with BuzonSmtp() as buzon, ProxyLatencia(buzon.puerto, args.latencia_ms) as proxy:
+        smtp_pool.SMTP_PORT = proxy.puerto
+        reconexiones_antes = smtp_pool.contadores()['reconexiones']
+        resultados = []
+        for i in range(10):
+            if i == 5:
+                proxy.cortar()
+            resultados.append(smtp_pool.enviar(REMITENTE, [f'cliente{i}@example.com'], mensaje(i),
+                                               usuario=REMITENTE, password='local'))
+        assert len(buzon.mensajes) == 10, len(buzon.mensajes)
+        assert smtp_pool.contadores()['reconexiones'] == reconexiones_antes + 1
+        reconectado = next(r for r in resultados if r['reconectado'])
+        print(f"Sesión cortada tras 5 mensajes: 10/10 entregados, 1 reconexión "
+              f"({reconectado['ms']} ms el mensaje que reconectó, {reconectado['conexion_ms']} ms de conexión)")
+        smtp_pool.cerrar_todas()
+
+    # lambda_handler: dos invocaciones calientes con lotes de la cola, una sesión por hilo del pool
+    with mock_aws(), BuzonSmtp() as buzon, ProxyLatencia(buzon.puerto, args.latencia_ms) as proxy:
+        smtp_pool.SMTP_PORT = proxy.puerto
+        tabla = boto3.resource('dynamodb').create_table(
+            TableName='Pedidos',
+            AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                                  {'AttributeName': 'uuid', 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                       {'AttributeName': 'uuid', 'KeyType': 'RANGE'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        for i in range(20):
+            tabla.put_item(Item={'tenant_id': 'bembos-miraflores', 'uuid': f'pedido-{i}', 'estado_pedido': 'PAGADO',
+                                 'elementos': [{'combo': ['Combo Clásico'], 'precio': Decimal('25.90'), 'cantidad_combo': 2}]})
+        import lambda_enviar_email
+
+        conexiones_antes = buzon.conexiones
+        for inicio in (0, 10):
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = lambda_enviar_email.lambda_handler(evento_cola(inicio, 10), None)
+            assert respuesta == {'batchItemFailures': []}, respuesta
+        assert len(buzon.mensajes) == 20
+        conexiones = buzon.conexiones - conexiones_antes
+        assert conexiones <= lambda_enviar_email_workers(), conexiones
+        print(f"lambda_handler: 2 invocaciones x 10 registros -> 20 correos, "
+              f"{conexiones} conexión(es) al relay")
+        smtp_pool.cerrar_todas()
+    print("OK")
+
+if __name__ == '__main__':
+    main()
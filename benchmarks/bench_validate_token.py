@@ -0,0 +1,153 @@
+"""
+Latencia de navegación del catálogo validando el token en cada petición
+(validate_token + listar_productos): tokens opacos sin y con la caché de tokens (cache_tokens.py) y tokens
+firmados (tokens_firmados.py). DynamoDB corre en memoria con moto detrás de un
+envoltorio que añade la latencia de red de cada llamada.
+
+    python benchmarks/bench_validate_token.py [--usuarios 20] [--paginas 25] [--latencia-ms 8]
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import _rutas
+
+_rutas.agregar('user_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    DYNAMODB_TABLE_TOKENS='tokens',
+    DYNAMODB_TABLE_REVOCADOS='revocados',
+    DYNAMODB_TABLE_PRODUCTOS='productos'
+)
+
+import boto3
+from moto import mock_aws
+
+class TablaConLatencia:
+    """Envuelve una Table de boto3 y suma `latencia` segundos a cada operación."""
+
+    def __init__(self, tabla, latencia):
+        self._tabla = tabla
+        self._latencia = latencia
+        self.llamadas = 0
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._tabla, nombre)
+        if not callable(atributo):
+            return atributo
+
+        def con_latencia(*args, **kwargs):
+            self.llamadas += 1
+            time.sleep(self._latencia)
+            return atributo(*args, **kwargs)
+        return con_latencia
+
+def crear_tablas(usuarios):
+    ddb = boto3.resource('dynamodb')
+    for nombre, rango in (('tokens', 'token_id'), ('productos', 'product_id')):
+        ddb.create_table(
+            TableName=nombre,
+            AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                                  {'AttributeName': rango, 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                       {'AttributeName': rango, 'KeyType': 'RANGE'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+    ddb.create_table(
+        TableName='revocados',
+        AttributeDefinitions=[{'AttributeName': 'lista', 'AttributeType': 'S'},
+                              {'AttributeName': 'token_id', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'lista', 'KeyType': 'HASH'},
+                   {'AttributeName': 'token_id', 'KeyType': 'RANGE'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    expires = (datetime.now() + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
+    tokens = []
+    with ddb.Table('tokens').batch_writer() as lote:
+        for i in range(usuarios):
+            token = str(uuid.uuid4())
+            tokens.append(token)
+            lote.put_item(Item={'tenant_id': token, 'token_id': str(uuid.uuid4()), 'user_id': f'u{i}',
+                                'role': 'cliente', 'token': token, 'expires': expires})
+    with ddb.Table('productos').batch_writer() as lote:
+        for i in range(50):
+            lote.put_item(Item={'tenant_id': 'hamburguesas', 'product_id': f'p{i:03d}', 'nombre': f'Producto {i}'})
+    return tokens
+
+def validar_y_listar(evento):
+    """Validación en línea del token y, si pasa, el handler con la identidad en el contexto."""
+    import listar_productos
+    import validate_token
+    token = evento['headers']['Authorization'].replace('Bearer ', '')
+    identidad, motivo = validate_token.identificar_token(token)
+    if identidad is None:
+        return {'statusCode': 403, 'body': validate_token.MENSAJES_RECHAZO[motivo]}
+    evento = dict(evento, requestContext={'authorizer': {'user_id': identidad['user_id'], 'role': identidad['role']}})
+    return listar_productos.listar_productos(evento, None)
+
+def navegar(flujo, tokens, paginas):
+    """Cada usuario pide `paginas` veces el catálogo; se intercalan como en producción."""
+    tiempos = []
+    for _ in range(paginas):
+        for token in tokens:
+            evento = {'headers': {'Authorization': f'Bearer {token}'},
+                      'queryStringParameters': {'tipo': 'hamburguesas', 'limit': '20'}}
+            inicio = time.perf_counter()
+            respuesta = flujo(evento)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            assert respuesta['statusCode'] in (200, 403), respuesta
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99) - 1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--paginas', type=int, default=25)
+    parser.add_argument('--latencia-ms', type=float, default=8)
+    args = parser.parse_args()
+
+    with mock_aws():
+        tokens = crear_tablas(args.usuarios)
+        # Algunos clientes insisten con un token que no existe
+        tokens += [f'invalido-{i}' for i in range(max(1, args.usuarios // 10))]
+
+        import cache_tokens
+        import listar_productos
+        import tokens_firmados
+        import validate_token
+
+        ddb = boto3.resource('dynamodb')
+        tabla_tokens = TablaConLatencia(ddb.Table('tokens'), args.latencia_ms / 1000)
+        tabla_productos = TablaConLatencia(ddb.Table('productos'), args.latencia_ms / 1000)
+        validate_token.obtener_tabla = lambda nombre: tabla_tokens
+        listar_productos.obtener_tabla = lambda nombre: tabla_productos
+
+        print(f"{len(tokens)} tokens x {args.paginas} páginas, {args.latencia_ms} ms por llamada a DynamoDB")
+        print(f"{'caché':<10} | {'p50 ms':>7} | {'p99 ms':>7} | {'queries tokens':>14}")
+        for nombre, maximo in (('sin caché', 0), ('con caché', 1000)):
+            cache_tokens.TOKEN_CACHE_MAX = maximo
+            cache_tokens._cache.clear()
+            tabla_tokens.llamadas = 0
+            p50, p99 = navegar(validar_y_listar, tokens, args.paginas)
+            print(f"{nombre:<10} | {p50:>7.2f} | {p99:>7.2f} | {tabla_tokens.llamadas:>14}")
+
+        # Mismos usuarios con tokens firmados: solo se consulta la lista de revocación
+        tokens_firmados.TOKEN_SECRETO = 'secreto-benchmark'
+        tabla_revocados = TablaConLatencia(ddb.Table('revocados'), args.latencia_ms / 1000)
+        tokens_firmados.obtener_tabla = lambda nombre: tabla_revocados
+        firmados = [tokens_firmados.emitir(f'u{i}', 'cliente', f'u{i}@example.com')[0] for i in range(args.usuarios)]
+        firmados += tokens[args.usuarios:]
+        tabla_tokens.llamadas = 0
+        p50, p99 = navegar(validar_y_listar, firmados, args.paginas)
+        consultas = tabla_tokens.llamadas + tabla_revocados.llamadas
+        print(f"{'firmados':<10} | {p50:>7.2f} | {p99:>7.2f} | {consultas:>14}")
+        print(f"Estadísticas de la caché: {cache_tokens.estadisticas()}")
+
+if __name__ == '__main__':
+    main()
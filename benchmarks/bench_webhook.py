@@ -0,0 +1,136 @@
+"""
+Latencia de respuesta de receiveWebhook a Mercado Pago en modo "sincrono" (verifica
+el pago dentro de la petición) contra modo "cola" (solo encola en WebhooksMPQueue),
+y drenado de la cola con procesar_webhooks, incluido el reporte parcial de fallos
+(batchItemFailures). AWS corre en memoria con moto y MP es el stand-in local.
+
+    python benchmarks/bench_webhook.py [--notificaciones 50] [--latencia-ms 300]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    ACCESS_TOKEN='TEST-local'
+)
+
+import boto3
+from moto import mock_aws
+
+from stubs.mercadopago_fake import MercadoPagoFake
+
+TENANT = 'bembos-miraflores'
+
+def preparar_aws(n):
+    ddb = boto3.resource('dynamodb')
+    tabla = ddb.create_table(
+        TableName='Pedidos',
+        AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'uuid', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'uuid', 'KeyType': 'RANGE'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    with tabla.batch_writer() as lote:
+        for i in range(n):
+            lote.put_item(Item={'tenant_id': TENANT, 'uuid': f'pedido-{i}', 'estado_pedido': 'PENDIENTE_PAGO',
+                                'cliente_email': f'cliente{i}@example.com', 'cliente_nombre': 'Cliente'})
+    topic_arn = boto3.client('sns').create_topic(Name='PedidosPagados')['TopicArn']
+    queue_url = boto3.client('sqs').create_queue(QueueName='WebhooksMP')['QueueUrl']
+    return tabla, topic_arn, queue_url
+
+def evento_webhook(payment_id):
+    return {'body': json.dumps({'type': 'payment', 'data': {'id': str(payment_id)}})}
+
+def medir_acks(handler, ids):
+    tiempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for payment_id in ids:
+            inicio = time.perf_counter()
+            respuesta = handler.receiveWebhook(evento_webhook(payment_id), None)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            assert respuesta['statusCode'] == 200, respuesta
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99) - 1]
+
+def drenar(handler, queue_url, tamanio_lote=10):
+    """Entrega la cola a procesar_webhooks como lo haría el event source mapping."""
+    sqs = boto3.client('sqs')
+    procesados, fallidos = 0, []
+    while True:
+        mensajes = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=tamanio_lote).get('Messages', [])
+        if not mensajes:
+            return procesados, fallidos
+        records = [{'messageId': m['MessageId'], 'body': m['Body'], 'eventSource': 'aws:sqs'} for m in mensajes]
+        with contextlib.redirect_stdout(io.StringIO()):
+            respuesta = handler.procesar_webhooks({'Records': records}, None)
+        ids_fallidos = {f['itemIdentifier'] for f in respuesta['batchItemFailures']}
+        fallidos.extend(ids_fallidos)
+        procesados += len(records)
+        # Como Lambda: se borran solo los mensajes que no fallaron
+        exitosos = [m for m in mensajes if m['MessageId'] not in ids_fallidos]
+        for i in range(0, len(exitosos), 10):
+            sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+                {'Id': str(j), 'ReceiptHandle': m['ReceiptHandle']} for j, m in enumerate(exitosos[i:i + 10])
+            ])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notificaciones', type=int, default=50)
+    parser.add_argument('--latencia-ms', type=float, default=300)
+    args = parser.parse_args()
+    n = args.notificaciones
+
+    with mock_aws(), MercadoPagoFake(latencia_ms=args.latencia_ms) as mp:
+        tabla, topic_arn, queue_url = preparar_aws(n)
+        os.environ.update(MP_API_BASE_URL=mp.base_url, SNS_TOPIC_ARN=topic_arn, WEBHOOKS_QUEUE_URL=queue_url)
+        import handler
+        import webhooks_dedup
+
+        for i in range(n):
+            mp.registrar_pago(1000 + i, 'approved', json.dumps({'tenant_id': TENANT, 'uuid': f'pedido-{i}'}))
+
+        handler.WEBHOOK_MODO = 'sincrono'
+        p50, p99 = medir_acks(handler, [1000 + i for i in range(n)])
+        print(f"MP local con {args.latencia_ms} ms por consulta de pago")
+        print(f"{'modo':<10} | {'p50 ms':>8} | {'p99 ms':>8}")
+        print(f"{'sincrono':<10} | {p50:>8.1f} | {p99:>8.1f}")
+
+        handler.WEBHOOK_MODO = 'cola'
+        handler.WEBHOOKS_QUEUE_URL = queue_url
+        p50, p99 = medir_acks(handler, [1000 + i for i in range(n)])
+        print(f"{'cola':<10} | {p50:>8.1f} | {p99:>8.1f}")
+
+        # El modo sincrono ya los pagó: volver a PENDIENTE_PAGO antes de drenar la cola
+        for i in range(n):
+            tabla.update_item(Key={'tenant_id': TENANT, 'uuid': f'pedido-{i}'},
+                              UpdateExpression='SET estado_pedido = :e',
+                              ExpressionAttributeValues={':e': 'PENDIENTE_PAGO'})
+        # ...y olvidar que ya se procesaron (webhooks_dedup los recuerda en memoria)
+        webhooks_dedup._procesados.clear()
+
+        # Un pago con MP caído no debe frenar al resto del lote
+        mp.fallar_pago(1000, 503)
+        inicio = time.perf_counter()
+        procesados, fallidos = drenar(handler, queue_url)
+        segundos = time.perf_counter() - inicio
+        pagados = sum(1 for i in range(n) if tabla.get_item(
+            Key={'tenant_id': TENANT, 'uuid': f'pedido-{i}'})['Item']['estado_pedido'] == 'PAGADO')
+        print(f"\nprocesar_webhooks: {procesados} mensajes en {segundos:.2f} s, "
+              f"{len(fallidos)} reportados en batchItemFailures, {pagados}/{n} pedidos PAGADO")
+        assert len(fallidos) == 1 and pagados == n - 1
+
+if __name__ == '__main__':
+    main()
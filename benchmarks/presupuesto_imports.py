@@ -0,0 +1,190 @@
+"""
+Presupuesto de importación en frío por función de Make-Order.
+
+Para cada función de Make-Order-microservice/serverless.yml:
+  - deduce lo que su entry point importa en el primer uso: los imports dentro de la
+    función y de las funciones del módulo que llama (y boto3 si llama a bembos_comun.aws)
+  - importa el módulo del handler y esos módulos en un intérprete nuevo y mide el tiempo
+  - comprueba que no cargue librerías pesadas que no usa y que no supere su presupuesto
+  - comprueba que package.patterns de la función incluya todos los archivos del
+    servicio que se cargaron (un import perezoso sin empaquetar falla recién en Lambda)
+Sale con código 1 si alguna función no cumple. Requiere PyYAML para leer los handlers
+y package.patterns de serverless.yml.
+
+    python benchmarks/presupuesto_imports.py [--repeticiones 5]
+"""
+import argparse
+import ast
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+
+import _rutas
+
+SERVICIO = _rutas.SERVICIOS['make_order']
+PESADOS = ('boto3', 'botocore', 'mercadopago', 'requests')
+# Llamadas a otros módulos que importan una librería en su primer uso
+LLAMADAS_PEREZOSAS = {
+    'obtener_tabla': 'boto3.session',
+    'obtener_cliente': 'boto3.session',
+    'obtener_recurso': 'boto3.session',
+    'obtener_sesion': 'boto3.session',
+    'obtener_sdk': 'mercadopago',
+    # lotes_pedidos.py: BatchGetItem de los pedidos del lote
+    'procesar_lote': 'boto3.session',
+    'obtener_pedidos': 'boto3.session',
+}
+
+# función de serverless.yml -> (ms máximos, librerías pesadas que puede cargar)
+PRESUPUESTOS = {
+    'defaultHandler': (60, ()),
+    'connectionHandler': (400, ('boto3', 'botocore')),
+    'publishPedido': (400, ('boto3', 'botocore')),
+    'obtenerPedidoFiltro': (400, ('boto3', 'botocore')),
+    'obtenerPedidosPorEmail': (400, ('boto3', 'botocore')),
+    'obtenerPedidoPorId': (400, ('boto3', 'botocore')),
+    'backfillIndicesPedidos': (400, ('boto3', 'botocore')),
+    'pagarPedido': (550, PESADOS),
+    'receiveWebhook': (550, PESADOS),
+    'procesarWebhooks': (550, PESADOS),
+    'generarRecibo': (400, ('boto3', 'botocore')),
+    'enviarEmail': (400, ('boto3', 'botocore')),
+    'archivarRecibos': (400, ('boto3', 'botocore')),
+}
+
+MEDIR = '''
+import importlib, json, os, sys, time
+inicio = time.perf_counter()
+for nombre in sys.argv[1:]:
+    importlib.import_module(nombre)
+ms = (time.perf_counter() - inicio) * 1000
+raiz = os.getcwd() + os.sep
+archivos = sorted(
+    os.path.relpath(m.__file__, raiz).replace(os.sep, '/')
+    for m in list(sys.modules.values())
+    if getattr(m, '__file__', None) and os.path.abspath(m.__file__).startswith(raiz)
+)
+print(json.dumps({"ms": ms, "modulos": sorted(sys.modules), "archivos": archivos}))
+'''
+
+def imports_perezosos(modulo, funcion):
+    """
+    Módulos que importa `funcion` (y las funciones del módulo que llama) al ejecutarse,
+    o None si el módulo no define la función.
+    """
+    with open(os.path.join(SERVICIO, f'{modulo}.py'), encoding='utf-8') as f:
+        arbol = ast.parse(f.read())
+    funciones = {n.name: n for n in arbol.body if isinstance(n, ast.FunctionDef)}
+    if funcion not in funciones:
+        return None
+
+    modulos, visitadas, pendientes = [], set(), [funcion]
+    while pendientes:
+        nombre = pendientes.pop()
+        if nombre in LLAMADAS_PEREZOSAS and LLAMADAS_PEREZOSAS[nombre] not in modulos:
+            modulos.append(LLAMADAS_PEREZOSAS[nombre])
+        if nombre in visitadas or nombre not in funciones:
+            continue
+        visitadas.add(nombre)
+        for nodo in ast.walk(funciones[nombre]):
+            if isinstance(nodo, ast.Import):
+                nuevos = [alias.name for alias in nodo.names]
+            elif isinstance(nodo, ast.ImportFrom) and nodo.level == 0:
+                nuevos = [nodo.module]
+            else:
+                nuevos = []
+                if isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Name):
+                    pendientes.append(nodo.func.id)
+            modulos.extend(m for m in nuevos if m not in modulos)
+    return modulos
+
+def medir(modulos, repeticiones):
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join([_rutas.LAYER_COMUN, SERVICIO]))
+    mejor = None
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', MEDIR] + modulos,
+            cwd=SERVICIO, env=entorno, capture_output=True, text=True, check=True
+        )
+        resultado = json.loads(salida.stdout)
+        if mejor is None or resultado['ms'] < mejor['ms']:
+            mejor = resultado
+            mejor['importtime'] = salida.stderr
+    return mejor
+
+def mas_costosos(importtime, cuantos=3):
+    """Tiempo propio de importación sumado por paquete de primer nivel."""
+    por_paquete = {}
+    for linea in importtime.splitlines():
+        partes = linea.split('|')
+        if len(partes) != 3 or not partes[0].strip().split(':')[-1].strip().isdigit():
+            continue
+        paquete = partes[2].strip().split('.')[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + int(partes[0].split(':')[-1])
+    orden = sorted(por_paquete.items(), key=lambda p: -p[1])[:cuantos]
+    return ', '.join(f'{nombre} {us / 1000:.0f}' for nombre, us in orden)
+
+def empaquetado(configuracion, funcion):
+    """Función que dice si un archivo del servicio entra en el paquete de la función."""
+    patrones = list((configuracion.get('package') or {}).get('patterns') or [])
+    patrones += list((funcion.get('package') or {}).get('patterns') or [])
+
+    def incluido(archivo):
+        dentro = False
+        for patron in patrones:
+            negado = patron.startswith('!')
+            if fnmatch.fnmatch(archivo, patron.lstrip('!')):
+                dentro = not negado
+        return dentro
+    return incluido
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        import yaml
+    except ImportError:
+        # Sin serverless.yml no se conocen los handlers ni package.patterns
+        sys.exit("PyYAML requerido para leer serverless.yml: pip install pyyaml")
+
+    with open(os.path.join(SERVICIO, 'serverless.yml'), encoding='utf-8') as f:
+        configuracion = yaml.safe_load(f)
+    funciones = configuracion['functions']
+
+    fallas = []
+    print(f"{'función':<24} {'ms':>7} {'máx':>5}  {'más costosos (ms)':<40} pesados")
+    for nombre, (maximo, permitidos) in PRESUPUESTOS.items():
+        modulo, funcion = funciones[nombre]['handler'].strip().rsplit('.', 1) if nombre in funciones else (None, None)
+        if modulo is None:
+            fallas.append(f"{nombre}: no está en serverless.yml")
+            continue
+
+        perezosos = imports_perezosos(modulo, funcion)
+        if perezosos is None:
+            print(f"{nombre:<24} [AVISO] {modulo}.py no define {funcion}")
+            continue
+
+        resultado = medir([modulo] + perezosos, args.repeticiones)
+        pesados = [p for p in PESADOS if p in resultado['modulos']]
+        print(f"{nombre:<24} {resultado['ms']:>7.1f} {maximo:>5}  {mas_costosos(resultado['importtime']):<40} {', '.join(pesados) or '-'}")
+
+        if resultado['ms'] > maximo:
+            fallas.append(f"{nombre}: {resultado['ms']:.0f} ms > {maximo} ms")
+        for paquete in pesados:
+            if paquete not in permitidos:
+                fallas.append(f"{nombre}: carga {paquete} y no lo usa")
+        incluido = empaquetado(configuracion, funciones[nombre])
+        for archivo in resultado['archivos']:
+            if not incluido(archivo):
+                fallas.append(f"{nombre}: {archivo} no está en package.patterns")
+
+    for falla in fallas:
+        print(f"[FALLA] {falla}")
+    sys.exit(1 if fallas else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Stand-in local de la API de administración de WebSocket (apigatewaymanagementapi).
+Responde POST /{stage}/@connections/{connectionId} con 200, o 410 (GoneException)
+para las conexiones marcadas como caídas, después de una latencia fija.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(largo)
+        connection_id = self.path.rsplit('/', 1)[-1]
+        time.sleep(self.server.latencia)
+
+        if connection_id in self.server.caidas:
+            cuerpo = b'{"message":"Gone"}'
+            self.send_response(410)
+            self.send_header('x-amzn-ErrorType', 'GoneException')
+        else:
+            cuerpo = b''
+            self.server.recibidos += 1
+            self.send_response(200)
+
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+class StubGestionWebSocket:
+    def __init__(self, latencia_ms=10, caidas=None):
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.servidor.daemon_threads = True
+        self.servidor.latencia = latencia_ms / 1000
+        self.servidor.caidas = set(caidas or [])
+        self.servidor.recibidos = 0
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self):
+        host, puerto = self.servidor.server_address
+        return f"http://{host}:{puerto}/dev"
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
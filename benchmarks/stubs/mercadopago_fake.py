@@ -0,0 +1,153 @@
+"""
+Servidor local que imita la API de Mercado Pago usada por Make-Order:
+  POST /checkout/preferences -> 201 con id, init_point y sandbox_init_point
+  GET  /v1/payments/{id}     -> 200 con el pago registrado (404 si no existe,
+                                o el status forzado con fallar_pago)
+
+Para apuntar el handler aquí: MP_API_BASE_URL=<base_url> (ver mp_cliente.py).
+`latencia_conexion_ms` simula el coste de abrir una conexión (TCP + TLS) y se
+paga una sola vez por conexión, así se ve el efecto del keep-alive.
+"""
+import json
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mercadopago.http import HttpClient
+
+MP_API_BASE_URL = 'https://api.mercadopago.com'
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Cabeceras y cuerpo salen en dos writes: sin esto Nagle + delayed ACK suman ~40 ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        time.sleep(self.server.latencia_conexion)
+        with self.server.candado:
+            self.server.conexiones += 1
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length', 0))
+        datos = json.loads(self.rfile.read(largo) or b'{}')
+        time.sleep(self.server.latencia)
+
+        if self.path.split('?')[0] == '/checkout/preferences':
+            preference_id = f"fake-{uuid.uuid4().hex[:12]}"
+            with self.server.candado:
+                self.server.preferencias[preference_id] = datos
+            self._responder(201, {
+                'id': preference_id,
+                'init_point': f"https://www.mercadopago.com.pe/checkout/v1/redirect?pref_id={preference_id}",
+                'sandbox_init_point': f"https://sandbox.mercadopago.com.pe/checkout/v1/redirect?pref_id={preference_id}",
+                'external_reference': datos.get('external_reference')
+            })
+        else:
+            self._responder(404, {'message': 'not found'})
+
+    def do_GET(self):
+        time.sleep(self.server.latencia)
+        ruta = self.path.split('?')[0]
+
+        if ruta.startswith('/v1/payments/'):
+            payment_id = ruta.rsplit('/', 1)[-1]
+            with self.server.candado:
+                self.server.consultas_pago += 1
+                pago = self.server.pagos.get(payment_id)
+                error = self.server.errores.get(payment_id)
+            if error is not None:
+                self._responder(error, {'message': 'fake error', 'status': error})
+            elif pago is None:
+                self._responder(404, {'message': 'Payment not found', 'status': 404})
+            else:
+                self._responder(200, pago)
+        else:
+            self._responder(404, {'message': 'not found'})
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+class ClienteHttpRedirigido(HttpClient):
+    """
+    HttpClient estándar del SDK (una sesión nueva por petición) que envía a
+    `base_url` las llamadas dirigidas a api.mercadopago.com. Sirve de línea base.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def request(self, method, url, **kwargs):
+        if url.startswith(MP_API_BASE_URL):
+            url = self.base_url + url[len(MP_API_BASE_URL):]
+        return super().request(method, url, **kwargs)
+
+class MercadoPagoFake:
+    def __init__(self, latencia_ms=0, latencia_conexion_ms=0):
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.servidor.daemon_threads = True
+        self.servidor.latencia = latencia_ms / 1000
+        self.servidor.latencia_conexion = latencia_conexion_ms / 1000
+        self.servidor.preferencias = {}
+        self.servidor.pagos = {}
+        self.servidor.errores = {}
+        self.servidor.conexiones = 0
+        self.servidor.consultas_pago = 0
+        self.servidor.candado = threading.Lock()
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, puerto = self.servidor.server_address
+        return f"http://{host}:{puerto}"
+
+    @property
+    def preferencias_creadas(self):
+        return len(self.servidor.preferencias)
+
+    @property
+    def conexiones(self):
+        return self.servidor.conexiones
+
+    @property
+    def consultas_pago(self):
+        return self.servidor.consultas_pago
+
+    def registrar_pago(self, payment_id, status, external_reference):
+        """Da de alta un pago para GET /v1/payments/{id}."""
+        with self.servidor.candado:
+            self.servidor.pagos[str(payment_id)] = {
+                'id': int(payment_id),
+                'status': status,
+                'status_detail': 'accredited' if status == 'approved' else status,
+                'external_reference': external_reference
+            }
+
+    def fallar_pago(self, payment_id, status=500):
+        """GET /v1/payments/{id} responde `status` hasta llamar a fallar_pago(id, None)."""
+        with self.servidor.candado:
+            if status is None:
+                self.servidor.errores.pop(str(payment_id), None)
+            else:
+                self.servidor.errores[str(payment_id)] = status
+
+    def cliente_http(self):
+        return ClienteHttpRedirigido(self.base_url)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
@@ -0,0 +1,158 @@
+"""
+Relay SMTP local (aiosmtpd) para probar smtp_pool.py / lambda_enviar_email sin
+enviar correo real. Guarda los mensajes recibidos y cuenta conexiones y logins.
+
+Delante se puede poner ProxyLatencia, que retrasa cada dirección del tráfico
+`latencia_ms / 2` (un round trip = latencia_ms) y permite cortar las conexiones
+abiertas para simular que el relay cerró la sesión.
+
+Para apuntar la Lambda aquí: SMTP_HOST=127.0.0.1 SMTP_PORT=<puerto> SMTP_STARTTLS=false
+"""
+import logging
+import queue
+import socket
+import threading
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+# aiosmtpd avisa por cada AUTH que Session.login_data está deprecado
+logging.getLogger('mail.log').setLevel(logging.ERROR)
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+class _Buzon:
+    def __init__(self, pipelining):
+        self.pipelining = pipelining
+        self.mensajes = []
+        self.conexiones = 0
+        self.logins = 0
+        self.candado = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        with self.candado:
+            self.conexiones += 1
+        if self.pipelining:
+            # aiosmtpd procesa los comandos en orden aunque lleguen juntos; solo falta anunciarlo
+            responses.insert(-1, '250-PIPELINING')
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.candado:
+            self.mensajes.append({'de': envelope.mail_from, 'para': list(envelope.rcpt_tos),
+                                  'datos': envelope.content})
+        return '250 OK'
+
+    def autenticar(self, server, session, envelope, mechanism, auth_data):
+        with self.candado:
+            self.logins += 1
+        return AuthResult(success=True)
+
+class BuzonSmtp:
+    """Relay SMTP en 127.0.0.1 con AUTH en claro (sin TLS) y PIPELINING opcional."""
+
+    def __init__(self, pipelining=True):
+        self.buzon = _Buzon(pipelining)
+        self.puerto = puerto_libre()
+        self.controlador = Controller(
+            self.buzon, hostname='127.0.0.1', port=self.puerto,
+            authenticator=self.buzon.autenticar, auth_require_tls=False
+        )
+
+    @property
+    def mensajes(self):
+        return self.buzon.mensajes
+
+    @property
+    def conexiones(self):
+        return self.buzon.conexiones
+
+    @property
+    def logins(self):
+        return self.buzon.logins
+
+    def __enter__(self):
+        self.controlador.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.controlador.stop()
+
+class ProxyLatencia:
+    """Proxy TCP que suma `latencia_ms` de round trip sin serializar los envíos en vuelo."""
+
+    def __init__(self, puerto_destino, latencia_ms):
+        self.destino = ('127.0.0.1', puerto_destino)
+        self.retraso = latencia_ms / 2000
+        self.escucha = socket.create_server(('127.0.0.1', 0))
+        self.puerto = self.escucha.getsockname()[1]
+        self.sockets = []
+        self.candado = threading.Lock()
+
+    def _bombear(self, origen, destino):
+        pendientes = queue.Queue()
+
+        def escribir():
+            while True:
+                llegada, datos = pendientes.get()
+                if datos is None:
+                    break
+                espera = llegada + self.retraso - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                try:
+                    destino.sendall(datos)
+                except OSError:
+                    break
+            try:
+                destino.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        threading.Thread(target=escribir, daemon=True).start()
+        while True:
+            try:
+                datos = origen.recv(65536)
+            except OSError:
+                datos = b''
+            pendientes.put((time.monotonic(), datos or None))
+            if not datos:
+                return
+
+    def _aceptar(self):
+        while True:
+            try:
+                cliente, _ = self.escucha.accept()
+            except OSError:
+                return
+            servidor = socket.create_connection(self.destino)
+            for s in (cliente, servidor):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.candado:
+                self.sockets += [cliente, servidor]
+            threading.Thread(target=self._bombear, args=(cliente, servidor), daemon=True).start()
+            threading.Thread(target=self._bombear, args=(servidor, cliente), daemon=True).start()
+
+    def cortar(self):
+        """Cierra todas las conexiones abiertas, como un relay que expira sesiones."""
+        with self.candado:
+            sockets, self.sockets = self.sockets, []
+        for s in sockets:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            s.close()
+
+    def __enter__(self):
+        threading.Thread(target=self._aceptar, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.escucha.close()
+        self.cortar()
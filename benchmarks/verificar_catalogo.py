@@ -0,0 +1,138 @@
+"""
+Verifica el catálogo materializado (User-Order catalogo.py) con DynamoDB y S3 en
+memoria (moto):
+  - listar_productos desde el catálogo devuelve las mismas páginas y next_token que el Query
+  - lecturas a DynamoDB por vista de página, con y sin catálogo
+  - If-None-Match con el ETag vigente -> 304
+  - regenerar sin cambios no publica versión; un producto nuevo sí, y la copia
+    del contenedor se recarga solo entonces
+
+    python benchmarks/verificar_catalogo.py
+"""
+import os
+
+import _rutas
+
+_rutas.agregar('user_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    DYNAMODB_TABLE_PRODUCTOS='productos',
+    BUCKET_IMAGENES_PRODUCTOS='productos-img',
+    PAGINACION_SECRETO='local',
+    CATALOGO_REFRESCO='0'
+)
+
+import boto3
+from moto import mock_aws
+
+TIPO = 'hamburguesas'
+CONTEXTO = {'requestContext': {'authorizer': {'user_id': 'u1', 'role': 'cliente', 'tenant_id': 'bembos'}}}
+
+def preparar(productos):
+    ddb = boto3.resource('dynamodb')
+    ddb.create_table(
+        TableName='productos',
+        AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'product_id', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'product_id', 'KeyType': 'RANGE'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    boto3.client('s3').create_bucket(Bucket='productos-img')
+    with ddb.Table('productos').batch_writer() as lote:
+        for i in range(productos):
+            item = {'tenant_id': TIPO, 'product_id': f'p{i:04d}', 'nombre': f'Producto {i}', 'precio': 12 + i % 7}
+            # Algunos sin imagen procesada: no deben aparecer en ninguna de las dos rutas
+            if i % 25 == 0:
+                item['estado'] = 'PENDIENTE_IMAGEN'
+            elif i % 2 == 0:
+                item['estado'] = 'LISTO'
+            lote.put_item(Item=item)
+
+def evento(limite, next_token=None, etag=None):
+    params = {'tipo': TIPO, 'limit': str(limite)}
+    if next_token:
+        params['next_token'] = next_token
+    return dict(CONTEXTO, queryStringParameters=params, headers={'If-None-Match': etag} if etag else {})
+
+def recorrer(listar_productos, limite):
+    paginas, next_token = [], None
+    while True:
+        respuesta = listar_productos(evento(limite, next_token), None)
+        assert respuesta['statusCode'] == 200, respuesta
+        paginas.append(([p['product_id'] for p in respuesta['body']['items']], respuesta['body']['next_token']))
+        next_token = respuesta['body']['next_token']
+        if not next_token:
+            return paginas
+
+def main():
+    with mock_aws():
+        preparar(600)
+        from bembos_comun.aws import obtener_tabla
+        import catalogo
+        from listar_productos import listar_productos, catalogo_productos
+
+        lecturas = {'n': 0}
+        def contar(**kwargs):
+            lecturas['n'] += 1
+        obtener_tabla('productos').meta.client.meta.events.register('before-call.dynamodb.*', contar)
+
+        lecturas['n'] = 0
+        por_query = recorrer(listar_productos, 100)
+        lecturas_query = lecturas['n']
+
+        version = catalogo.regenerar_catalogo_stream(
+            {'Records': [{'dynamodb': {'Keys': {'tenant_id': {'S': TIPO}, 'product_id': {'S': 'p0001'}}}},
+                         {'dynamodb': {'Keys': {'tenant_id': {'S': '__catalogo__'}, 'product_id': {'S': TIPO}}}}]},
+            None)[TIPO]
+        assert version == 1
+
+        lecturas['n'] = 0
+        por_catalogo = recorrer(listar_productos, 100)
+        lecturas_catalogo = lecturas['n']
+        # Con ventana de refresco la copia del contenedor no consulta ni el puntero
+        catalogo.CATALOGO_REFRESCO = 5
+        recorrer(listar_productos, 100)
+        lecturas['n'] = 0
+        recorrer(listar_productos, 100)
+        lecturas_caliente = lecturas['n']
+        catalogo.CATALOGO_REFRESCO = 0
+        catalogo._catalogos[TIPO]['revisar_en'] = 0
+        assert [p for p, _ in por_query] == [p for p, _ in por_catalogo], 'páginas distintas'
+        assert [t for _, t in por_query] == [t for _, t in por_catalogo], 'next_token distintos'
+        # Un token emitido por la ruta del Query sirve en la del catálogo
+        segunda = listar_productos(evento(100, por_query[0][1]), None)
+        assert [p['product_id'] for p in segunda['body']['items']] == por_query[1][0]
+
+        primera = listar_productos(evento(100), None)
+        etag = primera['headers']['ETag']
+        assert listar_productos(evento(100, etag=etag), None)['statusCode'] == 304
+
+        completo = catalogo_productos(dict(CONTEXTO, queryStringParameters={'tipo': TIPO}, headers={}), None)
+        assert completo['statusCode'] == 200
+        assert catalogo_productos(dict(CONTEXTO, queryStringParameters={'tipo': TIPO},
+                                       headers={'if-none-match': completo['headers']['ETag']}), None)['statusCode'] == 304
+
+        assert catalogo.regenerar_catalogo(TIPO) == 1, 'sin cambios no debe haber versión nueva'
+
+        obtener_tabla('productos').put_item(Item={'tenant_id': TIPO, 'product_id': 'p9999', 'nombre': 'Nuevo', 'precio': 20})
+        assert catalogo.regenerar_catalogo(TIPO) == 2
+        nueva = listar_productos(evento(100, etag=etag), None)
+        assert nueva['statusCode'] == 200 and nueva['headers']['ETag'] != etag
+
+        s3 = boto3.client('s3')
+        objetos = [o['Key'] for o in s3.list_objects_v2(Bucket='productos-img', Prefix='catalogo/')['Contents']]
+        tamano = s3.head_object(Bucket='productos-img', Key=f'catalogo/{TIPO}/v2.json.gz')['ContentLength']
+
+        paginas = len(por_query)
+        print(f"Páginas por recorrido: {paginas} ({sum(len(p) for p, _ in por_query)} productos)")
+        print(f"Lecturas DynamoDB por recorrido: Query {lecturas_query}, catálogo {lecturas_catalogo} "
+              f"(solo el puntero), catálogo caliente {lecturas_caliente}")
+        print(f"Catálogo: {len(completo['body'])} bytes JSON, {tamano} bytes gzip; objetos {objetos}")
+        print("OK")
+
+if __name__ == '__main__':
+    main()
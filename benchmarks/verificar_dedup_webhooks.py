@@ -0,0 +1,106 @@
+"""
+Verifica la deduplicación de notificaciones de Mercado Pago (webhooks_dedup.py):
+cada pago llega en tres variantes (payment, payment_created y query string), se
+encola y se drena con procesar_webhooks. Debe quedar una sola publicación en SNS
+por pago y las consultas a MP suprimidas deben aparecer en los contadores.
+AWS corre en memoria con moto y MP es el stand-in local.
+
+    python benchmarks/verificar_dedup_webhooks.py [--pagos 20]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    WEBHOOKS_DEDUP_TABLE='WebhooksProcesados',
+    ACCESS_TOKEN='TEST-local'
+)
+
+import boto3
+from moto import mock_aws
+
+from bench_webhook import TENANT, preparar_aws, drenar
+from stubs.mercadopago_fake import MercadoPagoFake
+
+def variantes(payment_id):
+    return [
+        {'body': json.dumps({'type': 'payment', 'data': {'id': str(payment_id)}})},
+        {'body': json.dumps({'type': 'payment_created', 'data': {'id': str(payment_id)}})},
+        {'queryStringParameters': {'data.id': str(payment_id), 'type': 'payment'}},
+    ]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pagos', type=int, default=20)
+    args = parser.parse_args()
+    n = args.pagos
+
+    with mock_aws(), MercadoPagoFake() as mp:
+        _, topic_arn, queue_url = preparar_aws(n)
+        ddb = boto3.resource('dynamodb')
+        ddb.create_table(
+            TableName='WebhooksProcesados',
+            AttributeDefinitions=[{'AttributeName': 'clave', 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'clave', 'KeyType': 'HASH'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        # Suscribir una cola al topic para contar las publicaciones
+        sqs = boto3.client('sqs')
+        espia_url = sqs.create_queue(QueueName='espia')['QueueUrl']
+        espia_arn = sqs.get_queue_attributes(QueueUrl=espia_url, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+        boto3.client('sns').subscribe(TopicArn=topic_arn, Protocol='sqs', Endpoint=espia_arn)
+
+        os.environ.update(MP_API_BASE_URL=mp.base_url, SNS_TOPIC_ARN=topic_arn, WEBHOOKS_QUEUE_URL=queue_url)
+        import handler
+        import webhooks_dedup
+        handler.WEBHOOK_MODO = 'cola'
+        handler.WEBHOOKS_QUEUE_URL = queue_url
+
+        for i in range(n):
+            mp.registrar_pago(1000 + i, 'approved', json.dumps({'tenant_id': TENANT, 'uuid': f'pedido-{i}'}))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Dos rondas: la segunda simula los reintentos tardíos de MP
+            for ronda in range(2):
+                if ronda:
+                    # Otro contenedor: sin memoria local, la deduplicación pasa por DynamoDB
+                    webhooks_dedup._procesados.clear()
+                for i in range(n):
+                    for evento in variantes(1000 + i):
+                        assert handler.receiveWebhook(evento, None)['statusCode'] == 200
+                drenar(handler, queue_url)
+
+        publicados = 0
+        while True:
+            mensajes = sqs.receive_message(QueueUrl=espia_url, MaxNumberOfMessages=10).get('Messages', [])
+            if not mensajes:
+                break
+            publicados += len(mensajes)
+            sqs.delete_message_batch(QueueUrl=espia_url, Entries=[
+                {'Id': str(j), 'ReceiptHandle': m['ReceiptHandle']} for j, m in enumerate(mensajes)])
+
+        contadores = webhooks_dedup.contadores()
+        suprimidas = sum(valor for motivo, valor in contadores.items() if motivo.startswith('suprimidas'))
+        print(f"Notificaciones recibidas: {n * 3 * 2}")
+        print(f"Consultas a MP: {mp.consultas_pago}")
+        print(f"Publicaciones en SNS: {publicados}")
+        print(f"Contadores del contenedor: {contadores} (suprimidas={suprimidas})")
+        assert publicados == n
+        assert mp.consultas_pago == n
+        assert contadores['procesadas'] == n and suprimidas > 0
+        # Las supresiones no escriben en DynamoDB: la tabla solo tiene un item por pago
+        assert ddb.Table('WebhooksProcesados').scan(Select='COUNT')['Count'] == n
+        print("OK")
+
+if __name__ == '__main__':
+    main()
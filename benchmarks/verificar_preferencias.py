@@ -0,0 +1,107 @@
+"""
+Verifica la caché idempotente de preferencias de pagarPedido contra un Mercado Pago
+local (stubs/mercadopago_fake.py) y DynamoDB en memoria (moto):
+  - reintento con el mismo contenido -> misma preferencia, sin llamar a MP
+  - contenido distinto -> preferencia nueva
+  - preferencia expirada -> preferencia nueva
+
+    python benchmarks/verificar_preferencias.py
+"""
+import json
+import os
+import time
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    PREFERENCIAS_TABLE='PreferenciasMP',
+    ACCESS_TOKEN='TEST-local'
+)
+
+import boto3
+from moto import mock_aws
+
+from stubs.mercadopago_fake import MercadoPagoFake
+
+def crear_tablas():
+    ddb = boto3.client('dynamodb')
+    ddb.create_table(
+        TableName='Pedidos',
+        AttributeDefinitions=[{'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'uuid', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'uuid', 'KeyType': 'RANGE'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    ddb.create_table(
+        TableName='PreferenciasMP',
+        AttributeDefinitions=[{'AttributeName': 'clave', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'clave', 'KeyType': 'HASH'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+def evento(elementos):
+    return {
+        'requestContext': {'domainName': 'api.local', 'stage': 'dev'},
+        'body': json.dumps({
+            'tenant_id': 'bembos-miraflores',
+            'uuid': 'pedido-1',
+            'cliente_email': 'cliente@example.com',
+            'elementos': elementos
+        })
+    }
+
+def pagar(handler, elementos):
+    respuesta = handler.pagarPedido(evento(elementos), None)
+    assert respuesta['statusCode'] == 200, respuesta
+    return json.loads(respuesta['body'])['preference_id']
+
+def main():
+    elementos = [{'combo': ['Combo Clásico'], 'precio': 25.90, 'cantidad_combo': 2}]
+
+    with mock_aws(), MercadoPagoFake(latencia_ms=50) as mp:
+        crear_tablas()
+        # mp_cliente lee MP_API_BASE_URL al importarse
+        os.environ['MP_API_BASE_URL'] = mp.base_url
+        import handler
+
+        inicio = time.perf_counter()
+        primera = pagar(handler, elementos)
+        ms_primera = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        reintento = pagar(handler, elementos)
+        ms_reintento = (time.perf_counter() - inicio) * 1000
+
+        assert reintento == primera and mp.preferencias_creadas == 1
+        print(f"Reintento: misma preferencia {primera} ({ms_primera:.1f} ms -> {ms_reintento:.1f} ms)")
+
+        cambiados = elementos + [{'combo': ['Papas Grandes'], 'precio': 8.50, 'cantidad_combo': 1}]
+        nueva = pagar(handler, cambiados)
+        assert nueva != primera and mp.preferencias_creadas == 2
+        print(f"Contenido distinto: preferencia nueva {nueva}")
+
+        pedido = boto3.resource('dynamodb').Table('Pedidos').get_item(
+            Key={'tenant_id': 'bembos-miraflores', 'uuid': 'pedido-1'})['Item']
+        assert pedido['preference_id'] == nueva
+
+        # Simula una entrada vencida que el TTL de DynamoDB aún no borró
+        boto3.resource('dynamodb').Table('PreferenciasMP').update_item(
+            Key={'clave': 'bembos-miraflores#pedido-1'},
+            UpdateExpression='SET expira_en = :t',
+            ExpressionAttributeValues={':t': int(time.time()) - 1}
+        )
+        expirada = pagar(handler, cambiados)
+        assert expirada != nueva and mp.preferencias_creadas == 3
+        print("Preferencia expirada: se crea otra")
+
+    print("OK")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Verifica el almacén de recibos (almacen_recibos.py) con S3 en memoria (moto) y un
+bucket versionado como el del despliegue:
+  - un recibo por pedido bajo recibos/dia=AAAA-MM-DD/, gzip con Content-Encoding
+  - una reentrega completa del lote no sube nada (solo HEAD) ni crea versiones
+  - tres pedidos del mismo cliente conservan tres recibos (antes: uno, por email)
+  - archivar_recibos deja el día en 2 objetos; listar el día pasa de N claves a
+    leer un índice y cualquier recibo se recupera con un GET por rango
+  - una reentrega tardía tras archivar no vuelve a subir el recibo (índice del día)
+  - un pedido de un día ya archivado que se paga tarde queda suelto y el job
+    siguiente lo fusiona; un pedido sin fecha hace fallar solo su registro
+
+    python benchmarks/verificar_recibos_s3.py [--pedidos 500]
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import random
+from decimal import Decimal
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+BUCKET = 'recibos-bembos-local'
+DIA = '2026-10-15'
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    S3_BUCKET=BUCKET
+)
+
+import boto3
+from moto import mock_aws
+
+def mensaje(i, **cambios):
+    tenant = ('bembos-miraflores', 'bembos-surco', 'bembos-san isidro')[i % 3]
+    pedido = {'tenant_id': tenant, 'uuid': f'pedido-{i}', 'estado_pedido': 'PAGADO',
+              # Un cliente frecuente hace uno de cada 50 pedidos
+              'cliente_email': 'frecuente@example.com' if i % 50 == 0 else f'cliente{i}@example.com',
+              'cliente_nombre': 'Cliente', 'preference_id': f'pref-{i}', 'precio_total': Decimal('51.80'),
+              'fecha_pedido': f'{DIA}T{12 + i % 10}:00:00+00:00',
+              'elementos': [{'combo': ['Combo Clásico'], 'precio': Decimal('25.90'), 'cantidad_combo': 2}] * (1 + i % 4)}
+    pedido = {**pedido, **cambios}
+    from snapshot_pedido import serializar_mensaje
+    cuerpo, _ = serializar_mensaje({'tenant_id': tenant, 'uuid': pedido['uuid'], 'cliente_email': pedido['cliente_email'],
+                                    'payment_id': str(1000 + i), 'evento': 'pedido_pagado'}, pedido)
+    return {'messageId': f'mensaje-{i}', 'body': cuerpo}
+
+def entregar(handler, n):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for inicio in range(0, n, 10):
+            respuesta = handler({'Records': [mensaje(i) for i in range(inicio, min(n, inicio + 10))]}, None)
+            assert respuesta == {'batchItemFailures': []}, respuesta
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pedidos', type=int, default=500)
+    args = parser.parse_args()
+    n = args.pedidos
+
+    with mock_aws():
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=BUCKET)
+        s3.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={'Status': 'Enabled'})
+
+        import almacen_recibos
+        import lambda_generar_recibo
+        from bembos_comun.aws import obtener_cliente
+
+        llamadas = {}
+
+        def contar(model, **kwargs):
+            llamadas[model.name] = llamadas.get(model.name, 0) + 1
+        obtener_cliente('s3').meta.events.register('before-call.s3.*', contar)
+
+        def versiones():
+            total = 0
+            for pagina in s3.get_paginator('list_object_versions').paginate(Bucket=BUCKET):
+                total += len(pagina.get('Versions', []))
+            return total
+
+        entregar(lambda_generar_recibo.lambda_handler, n)
+        subidas = dict(llamadas)
+        prefijo = f'recibos/dia={DIA}/'
+        objetos = [o for p in s3.get_paginator('list_objects_v2').paginate(Bucket=BUCKET, Prefix=prefijo)
+                   for o in p.get('Contents', [])]
+        assert len(objetos) == n and subidas.get('PutObject') == n, (len(objetos), subidas)
+        muestra = s3.get_object(Bucket=BUCKET, Key=objetos[0]['Key'])
+        assert muestra['ContentEncoding'] == 'gzip' and muestra['ContentType'].startswith('text/plain')
+        comprimidos = sum(o['Size'] for o in objetos)
+        originales = sum(len(gzip.decompress(s3.get_object(Bucket=BUCKET, Key=o['Key'])['Body'].read())) for o in objetos)
+        print(f"{n} pedidos -> {len(objetos)} recibos en {prefijo} ({subidas.get('HeadObject')} HEAD, "
+              f"{subidas.get('PutObject')} PUT); {originales / 1024:.0f} KiB de texto en {comprimidos / 1024:.0f} KiB gzip "
+              f"({originales / comprimidos:.1f}x)")
+
+        frecuentes = [i for i in range(n) if i % 50 == 0]
+        assert all(almacen_recibos.leer_recibo(json.loads(mensaje(i)['body'])['tenant_id'], f'pedido-{i}', DIA)
+                   for i in frecuentes)
+        print(f"Cliente con {len(frecuentes)} pedidos: {len(frecuentes)} recibos conservados (antes quedaba el último)")
+
+        versiones_antes = versiones()
+        llamadas.clear()
+        entregar(lambda_generar_recibo.lambda_handler, n)
+        assert llamadas.get('PutObject', 0) == 0 and versiones() == versiones_antes, llamadas
+        print(f"Reentrega del lote completo: {llamadas.get('HeadObject')} HEAD, 0 PUT, 0 versiones nuevas")
+
+        textos = {o['Key']: gzip.decompress(s3.get_object(Bucket=BUCKET, Key=o['Key'])['Body'].read()) for o in objetos}
+        llamadas.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = json.loads(almacen_recibos.archivar_recibos({'dia': DIA}, None)['body'])[0]
+        assert resultado['archivados'] == n and resultado['repetidos'] == 0, resultado
+        restantes = s3.list_objects_v2(Bucket=BUCKET, Prefix=prefijo).get('KeyCount', 0)
+        archivo = s3.list_objects_v2(Bucket=BUCKET, Prefix=f'recibos-archivo/dia={DIA}/')['Contents']
+        assert restantes == 0 and len(archivo) == 2
+        print(f"Archivo del día: {n} objetos -> {len(archivo)} ({resultado['bytes'] / 1024:.0f} KiB), "
+              f"llamadas S3 del job: {dict(sorted(llamadas.items()))}")
+
+        llamadas.clear()
+        indice = json.loads(s3.get_object(Bucket=BUCKET, Key=f'recibos-archivo/dia={DIA}/indice.json')['Body'].read())
+        paginas_antes = -(-n // 1000)
+        print(f"Listar los recibos del día: {paginas_antes} ListObjectsV2 por {n} claves -> 1 GET del índice "
+              f"({len(indice['recibos'])} entradas con tenant y uuid)")
+        for i in random.Random(7).sample(range(n), 5):
+            tenant = json.loads(mensaje(i)['body'])['tenant_id']
+            clave = almacen_recibos.clave_recibo(tenant, f'pedido-{i}', DIA)
+            assert almacen_recibos.leer_recibo(tenant, f'pedido-{i}', DIA).encode('utf-8') == textos[clave]
+        print("Recibos archivados leídos con GET por rango: idénticos a los originales")
+
+        # Reentrega tardía (redrive de la DLQ) de 10 pedidos ya archivados
+        llamadas.clear()
+        entregar(lambda_generar_recibo.lambda_handler, 10)
+        # Los registros del lote se procesan en paralelo: el índice se lee una vez por hilo como mucho
+        assert llamadas.get('PutObject', 0) == 0 and llamadas.get('GetObject') <= 10, llamadas
+        assert s3.list_objects_v2(Bucket=BUCKET, Prefix=prefijo).get('KeyCount', 0) == 0
+        print(f"Reentrega tardía tras archivar: {llamadas.get('HeadObject')} HEAD, "
+              f"{llamadas.get('GetObject')} GET del índice, 0 PUT")
+
+        # Pedido del día archivado pagado tarde: queda suelto y el job diario lo fusiona
+        with contextlib.redirect_stdout(io.StringIO()):
+            respuesta = lambda_generar_recibo.lambda_handler({'Records': [mensaje(n)]}, None)
+        assert respuesta == {'batchItemFailures': []}
+        assert s3.list_objects_v2(Bucket=BUCKET, Prefix=prefijo).get('KeyCount', 0) == 1
+        almacen_recibos.RECIBOS_ARCHIVO_DIAS_ESPERA = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = json.loads(almacen_recibos.archivar_recibos({}, None)['body'])
+        indice = json.loads(s3.get_object(Bucket=BUCKET, Key=f'recibos-archivo/dia={DIA}/indice.json')['Body'].read())
+        assert [(r['dia'], r['archivados']) for r in resultado] == [(DIA, 1)], resultado
+        assert len(indice['recibos']) == n + 1
+        assert s3.list_objects_v2(Bucket=BUCKET, Prefix=prefijo).get('KeyCount', 0) == 0
+        print("Pedido pagado después de archivar su día: fusionado por el job siguiente")
+
+        # Sin fecha no hay día estable: falla su registro y no se sube nada
+        llamadas.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            respuesta = lambda_generar_recibo.lambda_handler(
+                {'Records': [mensaje(n + 1, fecha_pedido=None), mensaje(n + 2)]}, None)
+        assert respuesta == {'batchItemFailures': [{'itemIdentifier': f'mensaje-{n + 1}'}]}, respuesta
+        assert llamadas.get('PutObject') == 1, llamadas
+        print("Pedido sin fecha: solo su registro falla")
+
+        # Pasadas las 19:00 en Lima ya es el día siguiente en UTC: el recibo va al día local
+        assert almacen_recibos.dia_recibo({'fecha_pedido': '2026-10-16T01:30:00+00:00'}) == DIA
+        assert almacen_recibos.dia_recibo({'fecha_creacion': f'{DIA}T20:30:00-05:00'}) == DIA
+        print("Pedido de la noche: día de Lima, como dia_pedido")
+    print("OK")
+
+if __name__ == '__main__':
+    main()
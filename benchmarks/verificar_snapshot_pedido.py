@@ -0,0 +1,166 @@
+"""
+Verifica el snapshot del pedido en el evento pedido_pagado (snapshot_pedido.py):
+los pagos se procesan con procesar_webhooks, PedidosPagadosTopic entrega a las colas
+de generarRecibo y enviarEmail (RawMessageDelivery) y ambos consumidores drenan su
+cola. Se cuentan las lecturas de pedidos en DynamoDB sin snapshot, con snapshot y
+con un pedido que excede el presupuesto de bytes (debe leerse de la tabla).
+Recibo y correo deben mostrar el precio_total del servidor.
+AWS corre en memoria con moto, MP es el stand-in local y el SMTP es aiosmtpd.
+
+    python benchmarks/verificar_snapshot_pedido.py [--pagos 20]
+"""
+import argparse
+import contextlib
+import email
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import _rutas
+
+_rutas.agregar('make_order')
+
+os.environ.update(
+    AWS_DEFAULT_REGION='us-east-1',
+    AWS_ACCESS_KEY_ID='local',
+    AWS_SECRET_ACCESS_KEY='local',
+    PEDIDO_TABLE='Pedidos',
+    WEBHOOKS_DEDUP_TABLE='WebhooksProcesados',
+    ACCESS_TOKEN='TEST-local',
+    S3_BUCKET='recibos-bembos-local',
+    SMTP_HOST='127.0.0.1',
+    SMTP_STARTTLS='false',
+    SMTP_USER='pedidos@bembos.local',
+    SMTP_PASSWORD='local'
+)
+
+import boto3
+from moto import mock_aws
+
+from bench_webhook import TENANT, preparar_aws, drenar
+from stubs.mercadopago_fake import MercadoPagoFake
+from stubs.smtp_sink import BuzonSmtp
+
+# precio_total del servidor (con descuento) distinto de la suma de elementos (51.80)
+PRECIO_TOTAL = Decimal('45.00')
+# En hora de Lima: FECHA_PEDIDO[:10] es el día del recibo
+FECHA_PEDIDO = datetime.now(timezone(timedelta(hours=-5))).isoformat()
+
+def cola_suscrita(topic_arn, nombre):
+    sqs = boto3.client('sqs')
+    url = sqs.create_queue(QueueName=nombre)['QueueUrl']
+    arn = sqs.get_queue_attributes(QueueUrl=url, AttributeNames=['QueueArn'])['Attributes']['QueueArn']
+    boto3.client('sns').subscribe(TopicArn=topic_arn, Protocol='sqs', Endpoint=arn,
+                                  Attributes={'RawMessageDelivery': 'true'})
+    return url
+
+def drenar_consumidor(lambda_handler, queue_url):
+    """Entrega la cola al consumidor en lotes de 10; devuelve (mensajes, con snapshot, fallidos)."""
+    sqs = boto3.client('sqs')
+    mensajes = con_snapshot = fallidos = 0
+    while True:
+        recibidos = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get('Messages', [])
+        if not recibidos:
+            return mensajes, con_snapshot, fallidos
+        records = [{'messageId': m['MessageId'], 'body': m['Body']} for m in recibidos]
+        mensajes += len(records)
+        con_snapshot += sum('"pedido":' in m['Body'] for m in recibidos)
+        with contextlib.redirect_stdout(io.StringIO()):
+            fallidos += len(lambda_handler({'Records': records}, None)['batchItemFailures'])
+        sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(i), 'ReceiptHandle': m['ReceiptHandle']} for i, m in enumerate(recibidos)])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pagos', type=int, default=20)
+    args = parser.parse_args()
+    n = args.pagos
+
+    with mock_aws(), MercadoPagoFake() as mp, BuzonSmtp() as buzon:
+        tabla, topic_arn, queue_url = preparar_aws(3 * n + 1)
+        ddb = boto3.resource('dynamodb')
+        ddb.create_table(
+            TableName='WebhooksProcesados',
+            AttributeDefinitions=[{'AttributeName': 'clave', 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'clave', 'KeyType': 'HASH'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        boto3.client('s3').create_bucket(Bucket=os.environ['S3_BUCKET'])
+        elementos = [{'combo': ['Combo Clásico'], 'precio': Decimal('25.90'), 'cantidad_combo': 2}]
+        with tabla.batch_writer() as lote:
+            for i in range(3 * n + 1):
+                lote.put_item(Item={'tenant_id': TENANT, 'uuid': f'pedido-{i}', 'estado_pedido': 'PENDIENTE_PAGO',
+                                    'cliente_email': f'cliente{i}@example.com', 'cliente_nombre': 'Cliente',
+                                    'preference_id': f'pref-{i}', 'precio_total': PRECIO_TOTAL,
+                                    'fecha_pedido': FECHA_PEDIDO,
+                                    # El último pedido es enorme: no cabe en el presupuesto del snapshot
+                                    'elementos': elementos * (400 if i == 3 * n else 1)})
+        colas = {'generarRecibo': cola_suscrita(topic_arn, 'GenerarRecibo'),
+                 'enviarEmail': cola_suscrita(topic_arn, 'EnviarEmail')}
+
+        os.environ.update(MP_API_BASE_URL=mp.base_url, SNS_TOPIC_ARN=topic_arn, WEBHOOKS_QUEUE_URL=queue_url,
+                          SMTP_PORT=str(buzon.puerto))
+        import handler
+        import lambda_enviar_email
+        import lambda_generar_recibo
+        import snapshot_pedido
+        import almacen_recibos
+        from bembos_comun.aws import obtener_recurso
+        handler.WEBHOOK_MODO = 'cola'
+        handler.WEBHOOKS_QUEUE_URL = queue_url
+        consumidores = {'generarRecibo': lambda_generar_recibo.lambda_handler,
+                        'enviarEmail': lambda_enviar_email.lambda_handler}
+
+        lecturas = {'llamadas': 0, 'claves': 0}
+
+        def contar(params, model, **kwargs):
+            if model.name == 'GetItem':
+                lecturas['llamadas'] += 1
+                lecturas['claves'] += 1
+            elif model.name == 'BatchGetItem':
+                lecturas['llamadas'] += 1
+                lecturas['claves'] += sum(len(t['Keys']) for t in params['RequestItems'].values())
+        obtener_recurso('dynamodb').meta.client.meta.events.register('provide-client-params.dynamodb.*', contar)
+
+        print(f"{'modo':<26} | {'consumidor':<14} | {'mensajes':>8} | {'con snapshot':>12} | {'pedidos leídos':>14} | {'llamadas':>8}")
+        for modo, activo, pagos, presupuesto in (
+            ('sin snapshot', False, range(0, n), snapshot_pedido.PEDIDO_SNAPSHOT_MAX_BYTES),
+            ('con snapshot', True, range(n, 2 * n), snapshot_pedido.PEDIDO_SNAPSHOT_MAX_BYTES),
+            ('con snapshot + 1 excedido', True, range(2 * n, 3 * n + 1), 8000),
+        ):
+            snapshot_pedido.PEDIDO_SNAPSHOT = activo
+            snapshot_pedido.PEDIDO_SNAPSHOT_MAX_BYTES = presupuesto
+            for i in pagos:
+                mp.registrar_pago(1000 + i, 'approved', json.dumps({'tenant_id': TENANT, 'uuid': f'pedido-{i}'}))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    handler.receiveWebhook({'body': json.dumps({'type': 'payment', 'data': {'id': str(1000 + i)}})}, None)
+            _, fallidos = drenar(handler, queue_url)
+            assert not fallidos, fallidos
+
+            for nombre, consumidor in consumidores.items():
+                lecturas.update(llamadas=0, claves=0)
+                mensajes, con_snapshot, fallidos = drenar_consumidor(consumidor, colas[nombre])
+                assert mensajes == len(pagos) and not fallidos, (mensajes, fallidos)
+                esperadas = 0 if activo else len(pagos)
+                if presupuesto == 8000:
+                    esperadas = 1
+                assert lecturas['claves'] == esperadas, (modo, nombre, lecturas)
+                print(f"{modo:<26} | {nombre:<14} | {mensajes:>8} | {con_snapshot:>12} | "
+                      f"{lecturas['claves']:>14} | {lecturas['llamadas']:>8}")
+
+        # Recibo y correo con el total del servidor, tanto desde el snapshot como desde la tabla
+        s3 = boto3.client('s3')
+        for i in (0, n, 3 * n):
+            recibo = almacen_recibos.leer_recibo(TENANT, f'pedido-{i}', FECHA_PEDIDO[:10]).encode('utf-8')
+            assert b'Total pagado: S/. 45.00' in recibo, recibo[-400:]
+            assert b'Subtotal: S/. 51.80' in recibo
+        for m in buzon.mensajes:
+            html = email.message_from_bytes(m['datos']).get_payload()[0].get_payload(decode=True)
+            assert b'S/. 45.00' in html, 'total del correo'
+        print(f"Recibos y {len(buzon.mensajes)} correos con el precio_total del servidor (S/. {PRECIO_TOTAL})")
+    print("OK")
+
+if __name__ == '__main__':
+    main()